@@ -0,0 +1,301 @@
+"""Benchmarks a scrape end to end, and stage by stage, without touching the network.
+
+Synthetic listing pages, company profiles, search results and candidate pages
+for N companies are written to a fixture store, which a ReplayServer then serves
+with the injected latency. Run from the repository root:
+    python main.py bench --companies 200 --latency 0.05
+    python -m benchmarks.bench_pipeline --stage resolve --config config_dummy.json
+"""
+import importlib
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+from argparse import ArgumentParser
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+
+from scrape.configs import read_config
+from scrape.fixtures import FixtureStore
+from scrape.search_provider import build_search_query
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ("listing", "lookup", "resolve", "render")
+FIRST_NAMES = ["Maria", "James", "Priya", "Daniel", "Olivia", "Chen", "Amara", "Lucas"]
+SURNAMES = ["Garcia", "Smith", "Patel", "Kim", "Johnson", "Nguyen", "Okafor", "Rossi"]
+PATH_SETTINGS = (
+    "brand_names",
+    "surnames",
+    "lexicon_path",
+    "letter_template",
+    "font_regular",
+    "font_bold",
+    "font_italic",
+    "font_bolditalic",
+)
+
+
+class StageTimer:
+    """StageTimer wraps the function behind each stage and records how long every call took."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {stage: [] for stage in STAGES}
+        self.lock = Lock()
+
+    def wrap(self, stage: str, func):
+        """Returns func, timed as part of stage."""
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.latencies[stage].append(perf_counter() - start)
+
+        return timed
+
+
+def percentile(values: list[float], share: float) -> float:
+    """Returns the nearest-rank percentile of values, or 0 if there are none."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def load_base_config(path: str | None = None) -> dict:
+    """Reads the given config, or else the repository's config.json, falling back to config_dummy.json."""
+    candidates = [path] if path else [
+        os.path.join(REPO_ROOT, name) for name in ("config.json", "config_dummy.json")
+    ]
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            with open(candidate, encoding="utf-8") as file:
+                return json.load(file)
+    raise FileNotFoundError(f"No config found at {', '.join(candidates)}.")
+
+
+def synthesize_fixtures(store: FixtureStore, config: dict, companies: int) -> None:
+    """synthesize_fixtures writes every response a run over the given number of companies will request."""
+    rng = random.Random(0)
+    per_page = config["per_page"]
+    total_pages = -(-companies // per_page)
+    json_headers = {"Content-Type": "application/json"}
+    html_headers = {"Content-Type": "text/html; charset=utf-8"}
+
+    for page in range(total_pages + 1):
+        jobs, listed = [], []
+        for position in range(page * per_page, min(companies, (page + 1) * per_page)):
+            slug = f"synthetic-company-{position}"
+            name = f"Synthetic Company {position}"
+            first, last = rng.choice(FIRST_NAMES), rng.choice(SURNAMES)
+            jobs.append(
+                {
+                    "id": 100000 + position,
+                    "title": "Design Lead",
+                    "body": "<p>" + "We design delightful products. " * 200 + "</p>",
+                }
+            )
+            listed.append({"title": name, "alias": f"/company/{slug}"})
+            store.save_response(
+                f"https://api.builtin.com/companies/alias/{slug}",
+                {"region_id": config.get("region_id", "5")},
+                200,
+                json_headers,
+                json.dumps(
+                    {
+                        "street_address_1": f"{position} Broadway",
+                        "street_address_2": "Floor 2",
+                        "city": "New York",
+                        "state": "NY",
+                        "zip": "10001",
+                        "mission": "To make things better.",
+                        "url": f"https://{slug}.com",
+                        "adjectives": ["innovative", "collaborative", "fast-paced"],
+                        "industries": [{"name": "Design"}],
+                        "twitter": f"@{slug}",
+                        "email": f"hello@{slug}.com",
+                    }
+                ).encode(),
+            )
+            team_page = f"https://{slug}.com/team"
+            store.save_search(
+                build_search_query(name, config["search_query"]),
+                [
+                    f"https://www.linkedin.com/in/{first.lower()}-{last.lower()}-1a2b3c",
+                    f"https://{first.lower()}{last.lower()}.com/",
+                    team_page,
+                ],
+            )
+            page_html = (
+                "<html><head><script>var tracking = 'Maria Smith';</script></head><body>"
+                + "<p>Our team builds things together. </p>" * 500
+                + f"<p>Led by {first} {last}, Head of Design.</p></body></html>"
+            )
+            for url in (team_page, f"https://{first.lower()}{last.lower()}.com/"):
+                store.save_response(url, None, 200, html_headers, page_html.encode())
+        store.save_response(
+            config["url_builtin"],
+            {**config["querystring"], "page": page},
+            200,
+            json_headers,
+            json.dumps({"jobs": jobs, "companies": listed}).encode(),
+        )
+
+
+def prepare_workdir(
+    companies: int, latency: float, run_mode: str, config_path: str | None = None
+) -> str:
+    """prepare_workdir builds a working directory holding the fixtures and a config.json that replays them.
+
+    Returns:
+        str: the working directory.
+    """
+    config = load_base_config(config_path)
+    workdir = tempfile.mkdtemp(prefix="jobscraper_bench_")
+    config.setdefault("lexicon_path", "./words/lexicon.bin")
+    config.setdefault("letter_template", "./templates/cover_letter.txt")
+    for setting in PATH_SETTINGS:
+        if setting in config:
+            config[setting] = os.path.join(REPO_ROOT, config[setting])
+    config["persona"]["signature"] = os.path.join(REPO_ROOT, config["persona"]["signature"])
+    config.update(
+        {
+            "total_pages": -(-companies // config["per_page"]),
+            # relative to the working directory, which the benchmark runs in
+            "export_dir": "letters",
+            "journal_path": "journal.sqlite",
+            "fixture_mode": "replay",
+            "fixture_dir": "fixtures",
+            "replay_latency": latency,
+            "request_delay": 0,
+            "cache_bypass": True,
+            "run_mode": run_mode,
+            # the fixtures answer the base querystring only
+            "searches": [],
+        }
+    )
+    synthesize_fixtures(FixtureStore(os.path.join(workdir, "fixtures")), config, companies)
+    with open(os.path.join(workdir, "config.json"), "w", encoding="utf-8") as file:
+        json.dump(config, file, indent=2)
+    return workdir
+
+
+def instrument(timer: StageTimer, config) -> None:
+    """Wraps the function behind each stage, wherever it is referenced from."""
+    builtinscrape = importlib.import_module("scrape.builtinscrape")
+    namefetcher = importlib.import_module("scrape.namefetcher")
+    coverletterwriter = importlib.import_module("scrape.coverletterwriter")
+
+    fetch = builtinscrape.webscrape_results
+
+    def listing_or_lookup(target_url, *args, **kwargs):
+        stage = "listing" if target_url == config.url_builtin else "lookup"
+        return timer.wrap(stage, fetch)(target_url, *args, **kwargs)
+
+    builtinscrape.webscrape_results = listing_or_lookup
+    namefetcher.NameFetcher.parse_provided_search_queries = timer.wrap(
+        "resolve", namefetcher.NameFetcher.parse_provided_search_queries
+    )
+    coverletterwriter.CoverLetterWriter.write = timer.wrap(
+        "render", coverletterwriter.CoverLetterWriter.write
+    )
+
+
+def run_stage(stage: str, config, persona) -> int:
+    """run_stage runs one stage on its own over every synthetic company.
+
+    Returns:
+        int: how many items the stage processed.
+    """
+    builtinscrape = importlib.import_module("scrape.builtinscrape")
+    namefetcher = importlib.import_module("scrape.namefetcher")
+    coverletterwriter = importlib.import_module("scrape.coverletterwriter")
+
+    pages = [
+        docs
+        for _page, docs in builtinscrape.prefetch_listings(
+            config.url_builtin, config.querystring, config.total_pages, depth=1
+        )
+    ]
+    if stage == "listing":
+        return len(pages)
+    companies = [
+        company
+        for docs in pages
+        for company in builtinscrape.company_results(docs, 0, config)
+    ]
+    if stage == "lookup":
+        return len(companies)
+    cards = [
+        namefetcher.NameFetcher(company=company, config=config).parse_provided_search_queries()
+        for company in companies
+    ]
+    if stage == "resolve":
+        return len(cards)
+    coverletterwriter.write_letters(list(zip(companies, cards)), config, persona)
+    return len(cards)
+
+
+def report(timer: StageTimer, elapsed: float, letters: int) -> dict:
+    """Summarises a benchmark run."""
+    summary = {
+        "elapsed_seconds": round(elapsed, 3),
+        "letters": letters,
+        "letters_per_minute": round(letters / elapsed * 60, 1) if elapsed else 0.0,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "stages": {
+            stage: {
+                "calls": len(latencies),
+                "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            }
+            for stage, latencies in timer.latencies.items()
+        },
+    }
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = ArgumentParser(prog="bench", description=__doc__.splitlines()[0])
+    parser.add_argument("--companies", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per replayed response")
+    parser.add_argument("--stage", choices=("all", *STAGES), default="all")
+    parser.add_argument("--mode", choices=("serial", "pipeline"), default="serial")
+    parser.add_argument("--config", help="the config to base the run on. Defaults to the repository's")
+    args = parser.parse_args(argv)
+
+    config_path = os.path.abspath(args.config) if args.config else None
+    workdir = prepare_workdir(args.companies, args.latency, args.mode, config_path)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    main_module = importlib.import_module("main")
+    config, persona = read_config("config.json")
+    timer = StageTimer()
+    instrument(timer, config)
+
+    start = perf_counter()
+    if args.stage == "all":
+        main_module.scrape(config, persona)
+        letters = sum(
+            name.endswith(".txt")
+            for _root, _dirs, files in os.walk(workdir)
+            for name in files
+        )
+    else:
+        fixtures = importlib.import_module("scrape.fixtures").configure_fixtures(config)
+        importlib.import_module("scrape.http_client").configure_client(config)
+        importlib.import_module("scrape.search_provider").configure_search(config)
+        letters = run_stage(args.stage, config, persona)
+        fixtures.close()
+    report(timer, perf_counter() - start, letters)
+
+
+if __name__ == "__main__":
+    main()
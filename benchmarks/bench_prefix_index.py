@@ -0,0 +1,63 @@
+"""Compares the first-name PrefixIndex against the linear scan it replaced.
+
+Run from the repository root with a config.json in place:
+    python -m benchmarks.bench_prefix_index
+"""
+import random
+from timeit import timeit
+
+from scrape.configs import read_config
+from scrape.lexicon import load_lexicon
+
+
+def linear_scan(set_of_firstnames, username: str) -> list[str]:
+    """The candidate search NameFetcher.compare_username_against_firstnames_set used to run."""
+    return [
+        first_name.strip()
+        for first_name in set_of_firstnames
+        if first_name.lower() in username and username.find(first_name.lower()) == 0
+    ]
+
+
+def sample_usernames(first_names: list[str], surnames: list[str], count: int) -> list[str]:
+    """Builds usernames shaped like the ones found in links: firstlast, flast and noise."""
+    rng = random.Random(0)
+    usernames = []
+    for _ in range(count):
+        first, last = rng.choice(first_names).lower(), rng.choice(surnames).lower()
+        usernames.append(
+            rng.choice([f"{first}{last}", f"{first[0]}{last}", f"{last}{first}", "acmecorp"])
+        )
+    return usernames
+
+
+def main(count: int = 200, repeat: int = 3) -> None:
+    config, _persona = read_config("./config.json")
+    lexicon = load_lexicon(config)
+    first_names = list(lexicon.first_names)
+    firstname_set = set(first_names)
+    index = lexicon.first_name_index
+    usernames = sample_usernames(first_names, list(lexicon.surnames), count)
+
+    for username in usernames:
+        expected = linear_scan(firstname_set, username)
+        found = index.prefixes(username)
+        assert sorted(expected) == sorted(found), username
+        assert not expected or max(expected, key=len).title() == found[0].title()
+
+    linear = timeit(
+        lambda: [linear_scan(firstname_set, username) for username in usernames],
+        number=repeat,
+    )
+    indexed = timeit(
+        lambda: [index.prefixes(username) for username in usernames], number=repeat
+    )
+    per_call = repeat * len(usernames)
+    print(f"{len(first_names)} first names, {len(usernames)} usernames")
+    print(f"linear scan:  {linear / per_call * 1e6:10.1f} us/username")
+    print(f"prefix index: {indexed / per_call * 1e6:10.1f} us/username")
+    print(f"speedup:      {linear / indexed:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,374 @@
+from argparse import SUPPRESS, ArgumentParser
+from contextlib import contextmanager
 from time import perf_counter
 
-from tqdm import tqdm
+from scrape.configs import JobScrapeConfig, PersonaConfig, read_config
+from scrape.log import configure_logging, logger
 
-from scrape.builtinscrape import parse_results
-from scrape.configs import read_config
-from scrape.coverletterwriter import CoverLetterWriter
-from scrape.log import logger
-from scrape.namefetcher import NameFetcher
+# each command imports the modules it needs when it runs, so that a short
+# invocation, such as a render, doesn't pay for the scraping stack at startup
 
-config, persona = read_config("./config.json")
-querystring = config.querystring
-builtinnyc = config.url_builtin
 
-
-def main() -> None:
+def scrape(
+    config: JobScrapeConfig,
+    persona: PersonaConfig,
+    resume: bool = False,
+    render_letters: bool = True,
+) -> None:
     """jobscraper takes the provided querystring, searches for job results,
     and for each of those job results generates a cover letter.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+        persona (PersonaConfig): information on you, the applicant.
+        resume (bool): continue the previous run. Defaults to False.
+        render_letters (bool): write the letters, or stop once each contact is resolved. Defaults to True.
     """
-    start = perf_counter()
-    for page in range(0, config.total_pages):
-        page_dict = {"page": page}
-        querystring.update(page_dict)
-        company_collection = parse_results(builtinnyc, querystring, page, config)
-
-        for idx, company in enumerate(
-            tqdm(company_collection, desc="Writing Letter", unit="contact")
-        ):
-            business_card = NameFetcher(
-                company=company, config=config
-            ).parse_provided_search_queries()
+    from scrape.coverletterwriter import close_batch
+    from scrape.journal import RunJournal
+    from scrape.output_sink import close_sink
+
+    with exported_metrics(config), run_services(config):
+        start = perf_counter()
+        journal = RunJournal.from_config(config, resume=resume)
+        try:
+            if config.run_mode == "pipeline":
+                from scrape.pipeline import run_pipeline
+
+                run_pipeline(config, persona, journal, render_letters=render_letters)
+            else:
+                from scrape.serial import run_serial
+
+                run_serial(config, persona, journal, render_letters=render_letters)
+        finally:
+            try:
+                # the letters of a batch are recorded in the journal as its last file is written,
+                # and those of a sink writing behind as their files are
+                close_batch()
+                close_sink()
+            finally:
+                logger.info("Run progress: %s", journal.progress())
+                journal.close()
+        elapsed = perf_counter() - start
+        logger.info("Job search finished in %s seconds.", elapsed)  # type: ignore
+
+
+def enqueue(config: JobScrapeConfig) -> None:
+    """enqueue fetches the listings and looks up their companies,
+    queueing each job for the workers to resolve and write.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+    """
+    from scrape.distributed import run_coordinator
+    from scrape.work_queue import WorkQueue
+
+    with exported_metrics(config), run_services(config):
+        start = perf_counter()
+        queue = WorkQueue.from_config(config)
+        try:
+            enqueued = run_coordinator(config, queue)
+        finally:
+            queue.close()
+        logger.info("Queued %s jobs in %s seconds.", enqueued, perf_counter() - start)
 
+
+def work(
+    config: JobScrapeConfig,
+    persona: PersonaConfig,
+    worker_id: str = "",
+    render_letters: bool = True,
+) -> None:
+    """work runs a worker, claiming jobs from the queue until it is empty.
+    Start as many as you like, on this host, or, with config.queue_shared set,
+    on any other that shares the queue file.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+        persona (PersonaConfig): information on you, the applicant.
+        worker_id (str): the worker's name in the queue. Defaults to its host and process id.
+        render_letters (bool): write the letters, or only resolve the contacts. Defaults to True.
+    """
+    from scrape.coverletterwriter import close_batch
+    from scrape.distributed import run_worker
+    from scrape.output_sink import close_sink
+    from scrape.work_queue import WorkQueue
+
+    with exported_metrics(config), run_services(config):
+        queue = WorkQueue.from_config(config)
+        try:
+            run_worker(config, persona, queue, worker_id, render_letters=render_letters)
+        finally:
+            try:
+                # letters still being written acknowledge their jobs once their files are
+                close_batch()
+                close_sink()
+            finally:
+                queue.close()
+
+
+@contextmanager
+def run_services(config: JobScrapeConfig):
+    """Sets up what every scraping command shares: fixtures, the HTTP client, the caches,
+    the search provider, the dataset and the run memo; and reports on and closes them once the block ends.
+    """
+    from scrape.coverletterwriter import close_batch
+    from scrape.dataset import configure_dataset
+    from scrape.fixtures import configure_fixtures
+    from scrape.http_client import configure_client
+    from scrape.output_sink import close_sink
+    from scrape.response_cache import configure_cache
+    from scrape.run_memo import reset_run_memo
+    from scrape.search_provider import configure_search
+
+    fixtures = configure_fixtures(config)
+    client = configure_client(config)
+    cache = configure_cache(config)
+    searcher = configure_search(config)
+    dataset = configure_dataset(config)
+    run_memo = reset_run_memo()
+    try:
+        yield
+    finally:
+        close_batch()
+        close_sink()
+        logger.info("Shared across searches: %s", run_memo.stats())
+        if dataset is not None:
+            dataset.close()
+            logger.info("Wrote %s rows to %s", dataset.rows, dataset.path)
+        for host, counts in client.stats().items():
             logger.info(
-                "Writing cover letter to %s at %s for the role of %s",
-                business_card.fullname,
-                business_card.workplace,
-                company_collection[idx].job_name,
-            )  # type: ignore
-            CoverLetterWriter(
-                company, contact=business_card, persona=persona, config=config
-            ).write()
-
-    elapsed = perf_counter() - start
-    logger.info("Job search finished in %s seconds.", elapsed)  # type: ignore
+                "%s: %s requests over %s connections (%s reused)",
+                host,
+                counts["requests"],
+                counts["connections"],
+                counts["reused"],
+            )
+        client.close()
+        if cache is not None:
+            logger.info("Response cache: %s", cache.stats())
+            cache.close()
+        if searcher.memo is not None:
+            logger.info("Search memo: %s", searcher.memo.stats())
+        searcher.close()
+        if fixtures is not None:
+            fixtures.close()
+
+
+def render(config: JobScrapeConfig, persona: PersonaConfig, from_queue: bool = False) -> None:
+    """render writes the letters of every contact the journal holds that has no letter yet,
+    without touching the network.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+        persona (PersonaConfig): information on you, the applicant.
+        from_queue (bool): write the letters of the contacts resolve-only workers left in the queue,
+        rather than the journal's. Defaults to False.
+    """
+    from scrape.coverletterwriter import close_batch, write_letters
+    from scrape.journal import RunJournal
+    from scrape.output_sink import close_sink
+
+    if from_queue:
+        render_queue(config, persona)
+        return
+
+    with exported_metrics(config):
+        start = perf_counter()
+        journal = RunJournal.from_config(config, resume=True)
+        try:
+            pending = journal.pending_letters()
+            logger.info("Writing %s letters from %s", len(pending), journal.path)
+            write_letters(
+                pending,
+                config,
+                persona,
+                processes=config.render_processes,
+                on_written=journal.mark_letter,
+                on_failed=lambda company, error_found: journal.mark_failure(
+                    company.job_id, "letter_written", error_found
+                ),
+            )
+        finally:
+            try:
+                close_batch()
+                close_sink()
+            finally:
+                logger.info("Run progress: %s", journal.progress())
+                journal.close()
+        logger.info("Rendering finished in %s seconds.", perf_counter() - start)
+
+
+def render_queue(config: JobScrapeConfig, persona: PersonaConfig) -> None:
+    """render_queue writes the letters of every done job in the queue that has no letter yet,
+    such as those of resolve-only workers, without touching the network.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+        persona (PersonaConfig): information on you, the applicant.
+    """
+    from scrape.company_result import CompanyResult
+    from scrape.coverletterwriter import close_batch, write_letters
+    from scrape.output_sink import close_sink
+    from scrape.work_queue import WorkQueue
+
+    def letter_failed(company: CompanyResult, error_found: Exception) -> None:
+        logger.warning("The letter of %s failed: %r", company.job_id, error_found)
+
+    with exported_metrics(config):
+        start = perf_counter()
+        queue = WorkQueue.from_config(config)
+        try:
+            pending = queue.render_pending()
+            logger.info("Writing %s letters from %s", len(pending), queue.path)
+            write_letters(
+                pending,
+                config,
+                persona,
+                processes=config.render_processes,
+                on_written=queue.mark_rendered,
+                on_failed=letter_failed,
+            )
+        finally:
+            try:
+                close_batch()
+                close_sink()
+            finally:
+                logger.info("Queue: %s", queue.counts())
+                queue.close()
+        logger.info("Rendering finished in %s seconds.", perf_counter() - start)
+
+
+@contextmanager
+def exported_metrics(config: JobScrapeConfig):
+    """Turns metrics on as the config says, exporting them while the block runs and once it ends."""
+    from scrape.metrics import TextfileExporter, configure_metrics
+
+    start = perf_counter()
+    metrics = configure_metrics(config)
+    exporter = None
+    if metrics.enabled and config.metrics_textfile_path:
+        exporter = TextfileExporter(
+            metrics, config.metrics_textfile_path, config.metrics_textfile_interval
+        ).start()
+    try:
+        yield metrics
+    finally:
+        if exporter is not None:
+            exporter.stop()
+        if metrics.enabled:
+            metrics.inc("run_seconds_total", perf_counter() - start)
+            if config.metrics_json_path:
+                metrics.write_json(config.metrics_json_path)
+
+
+def build_parser() -> ArgumentParser:
+    """Builds the command line: scrape (the default), resolve, render, enqueue, worker and bench."""
+    parser = ArgumentParser(
+        description="Searches a job board and writes a cover letter for each listing."
+    )
+    parser.add_argument(
+        "--config", default="./config.json", help="the config file. Defaults to ./config.json"
+    )
+    parser.set_defaults(
+        resume=False, text_only=False, worker_id="", resolve_only=False, from_queue=False
+    )
+    # lets --config also follow the command, without overriding it when it doesn't
+    common = ArgumentParser(add_help=False)
+    common.add_argument("--config", default=SUPPRESS, help=SUPPRESS)
+    resume = ArgumentParser(add_help=False)
+    resume.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue the previous run, skipping the work its journal records as done",
+    )
+    text_only = ArgumentParser(add_help=False)
+    text_only.add_argument(
+        "--text-only",
+        action="store_true",
+        help="write only the .txt letters, without loading ReportLab",
+    )
+
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser(
+        "scrape",
+        parents=[common, resume, text_only],
+        help="search for listings, resolve their contacts and write their letters",
+    )
+    commands.add_parser(
+        "resolve",
+        parents=[common, resume],
+        help="search for listings and resolve their contacts into the journal, writing no letters",
+    )
+    render_command = commands.add_parser(
+        "render",
+        parents=[common, text_only],
+        help="write the letters of the contacts the journal holds, offline",
+    )
+    render_command.add_argument(
+        "--from-queue",
+        action="store_true",
+        help="write the letters of the contacts resolve-only workers left in the queue instead",
+    )
+    commands.add_parser(
+        "enqueue",
+        parents=[common],
+        help="search for listings and queue their jobs for workers to resolve and write",
+    )
+    worker = commands.add_parser(
+        "worker",
+        parents=[common, text_only],
+        help="claim queued jobs, resolving their contacts and writing their letters",
+    )
+    worker.add_argument(
+        "--id",
+        dest="worker_id",
+        default="",
+        help="the worker's name in the queue. Defaults to its host and process id",
+    )
+    worker.add_argument(
+        "--resolve-only",
+        action="store_true",
+        help="resolve the contacts into the queue, writing no letters; see render --from-queue",
+    )
+    # the benchmark parses its own options
+    commands.add_parser(
+        "bench",
+        add_help=False,
+        help="benchmark a run against synthetic fixtures; see benchmarks/bench_pipeline.py",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Runs the command given on the command line."""
+    parser = build_parser()
+    args, bench_args = parser.parse_known_args(argv)
+    if args.command == "bench":
+        from benchmarks.bench_pipeline import main as bench_main
+
+        bench_main(bench_args)
+        return
+    if bench_args:
+        parser.error(f"unrecognized arguments: {' '.join(bench_args)}")
+
+    config, persona = read_config(args.config)
+    configure_logging(config)
+    if args.text_only:
+        config.text_only = True
+    if args.command == "render":
+        render(config, persona, from_queue=args.from_queue)
+    elif args.command == "enqueue":
+        enqueue(config)
+    elif args.command == "worker":
+        work(config, persona, args.worker_id, render_letters=not args.resolve_only)
+    else:
+        scrape(
+            config,
+            persona,
+            resume=args.resume,
+            render_letters=args.command != "resolve",
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,66 @@
+from collections import deque
+from typing import Iterable
+
+
+class BrandMatcher:
+    """BrandMatcher is an Aho-Corasick automaton over the brand names.
+    One pass over a url or a page's text finds every brand it contains,
+    however many brands there are.
+    """
+
+    def __init__(self, brands: Iterable[str]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.outputs: list[list[str]] = [[]]
+        self.matches_empty = False
+
+        for brand in dict.fromkeys(brands):
+            if not brand:
+                # "" is in every string, as it was for the substring test
+                self.matches_empty = True
+                continue
+            state = 0
+            for char in brand:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                state = next_state
+            self.outputs[state].append(brand)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.outputs[next_state] = (
+                    self.outputs[next_state] + self.outputs[self.fail[next_state]]
+                )
+
+    def find_all(self, text: str) -> list[str]:
+        """find_all returns every brand that occurs in text, each once, in the order they are first found.
+
+        Args:
+            text (str): a url or a page's text.
+
+        Returns:
+            list[str]: the brands found.
+        """
+        found: dict[str, None] = {"": None} if self.matches_empty else {}
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found.update(dict.fromkeys(outputs[state]))
+        return list(found)
+
@@ -1,57 +1,305 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
+from dataclasses import dataclass
 from json import JSONDecodeError
+from threading import Lock
+from typing import Iterator
 
 from requests import HTTPError, RequestException
 from tqdm import tqdm
 
 from scrape.company_result import CompanyResult
 from scrape.configs import JobScrapeConfig
-from scrape.web_scraper import webscrape_results
+from scrape.json_stream import iter_array_items
+from scrape.log import log_context, logger
+from scrape.metrics import timed
+from scrape.run_memo import get_run_memo
+from scrape.web_scraper import stream_bytes, webscrape_results
+
+# the fields of a CompanyResult company_lookup fills in, bar the lists
+PROFILE_FIELDS = (
+    "street_address", "suite", "city", "state", "zip", "mission", "url", "twitter", "email"
+)
+
+
+@dataclass
+class ListingEntry:
+    """dataclass of one job listing, before its company has been looked up"""
+
+    inner_id: int
+    alias: str
+    company_name: str
+    job_name: str
+    job_description: str
+    job_id: str = ""
+    region_id: str = "5"
+
+    def without_company(self) -> CompanyResult:
+        """The listing as a CompanyResult with a blank company profile,
+        for recording a job whose company could not be looked up.
+        """
+        return CompanyResult(
+            inner_id=self.inner_id,
+            alias=self.alias,
+            company_name=self.company_name,
+            job_name=self.job_name,
+            job_description=self.job_description,
+            job_id=self.job_id,
+            **dict.fromkeys(PROFILE_FIELDS, ""),  # type: ignore
+        )  # type: ignore
+
+    def to_company_result(self, company_dict: dict | None) -> CompanyResult | None:
+        """Combines the listing with the company_lookup result of its company,
+        or returns None, skipping the listing, if its company could not be looked up.
+        """
+        if company_dict is None:
+            logger.warning(
+                "%s could not be looked up, skipping %s.", self.alias, self.job_name
+            )
+            return None
+        return CompanyResult(
+            inner_id=self.inner_id,
+            alias=self.alias,
+            company_name=self.company_name,
+            job_name=self.job_name,
+            job_description=self.job_description,
+            job_id=self.job_id,
+            **company_dict,  # type: ignore
+        )  # type: ignore
 
 
 def parse_results(
-    base_url: str, querystring, page: int, config: JobScrapeConfig
+    base_url: str, querystring, page: int, config: JobScrapeConfig, region_id: str = "5"
+) -> list[CompanyResult]:
+    """parse_results fetches one listing page and looks up the company of every listing in it,
+    with up to config.lookup_concurrency lookups at once. The run modes read their pages
+    through prefetch_listings or stream_listing_entries instead, and look them up as they go;
+    this fetches and looks up a single page in one call.
+
+    Args:
+        base_url (str): the job-retrieval endpoint.
+        querystring: the search parameters, including the page.
+        page (int): the number of the page, for the progress bar.
+        config (JobScrapeConfig): the run configuration.
+        region_id (str): the region the companies are looked up in. Defaults to "5", New York.
+
+    Returns:
+        list[CompanyResult]: the listings and their companies, in page order,
+        without the listings whose company could not be looked up.
+    """
+    docs = webscrape_results(base_url, querystring=querystring)  # type: ignore
+    return company_results(docs, page, config, region_id)  # type: ignore
+
+
+def company_results(
+    docs: dict, page: int, config: JobScrapeConfig, region_id: str = "5"
 ) -> list[CompanyResult]:
-    """Takes the params provided in main.py and generates dataclasses for
-    each job listing in BuiltInNYC, the job name, company info, and so forth.
+    """company_results looks up the company of every listing in an already fetched listing page.
+
+    Args:
+        docs (dict): a listing page as returned by the job-retrieval endpoint.
+        page (int): the number of the page, for the progress bar.
+        config (JobScrapeConfig): the run configuration.
+        region_id (str): the region the companies are looked up in. Defaults to "5", New York.
+
+    Returns:
+        list[CompanyResult]: the listings and their companies, in page order,
+        without the listings whose company could not be looked up.
     """
-    company_results = []
-    docs = webscrape_results(base_url, querystring=querystring)  # type:ignore
-    jobs = [item.get("title") for item in docs["jobs"]]
-    job_desc = [item.get("body") for item in docs["jobs"]]
-    company_names = [item.get("title") for item in docs["companies"]]
-    alii = [item.get("alias") for item in docs["companies"]]
-    for idx, company in enumerate(
-        tqdm(
-            company_names,
+    entries = listing_entries(docs, region_id)
+    company_dicts = lookup_companies(
+        [entry.alias for entry in entries], config.lookup_concurrency, region_id
+    )
+    companies = [
+        entry.to_company_result(company_dict)
+        for entry, company_dict in tqdm(
+            zip(entries, company_dicts),
+            total=len(entries),
             desc=f"Evaluating Companies | Bundle {page} of {config.total_pages}",
             unit="company",
         )
+    ]
+    return [company for company in companies if company is not None]
+
+
+def stream_listing_entries(
+    base_url: str, querystring: dict, region_id: str = "5", descriptions: bool = True
+) -> Iterator[ListingEntry]:
+    """stream_listing_entries decodes a listing page as it downloads,
+    yielding each job as soon as both it and the company that posted it have arrived.
+    The endpoint sends the jobs and companies as two parallel arrays, so the entries of
+    whichever array comes first are held until their partners arrive,
+    keeping only the fields a ListingEntry needs. builtin sends the jobs array first,
+    so in practice every job of the page is buffered, and the entries only start to flow
+    once the companies array does: what streaming saves is the decoded page, and the wait
+    for the rest of the companies, not the wait for the jobs. Without descriptions,
+    the job bodies, full HTML descriptions the letters never use, are dropped as they are decoded,
+    so that what is buffered stays small however many jobs a page holds.
+
+    Args:
+        base_url (str): the job-retrieval endpoint.
+        querystring (dict): the search parameters, including the page.
+        region_id (str): the region of the search. Defaults to "5", New York.
+        descriptions (bool): keep each job's description. Defaults to True.
+
+    Yields:
+        ListingEntry: the listings, in page order.
+    """
+    jobs: deque = deque()
+    companies: deque = deque()
+    idx = 0
+    for key, item in iter_array_items(
+        stream_bytes(base_url, querystring=querystring), {"jobs", "companies"}
     ):
-        alias = alii[idx][9:]
-        company_dict = company_lookup(alias)
-        results = CompanyResult(
-            inner_id=idx,
-            alias=alias,
-            company_name=company,
-            job_name=jobs[idx],
-            job_description=job_desc[idx],
-            **company_dict,  # type: ignore
-        )  # type: ignore
-        company_results.append(results)
-    return company_results
+        if key == "jobs":
+            jobs.append(
+                {
+                    "id": item.get("id"),
+                    "title": item.get("title"),
+                    "body": item.get("body") if descriptions else "",
+                }
+            )
+        else:
+            companies.append({"title": item.get("title"), "alias": item.get("alias")})
+        while jobs and companies:
+            yield listing_entry(idx, jobs.popleft(), companies.popleft(), region_id)
+            idx += 1
+    if companies:
+        raise IndexError("The listing page has more companies than jobs.")
+
+
+def prefetch_listings(
+    base_url: str, querystring: dict, total_pages: int, depth: int = 2
+) -> Iterator[tuple[int, dict]]:
+    """prefetch_listings fetches listing pages up to depth pages ahead of the one being consumed,
+    each with its own copy of the querystring, and yields them in page order.
+    Once a page comes back without jobs, no later pages are requested.
+    Pages that fail to fetch are logged and skipped.
+
+    Args:
+        base_url (str): the job-retrieval endpoint.
+        querystring (dict): the search parameters, without the page.
+        total_pages (int): the most pages to fetch.
+        depth (int): how many pages may be in flight at once. Defaults to 2.
+
+    Yields:
+        tuple[int, dict]: each page number and its listing page.
+    """
+    last_page = [total_pages]
+    lock = Lock()
+
+    def fetch(page: int):
+        docs = webscrape_results(base_url, querystring={**querystring, "page": page})  # type: ignore
+        if isinstance(docs, dict) and not docs.get("jobs"):
+            with lock:
+                last_page[0] = min(last_page[0], page)
+        return docs
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, depth), thread_name_prefix="listing_prefetch"
+    ) as executor:
+        in_flight: deque = deque()
+        next_page = 0
+        while True:
+            while next_page < last_page[0] and len(in_flight) < max(1, depth):
+                in_flight.append((next_page, executor.submit(fetch, next_page)))
+                next_page += 1
+            if not in_flight:
+                return
+            page, future = in_flight.popleft()
+            docs = future.result()
+            if page >= last_page[0]:
+                for _page, pending in in_flight:
+                    pending.cancel()
+                return
+            if docs is None:
+                logger.warning("Listing page %s could not be fetched, skipping it.", page)
+                continue
+            yield page, docs
+
+
+def listing_entries(docs: dict, region_id: str = "5") -> list[ListingEntry]:
+    """listing_entries pairs each job in a listing page with the company that posted it.
+
+    Args:
+        docs (dict): a listing page as returned by the job-retrieval endpoint.
+        region_id (str): the region of the search. Defaults to "5", New York.
+
+    Returns:
+        list[ListingEntry]: the listings, in page order.
+    """
+    jobs = docs["jobs"]
+    return [
+        listing_entry(idx, jobs[idx], company, region_id)
+        for idx, company in enumerate(docs["companies"])
+    ]
+
+
+def listing_entry(idx: int, job: dict, company: dict, region_id: str = "5") -> ListingEntry:
+    """Builds the ListingEntry of one job and the company that posted it."""
+    alias = company.get("alias")[9:]  # type: ignore
+    return ListingEntry(
+        inner_id=idx,
+        alias=alias,
+        company_name=company.get("title"),  # type: ignore
+        job_name=job.get("title"),  # type: ignore
+        job_description=job.get("body"),  # type: ignore
+        # builtin's job id, falling back to the company and title for listings without one
+        job_id=str(job.get("id") or f"{alias}:{job.get('title')}"),
+        region_id=region_id,
+    )
+
+
+def lookup_companies(alii: list[str], concurrency: int = 1, region_id: str = "5"):
+    """lookup_companies runs company_lookup for every alias,
+    yielding the results in the same order as the aliases were given.
+    A company already looked up earlier in the run is not looked up again.
+
+    Args:
+        alii (list[str]): the company aliases to look up.
+        concurrency (int): how many lookups may be in flight at once.
+        1 looks them up one at a time. Defaults to 1.
+        region_id (str): the region the companies are looked up in. Defaults to "5", New York.
+
+    Yields:
+        The company_lookup result of each alias, in alias order.
+    """
+    regions = [region_id] * len(alii)
+    if concurrency <= 1:
+        yield from map(shared_company_lookup, alii, regions)
+        return
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="company_lookup"
+    ) as executor:
+        yield from executor.map(shared_company_lookup, alii, regions)
+
+
+def shared_company_lookup(company_alias: str, region_id: str = "5"):
+    """shared_company_lookup runs company_lookup once per company alias and region for the whole run,
+    handing every later listing of the company in that region, whichever search it came from,
+    the same result. A failed lookup isn't kept, so the company's next listing tries again.
+    """
+    with log_context(stage="lookup", company_id=company_alias):
+        return get_run_memo().companies.get(
+            # the profile, and its address, is read from the region's builtin site
+            (company_alias, region_id),
+            lambda: company_lookup(company_alias, region_id),
+            keep=lambda company_dict: company_dict is not None,
+        )
 
 
-def company_lookup(company_alias: str):
-    """Looks up the company JSON in BuiltInNYC.
-    It passes this along to the superceding parse_results method,
+@timed("company_lookup_seconds")
+def company_lookup(company_alias: str, region_id: str = "5"):
+    """Looks up the company JSON in BuiltInNYC, or in the builtin site of region_id.
+    It passes this along to ListingEntry.to_company_result,
     which places it within the CompanyResult dataclass.
     """
     with suppress(
         JSONDecodeError, RequestException, HTTPError, TypeError, AttributeError
     ):
         company_page_url = f"https://api.builtin.com/companies/alias/{company_alias}"
-        comp_docs = webscrape_results(company_page_url, querystring={"region_id": "5"})  # type: ignore
+        comp_docs = webscrape_results(company_page_url, querystring={"region_id": region_id})  # type: ignore
         industries = [item.get("name") for item in comp_docs["industries"]]
         data = {
             "street_address": comp_docs.get("street_address_1"),
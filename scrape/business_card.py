@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+
+@dataclass(order=True, slots=True)
+class BusinessCard:
+    """dataclass of the contact a cover letter is addressed to, and the greeting to address them with"""
+
+    greeting: str
+    fname: str
+    surname: str
+    fullname: str
+    workplace: str
@@ -1,7 +1,7 @@
 from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(slots=True)
 class CompanyResult:
     """dataclass of the company"""
 
@@ -21,3 +21,4 @@ class CompanyResult:
     zip: str
     industries: list[str] = field(default_factory=list)
     adjectives: list[str] = field(default_factory=list)
+    job_id: str = ""
@@ -40,6 +40,112 @@ class JobScrapeConfig:
     site_queries: list[str] = field(default_factory=list)
     querystring: dict = field(default_factory=dict)
     persona: dict = field(default_factory=dict)
+    region_id: str = "5"
+    searches: list[dict] = field(default_factory=list)
+    pool_size: int = 10
+    connect_timeout: float = 5.0
+    read_timeout: float = 20.0
+    request_delay: float = 1.5
+    rate_limit_burst: int = 1
+    rate_limits: dict = field(default_factory=dict)
+    max_retries: int = 3
+    backoff_base: float = 1.0
+    backoff_max: float = 60.0
+    breaker_threshold: int = 5
+    breaker_cooldown: float = 120.0
+    lookup_concurrency: int = 1
+    prefetch_pages: int = 2
+    cache_path: str = "jobscraper_cache.sqlite"
+    cache_max_bytes: int = 256 * 1024 * 1024
+    cache_default_ttl: float = 86400
+    cache_ttls: dict = field(default_factory=dict)
+    cache_bypass: bool = False
+    lexicon_path: str = "./words/lexicon.bin"
+    streaming_extraction: bool = True
+    page_max_bytes: int = 2 * 1024 * 1024
+    page_max_candidates: int = 20
+    run_mode: str = "serial"
+    pipeline_workers: dict = field(default_factory=dict)
+    pipeline_queue_size: int = 8
+    render_processes: int = 0
+    journal_path: str = ""
+    journal_max_attempts: int = 3
+    fixture_mode: str = ""
+    fixture_dir: str = "fixtures"
+    replay_latency: float = 0.0
+    metrics_enabled: bool = False
+    metrics_json_path: str = ""
+    metrics_textfile_path: str = ""
+    metrics_textfile_interval: float = 15.0
+    search_provider: str = "google"
+    search_results: int = 3
+    search_pause: float = 4.0
+    search_api_url: str = ""
+    search_api_key: str = ""
+    search_api_key_header: str = "X-Goog-Api-Key"
+    search_api_params: dict = field(default_factory=dict)
+    search_memo_path: str = "jobscraper_search.sqlite"
+    search_memo_ttl: float = 604800
+    resolution_threshold: float = 0.9
+    resolution_min_score: float = 0.5
+    streaming_listings: bool = False
+    dataset_dir: str = ""
+    dataset_batch_size: int = 500
+    letter_template: str = "./templates/cover_letter.txt"
+    text_only: bool = False
+    pdf_output: str = "per_letter"
+    pdf_batch_letters: int = 100
+    write_behind: bool = False
+    write_behind_queue: int = 64
+    log_level: str = "INFO"
+    log_format: str = "text"
+    log_path: str = ""
+    log_sampling: dict = field(default_factory=dict)
+    log_rate_limit: float = 0.0
+    queue_path: str = ""
+    queue_lease_seconds: float = 600.0
+    queue_max_attempts: int = 3
+    queue_claim_batch: int = 1
+    queue_poll_interval: float = 5.0
+    queue_shared: bool = False
+    worker_report_interval: float = 60.0
+
+
+@dataclass
+class ListingSearch:
+    """A dataclass describing one listing search of a run: its querystring,
+    and the region its companies are looked up in.
+    """
+
+    name: str
+    querystring: dict
+    region_id: str
+    url_builtin: str
+
+
+def listing_searches(config: JobScrapeConfig) -> list[ListingSearch]:
+    """listing_searches returns the listing searches a run covers.
+    Each entry of config.searches may set a "name", a "region_id", a "url_builtin"
+    and a "querystring", which is laid over config.querystring;
+    whatever it leaves out is taken from the config.
+    Without any searches, the run covers config.querystring alone.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+
+    Returns:
+        list[ListingSearch]: the searches, in the order they are run.
+    """
+    searches = config.searches or [{"name": "default"}]
+    return [
+        ListingSearch(
+            name=search.get("name", f"search {number}"),
+            querystring={**config.querystring, **search.get("querystring", {})},
+            region_id=str(search.get("region_id", config.region_id)),
+            url_builtin=search.get("url_builtin", config.url_builtin),
+        )
+        for number, search in enumerate(searches, start=1)
+    ]
 
 
 def read_config(config_file: str):
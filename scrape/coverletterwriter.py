@@ -1,22 +1,23 @@
+import copy
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import partial
+from threading import Lock
+from typing import TYPE_CHECKING, Callable
 
-import reportlab.rl_config
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.platypus import Image, Paragraph, SimpleDocTemplate
-
+from scrape.business_card import BusinessCard  # type: ignore
 from scrape.company_result import CompanyResult  # type: ignore
 from scrape.configs import JobScrapeConfig, PersonaConfig  # type: ignore
-from scrape.dir import change_dir  # type: ignore
-from scrape.namefetcher import BusinessCard  # type: ignore
-from scrape.striptags import strip_tags  # type: ignore
-
-reportlab.rl_config.warnOnMissingFontGlyphs = 0  # type: ignore
+from scrape.letter_template import load_template  # type: ignore
+from scrape.log import configure_logging, log_context  # type: ignore
+from scrape.metrics import timed  # type: ignore
+from scrape.output_sink import get_sink  # type: ignore
 
+if TYPE_CHECKING:
+    # reportlab is only imported once a PDF is written, so text-only runs never load it
+    from scrape.letter_renderer import LetterBatch, LetterRenderer
 
 now = datetime.now()
 date = now.strftime("%y%m%d")
@@ -31,6 +32,7 @@ class CoverLetterWriter:
         contact: BusinessCard,
         persona: PersonaConfig,
         config: JobScrapeConfig,
+        renderer: "LetterRenderer | None" = None,
     ):
         self.company = company
         self.job = company.job_name
@@ -38,48 +40,52 @@ class CoverLetterWriter:
         self.persona = persona
         self.config = config
         self.hiring_manager = f"{self.contact.greeting} {self.contact.fullname}"
-        self.pdfmetrics = pdfmetrics
+        self.renderer = renderer
+        self.template = load_template(config.letter_template)
         self.reference = "BuiltInNYC"
         self.letter_date = now.strftime("%B %d, %Y")
         self.letter_title = f"{date}_{self.company.company_name}_{self.persona.name}_{random.randint(0,100)}.pdf"
-        self.export_dir = f"{date}_{config.export_dir}"
-
-        self.address = ""
-        self.intro = ""
-        self.salut = ""
-        self.body = ""
-        self.outro = ""
-        self.close = ""
-        self.whole_letter = ""
-        self.signature = Image(
-            filename=self.persona.signature, width=80, height=40, hAlign="LEFT"
-        )
+        self.export_dir = export_root(config)
+        self.sink = get_sink(config, self.export_dir)
 
-        self.cover_letter = SimpleDocTemplate(
-            self.letter_title,
-            pagesize=letter,
-            rightMargin=inch,
-            leftMargin=inch,
-            topMargin=inch,
-            bottomMargin=inch,
-            title=self.letter_title,
-            author=self.persona.name,
-            creator=self.persona.name,
-            subject=f"{self.persona.name}'s Cover Letter for {self.company.company_name}",
-        )
+        self.fields: dict[str, str] = {}
+        self.whole_letter = ""
         self.cl_flowables = []
-        self.styles = getSampleStyleSheet()
 
-    def write(self):
-        """write _summary_"""
-        self.register_fonts()
-        self.add_styles()
-        self.letter_construction()
-
-        with change_dir(self.export_dir):
-            with change_dir(f"{self.company.company_name}"):
-                self.make_coverletter_pdf()
-                self.make_coverletter_txt()
+    def write(
+        self,
+        on_written: Callable[[CompanyResult], None] | None = None,
+        on_failed: Callable[[CompanyResult, Exception], None] | None = None,
+    ):
+        """write writes the letter's .txt and .pdf, or adds the letter to the run's batch.
+
+        Args:
+            on_written (Callable[[CompanyResult], None] | None): called with the company once the letter's files
+            are on disk; for a batched letter, that is once the batch's file holding it is too. With the sink
+            writing behind, it is called on the sink's thread, after write has returned.
+            on_failed (Callable[[CompanyResult, Exception], None] | None): called with the company and the error
+            should one of those files fail to be written, in place of on_written.
+            Errors raised while building the letter are raised as usual.
+        """
+        with log_context(stage="render", company_id=self.company.alias, job_id=self.company.job_id):
+            self.letter_construction()
+            files = [self.coverletter_txt()]
+            batch = letter_batch(self.config, self.persona)
+            if batch is None and not self.config.text_only:
+                files.append(self.coverletter_pdf())
+            if on_written is None and on_failed is None:
+                self.sink.write_files(files)
+                if batch is not None:
+                    batch.add(self.company.company_name, self.letter_flowables())
+                return
+            report = LetterReport(
+                self.company, 1 if batch is None else 2, on_written, on_failed
+            )
+            self.sink.write_files(files, report.done)
+            if batch is not None:
+                batch.add(
+                    self.company.company_name, self.letter_flowables(), report.done, report.done
+                )
 
     def create_heresay(self) -> str:
         """ingratiate _summary_
@@ -108,101 +114,267 @@ class CoverLetterWriter:
 
         return f"I've heard great things about {self.company.company_name}'s impact on the {industry_type}."
 
+    def letter_fields(self) -> dict[str, str]:
+        """letter_fields collects the values the letter template fills in."""
+        return {
+            "company_name": self.company.company_name,
+            "street_address": self.company.street_address,
+            "city": self.company.city,
+            "state": self.company.state,
+            "persona_name": self.persona.name,
+            "letter_date": self.letter_date,
+            "hiring_manager": self.hiring_manager,
+            "role": self.persona.role,
+            "heresay": " ".join(self.create_heresay().split()),
+            "job": self.job,
+            "values": self.persona.values,
+            "reference": self.reference,
+            "tool_1": (self.persona.tools[random.randint(0, 1)]).title(),
+            "tool_2": (self.persona.tools[random.randint(1, 2)]).title(),
+            "tool_3": (self.persona.tools[random.randint(3, 4)]).title(),
+            "excitement": random.choice(self.config.excitement_words),
+            "phone_number": self.persona.phone_number,
+            "email": self.persona.email,
+            "portfolio": self.persona.portfolio,
+        }
+
     def letter_construction(self):
-        """The collection of strings and variables that make up the copy of the cover letter."""
-        excitement_noun: str = random.choice(self.config.excitement_words)
-        heresay = self.create_heresay()
-
-        self.address: str = f"<b>{self.company.company_name}</b><br />\
-                            {self.company.street_address}<br />\
-                            {self.company.city}, {self.company.state}<br /><br />"
-
-        self.intro: str = f"{self.persona.name}<br />\
-                        {self.letter_date}<br /><br />\
-                        {self.hiring_manager},"
-
-        self.salut: str = f"As a {self.persona.role}, I enjoy seeing how people can come together to generate design solutions.\
-                {heresay}\
-                That's why I'm writing to express my interest in the <b>{self.job}</b> role at <b>{self.company.company_name}</b>\
-                where I believe that my {self.persona.values} will be a major value contribution to the design team \
-                at {self.company.company_name}.<br />"
-
-        self.body: str = f'As requested on {self.reference}, I am proficient in {(self.persona.tools[random.randint(0,1)]).title()}, {(self.persona.tools[random.randint(1,2)]).title()}, \
-                and {(self.persona.tools[random.randint(3,4)]).title()}. I also am a Community Advisor for the Anti-Defamation League\'s new \
-                <a href="https://socialpatterns.adl.org/about/" color="blue">Social Patterns Library</a>\
-                and I\'m the co-founder of the <a href="https://www.prosocialdesign.org/" color="blue">Prosocial Design Network</a>,\
-                a 501(c)3 that explores how digital media might bring out the best in human nature through behavioral science.'
-
-        self.outro: str = f'I\'d be {excitement_noun} to have the opportunity to further discuss the position and your needs for the role.\
-                My phone number is {self.persona.phone_number}, and my email is {self.persona.email}.\
-                My portfolio may be found at <a href="https://{self.persona.portfolio}" color="blue">{self.persona.portfolio}</a>.<br />'
-
-        self.close: str = "Thank You For Your Consideration,<br />"
-
-        self.whole_letter: str = f"{self.address} {self.intro} {self.salut} {self.body} {self.outro} {self.close} {self.persona.name}"
-
-    def register_fonts(self):
-        """This registers the fonts for use in the PDF, querying them from the config.json file."""
-        self.pdfmetrics.registerFont(TTFont("IBMPlex", self.config.font_regular))
-        self.pdfmetrics.registerFont(TTFont("IBMPlexBd", self.config.font_bold))
-        self.pdfmetrics.registerFont(TTFont("IBMPlexIt", self.config.font_italic))
-        self.pdfmetrics.registerFont(TTFont("IBMPlexBI", self.config.font_bolditalic))
-        self.pdfmetrics.registerFontFamily(
-            "IBMPlex",
-            normal="IBMPlex",
-            bold="IBMPlexBd",
-            italic="IBMPlexIT",
-            boldItalic="IBMPlexBI",
+        """Fills in the letter template, keeping the fields for the PDF and rendering the plain text."""
+        self.fields = self.letter_fields()
+        self.whole_letter = self.template.render_text(self.fields)
+
+    @timed("letter_txt_seconds")
+    def coverletter_txt(self) -> tuple[str, bytes]:
+        """This creates the cover letter as a .txt file, returning its path and contents."""
+        return (
+            os.path.join(
+                self.company.company_name, f"{date}_{self.company.company_name}_CoverLetter.txt"
+            ),
+            self.whole_letter.encode("utf-8"),
         )
 
-    def add_styles(self):
-        """This registers the styles for use in the PDF."""
-        self.styles.add(
-            ParagraphStyle(
-                "Main",
-                parent=self.styles["Normal"],
-                fontName="IBMPlex",
-                spaceBefore=16,
-                fontSize=12,
-                leading=16,
-                firstLineIndent=0,
-            )
-        )
+    def letter_flowables(self) -> list:
+        """letter_flowables sets each section of the letter as a ReportLab Paragraph."""
+        from reportlab.platypus import Paragraph
 
-        self.styles.add(
-            ParagraphStyle("MainBody", parent=self.styles["Main"], firstLineIndent=16)
+        renderer = self.renderer or shared_renderer(self.config, self.persona)
+        self.cl_flowables = [
+            # each letter draws its own copy, sharing the decoded image, as letters may render at once
+            copy.copy(renderer.signature)
+            if section.style is None
+            else Paragraph(markup, style=renderer.styles[section.style])
+            for section, markup in self.template.render_markup(self.fields)
+        ]
+        return self.cl_flowables
+
+    def coverletter_pdf(self) -> tuple[str, bytes]:
+        """This creates the cover letter as .pdf using the ReportLab PDF Library, returning its path and contents."""
+        renderer = self.renderer or shared_renderer(self.config, self.persona)
+        pdf = renderer.build_pdf(
+            self.letter_title, self.letter_flowables(), self.company.company_name
         )
+        return os.path.join(self.company.company_name, self.letter_title), pdf
+
+
+class LetterReport:
+    """LetterReport calls back a letter once each of its parts is written: its own files,
+    and for a batched letter, the batch's file holding it. The letter is reported once,
+    written when every part is, failed on the first part that isn't.
 
-        self.styles.add(
-            ParagraphStyle(
-                "ListItem",
-                parent=self.styles["Main"],
-                spaceBefore=8,
-                firstLineIndent=16,
-                bulletText="•",
+    Args:
+        company (CompanyResult): the company the letter is addressed to.
+        parts (int): how many parts must be written.
+        on_written (Callable[[CompanyResult], None] | None): called with the company once they are.
+        on_failed (Callable[[CompanyResult, Exception], None] | None): called with the company and the error
+        of the first part that failed. Defaults to None, raising the error.
+    """
+
+    def __init__(
+        self,
+        company: CompanyResult,
+        parts: int,
+        on_written: Callable[[CompanyResult], None] | None,
+        on_failed: Callable[[CompanyResult, Exception], None] | None,
+    ):
+        self.company = company
+        self.parts = parts
+        self.on_written = on_written
+        self.on_failed = on_failed
+        self.reported = False
+        self.lock = Lock()
+
+    def done(self, error_found: BaseException | None = None) -> None:
+        """Counts one part as written, or as failed with error_found."""
+        with self.lock:
+            if self.reported:
+                return
+            if error_found is None:
+                self.parts -= 1
+                if self.parts:
+                    return
+            self.reported = True
+        if error_found is None:
+            if self.on_written is not None:
+                self.on_written(self.company)
+        elif self.on_failed is None:
+            raise error_found
+        else:
+            self.on_failed(self.company, error_found)  # type: ignore
+
+
+def export_root(config: JobScrapeConfig) -> str:
+    """The directory the run's letters are written under: config.export_dir, prefixed with the date."""
+    parent, name = os.path.split(os.path.normpath(config.export_dir))
+    return os.path.join(parent, f"{date}_{name}")
+
+
+def shared_renderer(config: JobScrapeConfig, persona: PersonaConfig) -> "LetterRenderer":
+    """Returns the process-wide LetterRenderer, importing ReportLab on first use."""
+    from scrape.letter_renderer import get_renderer
+
+    return get_renderer(config, persona)
+
+
+_batch: "LetterBatch | None" = None
+_batch_lock = Lock()
+
+
+def letter_batch(
+    config: JobScrapeConfig, persona: PersonaConfig, label: str = ""
+) -> "LetterBatch | None":
+    """letter_batch returns the run's shared LetterBatch when config.pdf_output is "batch",
+    opening it on first use, or None when every letter gets its own PDF.
+    A label, given when the batch is opened, is added to the file names,
+    so that processes writing to the same directory don't overwrite each other's files.
+    """
+    global _batch  # pylint: disable=global-statement
+    if config.text_only or config.pdf_output != "batch":
+        return None
+    with _batch_lock:
+        if _batch is None:
+            from scrape.letter_renderer import LetterBatch
+
+            _batch = LetterBatch(
+                shared_renderer(config, persona),
+                get_sink(config, export_root(config)),
+                prefix="_".join(
+                    part for part in (date, persona.name, "CoverLetters", label) if part
+                ),
+                letters_per_file=config.pdf_batch_letters,
             )
-        )
+        return _batch
 
-    def make_coverletter_txt(self):
-        """This creates the cover letter as a .txt file."""
-        self.whole_letter = strip_tags(self.whole_letter).replace("           ", "\n")
 
-        with open(
-            f"{date}_{self.company.company_name}_CoverLetter.txt", "w", encoding="utf-8"
-        ) as text_letter:
-            text_letter.write(self.whole_letter)
+_render_pool: ProcessPoolExecutor | None = None
 
-    def make_coverletter_pdf(self):
-        """This creates the cover letter as .pdf using the ReportLab PDF Library."""
-        self.cl_flowables = [
-            Paragraph(self.address, style=self.styles["Main"]),
-            Paragraph(self.intro, style=self.styles["Main"]),
-            Paragraph(self.salut, style=self.styles["Main"]),
-            Paragraph(self.body, style=self.styles["MainBody"]),
-            Paragraph(self.outro, style=self.styles["MainBody"]),
-            Paragraph(self.close, style=self.styles["Main"]),
-            self.signature,
-            Paragraph(self.persona.name, style=self.styles["Main"]),
-        ]
 
-        return self.cover_letter.build(self.cl_flowables)
+def render_pool(
+    config: JobScrapeConfig, persona: PersonaConfig, processes: int
+) -> ProcessPoolExecutor:
+    """render_pool returns the run's pool of render processes, starting it on first use,
+    so that every page of the run is rendered by the same warm workers.
+    """
+    global _render_pool  # pylint: disable=global-statement
+    with _batch_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=processes,
+                initializer=_start_render_worker,
+                initargs=(config, persona),
+            )
+        return _render_pool
+
+
+def flush_batch() -> None:
+    """Writes the PDF the run's LetterBatch is filling, if there is one, keeping the batch open."""
+    with _batch_lock:
+        if _batch is not None:
+            _batch.close()
+
+
+def close_batch() -> None:
+    """Saves and forgets the run's LetterBatch, and stops its render processes, if either was started."""
+    global _batch, _render_pool  # pylint: disable=global-statement
+    with _batch_lock:
+        if _batch is not None:
+            _batch.close()
+            _batch = None
+        if _render_pool is not None:
+            _render_pool.shutdown()
+            _render_pool = None
+
+
+def write_letters(
+    pairs: list[tuple[CompanyResult, BusinessCard]],
+    config: JobScrapeConfig,
+    persona: PersonaConfig,
+    processes: int = 0,
+    on_written: Callable[[CompanyResult], None] | None = None,
+    on_failed: Callable[[CompanyResult, Exception], None] | None = None,
+) -> None:
+    """write_letters writes the cover letter of every (company, contact) pair.
+    With processes above 1, the letters are split across the run's pool of worker processes,
+    each holding its own warm LetterRenderer; the pool is kept for the next call until close_batch.
+    Text-only and batched PDF runs always write in this process; a batched letter is
+    only reported written once the batch's file holding it is.
+
+    Args:
+        pairs (list[tuple[CompanyResult, BusinessCard]]): the companies and their contacts.
+        config (JobScrapeConfig): the run configuration.
+        persona (PersonaConfig): information on you, the applicant.
+        processes (int): how many worker processes to render with. Defaults to 0, rendering in this process.
+        on_written (Callable[[CompanyResult], None] | None): called with each company once its letter is written.
+        on_failed (Callable[[CompanyResult, Exception], None] | None): called with each company whose letter
+        raised, and the error, moving on to the next letter. Defaults to None, re-raising the error.
+    """
+    if config.text_only or config.pdf_output == "batch" or processes <= 1 or len(pairs) <= 1:
+        renderer = None if config.text_only else shared_renderer(config, persona)
+        for company, contact in pairs:
+            try:
+                CoverLetterWriter(
+                    company, contact=contact, persona=persona, config=config, renderer=renderer
+                ).write(on_written, on_failed)
+            except Exception as error_found:
+                if on_failed is None:
+                    raise
+                on_failed(company, error_found)
+        return
+
+    executor = render_pool(config, persona, processes)
+    chunksize = max(1, len(pairs) // (processes * 4))
+    written = executor.map(_write_in_worker, pairs, chunksize=chunksize)
+    for (company, _contact), error_found in zip(pairs, written):
+        if error_found is not None:
+            if on_failed is None:
+                raise error_found
+            on_failed(company, error_found)
+        elif on_written is not None:
+            on_written(company)
+
+
+_worker_settings: tuple[JobScrapeConfig, PersonaConfig] | None = None
+
+
+def _start_render_worker(config: JobScrapeConfig, persona: PersonaConfig) -> None:
+    """Warms up the renderer of a worker process before its first letter."""
+    global _worker_settings  # pylint: disable=global-statement
+    _worker_settings = (config, persona)
+    # the listener thread of the parent process doesn't carry over to this one
+    configure_logging(config)
+    shared_renderer(config, persona)
+
+
+def _write_in_worker(pair: tuple[CompanyResult, BusinessCard]) -> Exception | None:
+    """Writes one letter inside a worker process, returning the error it raised, if any,
+    so that one failed letter doesn't end the rest of the map.
+    """
+    config, persona = _worker_settings  # type: ignore
+    company, contact = pair
+    try:
+        writer = CoverLetterWriter(company, contact=contact, persona=persona, config=config)
+        writer.write()
+        # the pool may stop this process as soon as the letter is reported written
+        writer.sink.flush()
+    except Exception as error_found:
+        return error_found
+    return None
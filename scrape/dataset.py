@@ -0,0 +1,187 @@
+import json
+import os
+from dataclasses import fields
+from datetime import datetime
+from threading import Lock
+from uuid import uuid4
+
+from scrape.business_card import BusinessCard
+from scrape.company_result import CompanyResult
+from scrape.configs import JobScrapeConfig
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+COMPANY_COLUMNS = tuple(field.name for field in fields(CompanyResult))
+CONTACT_COLUMNS = tuple(f"contact_{field.name}" for field in fields(BusinessCard))
+COLUMNS = ("run_id", "scraped_at", "outcome", *COMPANY_COLUMNS, *CONTACT_COLUMNS)
+LIST_COLUMNS = {"industries", "adjectives"}
+
+
+def arrow_schema():
+    """The Parquet schema of the dataset: every column is a string, bar the id and the lists."""
+    return pa.schema(
+        [
+            (
+                name,
+                pa.list_(pa.string())
+                if name in LIST_COLUMNS
+                else pa.int64()
+                if name == "inner_id"
+                else pa.string(),
+            )
+            for name in COLUMNS
+        ]
+    )
+
+
+class DatasetWriter:
+    """DatasetWriter appends every scraped job, with its company profile and resolved contact,
+    to one columnar file per run under directory/date=YYYY-MM-DD/.
+    Each row's outcome says how far the job got: "resolved", or "lookup_failed" and "resolve_failed",
+    whose company profile or contact columns are left blank.
+    Rows are buffered and written batch_size at a time, as a Parquet row group when pyarrow is installed.
+    Without pyarrow, the file is not Parquet but JSON lines, <run_id>.columns.jsonl,
+    each line a batch of rows as an object of column name to list of values;
+    load_dataset reads both.
+
+    Args:
+        directory (str): the root of the dataset.
+        batch_size (int): how many rows to buffer before writing them. Defaults to 500.
+        run_id (str | None): the run's identifier. Defaults to a random one.
+    """
+
+    def __init__(self, directory: str, batch_size: int = 500, run_id: str | None = None):
+        started = datetime.now()
+        self.run_id = run_id or f"{started:%H%M%S}-{uuid4().hex[:8]}"
+        self.batch_size = max(1, batch_size)
+        partition = os.path.join(os.path.abspath(directory), f"date={started:%Y-%m-%d}")
+        os.makedirs(partition, exist_ok=True)
+        extension = "parquet" if pa is not None else "columns.jsonl"
+        self.path = os.path.join(partition, f"{self.run_id}.{extension}")
+        self.columns: dict[str, list] = {name: [] for name in COLUMNS}
+        self.rows = 0
+        self.writer = None
+        self.lock = Lock()
+
+    def append(
+        self, company: CompanyResult, contact: BusinessCard | None, outcome: str = "resolved"
+    ) -> None:
+        """Buffers the row of one job, writing the batch once it is full.
+        A job without a contact has blank contact columns.
+        """
+        with self.lock:
+            self.columns["run_id"].append(self.run_id)
+            self.columns["scraped_at"].append(datetime.now().isoformat(timespec="seconds"))
+            self.columns["outcome"].append(outcome)
+            for name in COMPANY_COLUMNS:
+                self.columns[name].append(getattr(company, name))
+            for name in CONTACT_COLUMNS:
+                self.columns[name].append(
+                    None if contact is None else getattr(contact, name[len("contact_") :])
+                )
+            self.rows += 1
+            if len(self.columns["run_id"]) >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """Writes the buffered rows. The caller holds the lock."""
+        if not self.columns["run_id"]:
+            return
+        if pa is not None:
+            batch = pa.table(self.columns, schema=arrow_schema())
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, batch.schema, compression="zstd")
+            self.writer.write_table(batch)
+        else:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(self.columns) + "\n")
+        self.columns = {name: [] for name in COLUMNS}
+
+    def close(self) -> None:
+        """Writes whatever is still buffered and closes the file."""
+        with self.lock:
+            self.flush()
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+
+
+def load_dataset(directory: str, columns: list[str] | None = None) -> dict[str, list]:
+    """load_dataset reads every run written under directory, Parquet or JSON lines,
+    back into one list per column, reading only the columns asked for.
+    A column a file predates is read as None for each of its rows.
+
+    Args:
+        directory (str): the root of the dataset.
+        columns (list[str] | None): the columns to read. Defaults to all of them.
+
+    Returns:
+        dict[str, list]: the values of each column, run by run in date order.
+    """
+    wanted = list(columns or COLUMNS)
+    loaded: dict[str, list] = {name: [] for name in wanted}
+    for partition in sorted(os.listdir(directory)):
+        partition_dir = os.path.join(directory, partition)
+        if not partition.startswith("date=") or not os.path.isdir(partition_dir):
+            continue
+        for name in sorted(os.listdir(partition_dir)):
+            path = os.path.join(partition_dir, name)
+            if name.endswith(".parquet"):
+                if pa is None:
+                    raise ImportError(f"Reading {path} needs pyarrow.")
+                present = set(pq.read_schema(path).names)
+                table = pq.read_table(
+                    path, columns=[column for column in wanted if column in present]
+                )
+                for column in wanted:
+                    loaded[column].extend(
+                        table.column(column).to_pylist()
+                        if column in present
+                        else [None] * table.num_rows
+                    )
+            elif name.endswith(".columns.jsonl"):
+                with open(path, encoding="utf-8") as file:
+                    for line in file:
+                        batch = json.loads(line)
+                        rows = len(batch["run_id"])
+                        for column in wanted:
+                            loaded[column].extend(batch.get(column, [None] * rows))
+    return loaded
+
+
+_dataset: DatasetWriter | None = None
+
+
+def configure_dataset(config: JobScrapeConfig) -> DatasetWriter | None:
+    """configure_dataset opens this run's dataset file under config.dataset_dir.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+
+    Returns:
+        DatasetWriter | None: the shared writer, or None if dataset_dir isn't set.
+    """
+    global _dataset  # pylint: disable=global-statement
+    if _dataset is not None:
+        _dataset.close()
+    _dataset = None
+    if config.dataset_dir:
+        _dataset = DatasetWriter(config.dataset_dir, config.dataset_batch_size)
+    return _dataset
+
+
+def get_dataset() -> DatasetWriter | None:
+    """Returns the shared DatasetWriter, or None if no dataset is being written."""
+    return _dataset
+
+
+def append_row(
+    company: CompanyResult, contact: BusinessCard | None = None, outcome: str = "resolved"
+) -> None:
+    """Appends the row of one job to the shared dataset, if one is being written."""
+    if _dataset is not None:
+        _dataset.append(company, contact, outcome)
@@ -0,0 +1,201 @@
+import os
+import socket
+from contextlib import contextmanager
+from functools import partial
+from threading import Event, Thread
+from time import perf_counter, sleep
+
+from scrape.builtinscrape import company_results, prefetch_listings
+from scrape.business_card import BusinessCard
+from scrape.company_result import CompanyResult
+from scrape.configs import JobScrapeConfig, PersonaConfig, listing_searches
+from scrape.coverletterwriter import (CoverLetterWriter, flush_batch,
+                                      letter_batch)
+from scrape.dataset import get_dataset
+from scrape.log import logger
+from scrape.metrics import get_metrics
+from scrape.namefetcher import resolve_contact
+from scrape.run_memo import get_run_memo
+from scrape.work_queue import WorkQueue
+
+
+def run_coordinator(config: JobScrapeConfig, queue: WorkQueue) -> int:
+    """run_coordinator fetches the listings of every search, looks up their companies,
+    and enqueues each job for the workers, leaving the rest of the run to them.
+    Jobs already in the queue, from this run or an earlier one, are not enqueued again.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+        queue (WorkQueue): the queue the workers claim from.
+
+    Returns:
+        int: how many jobs were enqueued.
+    """
+    queue.set_complete(False)
+    run_memo = get_run_memo()
+    enqueued = 0
+    for search in listing_searches(config):
+        for page, docs in prefetch_listings(
+            search.url_builtin, search.querystring, config.total_pages, depth=config.prefetch_pages
+        ):
+            companies = [
+                company
+                for company in company_results(docs, page, config, search.region_id)
+                if run_memo.first_sighting(company.job_id)
+            ]
+            added = queue.enqueue(companies)
+            enqueued += added
+            logger.info(
+                "Queued %s of the %s jobs on page %s of the %s search",
+                added,
+                len(companies),
+                page,
+                search.name,
+            )
+    queue.set_complete(True)
+    logger.info("Queue: %s", queue.counts())
+    return enqueued
+
+
+def default_worker_id() -> str:
+    """The worker's name in the queue: its host and process id."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def run_worker(
+    config: JobScrapeConfig,
+    persona: PersonaConfig,
+    queue: WorkQueue,
+    worker_id: str = "",
+    render_letters: bool = True,
+) -> dict[str, float]:
+    """run_worker claims jobs from the queue, resolves their contacts and writes their letters,
+    until the coordinator has finished and the queue is empty.
+    The lease on a job is renewed while the worker holds it: while it is busy with it and,
+    for a batched letter, until the batch's file holding it is written, when the job is acknowledged.
+    The worker writes the file it is filling whenever it runs out of jobs to claim.
+    A job that raises is handed back to the queue for another try;
+    one whose lease was handed on to another worker meanwhile is left to that worker.
+    The worker's throughput is logged every config.worker_report_interval seconds.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+        persona (PersonaConfig): information on you, the applicant.
+        queue (WorkQueue): the queue to claim from.
+        worker_id (str): the worker's name in the queue. Defaults to its host and process id.
+        render_letters (bool): write the letters, or only resolve the contacts,
+        leaving the letters to a later render --from-queue. Defaults to True.
+
+    Returns:
+        dict[str, float]: the worker's final throughput report.
+    """
+    worker_id = worker_id or default_worker_id()
+    if render_letters:
+        letter_batch(config, persona, label=worker_id)
+    dataset = get_dataset()
+    metrics = get_metrics()
+    counts = {"done": 0, "failed": 0}
+    start = last_report = perf_counter()
+    # the jobs the worker holds a lease on: the one it is busy with, and those waiting on the batch
+    held: set[str] = set()
+    logger.info("Worker %s is claiming jobs from %s", worker_id, queue.path)
+
+    def finish(company: CompanyResult, business_card: BusinessCard) -> None:
+        held.discard(company.job_id)
+        if not queue.ack(company.job_id, worker_id, business_card, rendered=render_letters):
+            logger.warning(
+                "%s lost its lease on %s before finishing it, leaving it to its new worker.",
+                worker_id,
+                company.job_id,
+            )
+            metrics.inc("worker_jobs_total", worker=worker_id, outcome="lost")
+            return
+        if dataset is not None:
+            dataset.append(company, business_card)
+        counts["done"] += 1
+        metrics.inc("worker_jobs_total", worker=worker_id, outcome="done")
+
+    def fail(company: CompanyResult, error_found: Exception) -> None:
+        held.discard(company.job_id)
+        logger.warning("%s failed on %s: %r", worker_id, company.job_id, error_found)
+        queue.fail(company.job_id, worker_id, repr(error_found))
+        counts["failed"] += 1
+        metrics.inc("worker_jobs_total", worker=worker_id, outcome="failed")
+
+    with keep_lease(queue, held, worker_id):
+        try:
+            while True:
+                companies = queue.claim(worker_id, config.queue_claim_batch)
+                if not companies:
+                    # the jobs of batched letters stay leased until their file is written,
+                    # and the queue isn't finished while they are
+                    flush_batch()
+                    if queue.finished():
+                        break
+                    sleep(config.queue_poll_interval)
+                for company in companies:
+                    if not queue.renew(company.job_id, worker_id):
+                        logger.warning(
+                            "%s lost its lease on %s, skipping it.", worker_id, company.job_id
+                        )
+                        continue
+                    held.add(company.job_id)
+                    try:
+                        business_card = resolve_contact(company, config)
+                        if render_letters:
+                            CoverLetterWriter(
+                                company, contact=business_card, persona=persona, config=config
+                            ).write(
+                                on_written=partial(finish, business_card=business_card),
+                                on_failed=fail,
+                            )
+                        else:
+                            finish(company, business_card)
+                    except Exception as error_found:
+                        fail(company, error_found)
+                if perf_counter() - last_report >= config.worker_report_interval:
+                    last_report = perf_counter()
+                    report_throughput(worker_id, counts, last_report - start)
+        finally:
+            # acknowledges the letters still waiting on the batch, while the queue is open
+            flush_batch()
+
+    report = report_throughput(worker_id, counts, perf_counter() - start)
+    logger.info("Queue: %s", queue.counts())
+    return report
+
+
+@contextmanager
+def keep_lease(queue: WorkQueue, held: set[str], worker_id: str):
+    """Renews the worker's lease on every job in held every third of the lease, on a background thread,
+    for as long as the block runs, so that a slow job isn't handed to another worker meanwhile.
+    A job whose lease was handed on to another worker is dropped from held.
+    """
+    stopped = Event()
+
+    def renew() -> None:
+        while not stopped.wait(queue.lease_seconds / 3):
+            for job_id in held.copy():
+                if not queue.renew(job_id, worker_id):
+                    logger.warning("%s lost its lease on %s.", worker_id, job_id)
+                    held.discard(job_id)
+
+    thread = Thread(target=renew, name=f"lease-{worker_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def report_throughput(worker_id: str, counts: dict[str, int], elapsed: float) -> dict[str, float]:
+    """Logs how many jobs a worker has finished, and how many it finishes a minute."""
+    report = {
+        "done": counts["done"],
+        "failed": counts["failed"],
+        "elapsed_seconds": round(elapsed, 1),
+        "jobs_per_minute": round(counts["done"] / elapsed * 60, 1) if elapsed else 0.0,
+    }
+    logger.info("Worker %s: %s", worker_id, report)
+    return report
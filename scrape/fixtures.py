@@ -0,0 +1,218 @@
+import json
+import os
+from hashlib import sha1
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from time import sleep
+
+from scrape.configs import JobScrapeConfig
+from scrape.response_cache import cache_key
+
+# headers describing the transfer rather than the content; bodies are stored decoded
+TRANSFER_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def fixture_key(target_url: str, querystring: dict | str | None = None) -> str:
+    """fixture_key names the fixture of a request, from its url and canonical querystring."""
+    return sha1(cache_key(target_url, querystring).encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """FixtureStore keeps recorded HTTP exchanges and search results as files in a directory,
+    one JSON metadata file and one body file per response.
+
+    Args:
+        directory (str): where the fixtures live.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "responses"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "searches"), exist_ok=True)
+
+    def response_path(self, key: str) -> str:
+        """Returns the path of a response fixture, without its extension."""
+        return os.path.join(self.directory, "responses", key)
+
+    def save_response(
+        self,
+        target_url: str,
+        querystring: dict | str | None,
+        status: int,
+        headers: dict[str, str],
+        body: bytes,
+    ) -> str:
+        """save_response stores one HTTP exchange.
+
+        Returns:
+            str: the fixture's key.
+        """
+        key = fixture_key(target_url, querystring)
+        path = self.response_path(key)
+        with open(f"{path}.body", "wb") as file:
+            file.write(body)
+        with open(f"{path}.json", "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "url": cache_key(target_url, querystring),
+                    "status": status,
+                    "headers": {
+                        name: value
+                        for name, value in headers.items()
+                        if name.lower() not in TRANSFER_HEADERS
+                    },
+                },
+                file,
+                indent=2,
+            )
+        return key
+
+    def load_response(self, key: str) -> tuple[int, dict[str, str], bytes] | None:
+        """load_response returns the status, headers and body of a fixture, or None if there isn't one."""
+        path = self.response_path(key)
+        try:
+            with open(f"{path}.json", encoding="utf-8") as file:
+                meta = json.load(file)
+            with open(f"{path}.body", "rb") as file:
+                body = file.read()
+        except FileNotFoundError:
+            return None
+        return meta["status"], meta["headers"], body
+
+    def search_path(self, query: str) -> str:
+        """Returns the path of a search fixture."""
+        key = sha1(query.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "searches", f"{key}.json")
+
+    def save_search(self, query: str, urls: list[str]) -> None:
+        """Stores the urls a search query returned."""
+        with open(self.search_path(query), "w", encoding="utf-8") as file:
+            json.dump({"query": query, "urls": urls}, file, indent=2)
+
+    def load_search(self, query: str) -> list[str]:
+        """Returns the urls recorded for a search query, or none if it was never recorded."""
+        try:
+            with open(self.search_path(query), encoding="utf-8") as file:
+                return json.load(file)["urls"]
+        except FileNotFoundError:
+            return []
+
+
+class ReplayServer:
+    """ReplayServer is a local HTTP server that answers /fixture/<key> with a recorded response,
+    after an injected latency, standing in for every host the recording was made against.
+
+    Args:
+        store (FixtureStore): the recorded responses.
+        latency (float): seconds to wait before each answer. Defaults to 0.
+    """
+
+    def __init__(self, store: FixtureStore, latency: float = 0.0):
+        self.store = store
+        self.latency = latency
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # the headers and body go out in separate writes; with Nagle on, a kept-alive
+            # connection waits out the client's delayed ACK between them on every request
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                sleep(server.latency)
+                key = self.path.rsplit("/", 1)[-1].split("?", 1)[0]
+                fixture = server.store.load_response(key)
+                if fixture is None:
+                    status, headers, body = 404, {}, b""
+                else:
+                    status, headers, body = fixture
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """The base url requests are rewritten to."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ReplayServer":
+        """Starts serving on a background thread."""
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops serving."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class Fixtures:
+    """Fixtures is the record or replay state of a run.
+    In "record" mode every exchange is saved to the store as it happens;
+    in "replay" mode requests are answered from the store by a ReplayServer.
+    """
+
+    def __init__(self, mode: str, store: FixtureStore, latency: float = 0.0):
+        self.mode = mode
+        self.store = store
+        self.server = ReplayServer(store, latency).start() if mode == "replay" else None
+
+    @property
+    def recording(self) -> bool:
+        """Whether exchanges are being saved."""
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        """Whether requests are answered from the store."""
+        return self.mode == "replay"
+
+    def replay_url(self, target_url: str, querystring: dict | str | None = None) -> str:
+        """Returns the ReplayServer url that answers for a request."""
+        return f"{self.server.url}/fixture/{fixture_key(target_url, querystring)}"  # type: ignore
+
+    def close(self) -> None:
+        """Stops the ReplayServer, if there is one."""
+        if self.server is not None:
+            self.server.stop()
+
+
+_fixtures: Fixtures | None = None
+
+
+def configure_fixtures(config: JobScrapeConfig) -> Fixtures | None:
+    """configure_fixtures sets up recording or replaying as config.fixture_mode asks.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+
+    Returns:
+        Fixtures | None: the shared fixtures, or None for a live run.
+    """
+    global _fixtures  # pylint: disable=global-statement
+    if _fixtures is not None:
+        _fixtures.close()
+    _fixtures = None
+    if config.fixture_mode in ("record", "replay"):
+        _fixtures = Fixtures(
+            config.fixture_mode,
+            FixtureStore(config.fixture_dir),
+            latency=config.replay_latency,
+        )
+    return _fixtures
+
+
+def get_fixtures() -> Fixtures | None:
+    """Returns the shared fixtures, or None for a live run."""
+    return _fixtures
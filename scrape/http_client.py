@@ -0,0 +1,214 @@
+from importlib.util import find_spec
+from threading import Lock
+from urllib.parse import urlsplit
+
+from requests import ConnectionError, Response, Session, Timeout
+from requests.adapters import HTTPAdapter
+
+from scrape.configs import JobScrapeConfig
+from scrape.fixtures import get_fixtures
+from scrape.log import logger
+from scrape.metrics import get_metrics
+from scrape.rate_limit import (CircuitOpenError, HostLimiter, RateLimiter,
+                               retry_after_seconds)
+
+# urllib3 decodes brotli responses only when the brotli package is installed
+ACCEPT_ENCODING = "gzip, deflate, br" if find_spec("brotli") else "gzip, deflate"
+
+
+class HttpClient:
+    """HttpClient keeps one pooled keep-alive Session per host,
+    so repeat requests to the same host skip the TCP and TLS handshake.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 20.0,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.sessions: dict[str, Session] = {}
+        self.lock = Lock()
+
+    @classmethod
+    def from_config(cls, config: JobScrapeConfig) -> "HttpClient":
+        """Builds a client from the pool and timeout settings in the config."""
+        return cls(
+            pool_size=config.pool_size,
+            connect_timeout=config.connect_timeout,
+            read_timeout=config.read_timeout,
+            rate_limiter=RateLimiter.from_config(config),
+        )
+
+    def session_for(self, url: str) -> Session:
+        """session_for returns the Session that owns the host of the url,
+        creating it on first use.
+
+        Args:
+            url (str): the url about to be requested.
+
+        Returns:
+            Session: a pooled Session for the url's scheme and host.
+        """
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_size
+                )
+                session.mount(f"{host}/", adapter)
+                session.headers.update({"Accept-Encoding": ACCEPT_ENCODING})
+                self.sessions[host] = session
+            return session
+
+    def get(self, url: str, **kwargs) -> Response:
+        """get issues a GET through the host's pooled Session,
+        applying the configured timeouts unless the caller overrides them.
+        Each request waits its turn in its host's rate limit. Throttled (429) and failing (5xx,
+        connection error, timeout) requests are retried after a backoff, or after the Retry-After
+        the host asked for, during which the whole host is held back. A host that keeps failing
+        has its circuit opened, and is refused with CircuitOpenError until its cooldown ends.
+        When fixtures are being recorded the exchange is saved,
+        and when they are replayed the request goes to the ReplayServer instead, unthrottled.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        fixtures = get_fixtures()
+        if fixtures is not None and fixtures.replaying:
+            replay_url = fixtures.replay_url(url, kwargs.pop("params", None))
+            return self.session_for(replay_url).get(replay_url, **kwargs)
+
+        metrics = get_metrics()
+        host = urlsplit(url).netloc
+        limiter = self.rate_limiter.for_host(urlsplit(url).hostname or host)
+        attempt = 0
+        while True:
+            if not limiter.breaker.allow():
+                metrics.inc("http_circuit_refused_total", host=host)
+                raise CircuitOpenError(f"The circuit of {host} is open, not requesting {url}")
+            limiter.bucket.acquire()
+            try:
+                with metrics.timer("http_request_seconds", host=host):
+                    response = self.session_for(url).get(url, **kwargs)
+            except (ConnectionError, Timeout) as error_found:
+                if not self.back_off(limiter, host, attempt, None, type(error_found).__name__):
+                    raise
+                attempt += 1
+                continue
+            except BaseException:
+                # anything else is the request's own fault; just don't leave a trial hanging
+                limiter.breaker.release()
+                raise
+            metrics.inc("http_requests_total", host=host, status=response.status_code)
+            if response.status_code != 429 and response.status_code < 500:
+                limiter.breaker.success()
+                break
+            retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+            if not self.back_off(limiter, host, attempt, retry_after, str(response.status_code)):
+                break
+            response.close()
+            attempt += 1
+
+        if metrics.enabled and not kwargs.get("stream"):
+            metrics.inc("http_response_bytes_total", len(response.content), host=host)
+        if fixtures is not None and fixtures.recording:
+            fixtures.store.save_response(
+                url,
+                kwargs.get("params"),
+                response.status_code,
+                dict(response.headers),
+                response.content,
+            )
+        return response
+
+    def back_off(
+        self,
+        limiter: HostLimiter,
+        host: str,
+        attempt: int,
+        retry_after: float | None,
+        reason: str,
+    ) -> bool:
+        """back_off records a failed attempt against its host and, if the request is to be retried,
+        holds the host back for Retry-After, when given, or an exponential backoff with jitter,
+        either capped at backoff_max.
+
+        Returns:
+            bool: whether to retry the request.
+        """
+        if limiter.breaker.failure():
+            logger.warning(
+                "Opened the circuit of %s after %s failures.", host, limiter.breaker.failures
+            )
+        if attempt >= self.rate_limiter.max_retries:
+            return False
+        delay = self.rate_limiter.backoff(attempt) if retry_after is None else retry_after
+        delay = min(delay, self.rate_limiter.backoff_max)
+        limiter.bucket.pause(delay)
+        get_metrics().inc("http_retries_total", host=host, reason=reason)
+        logger.info("Retrying %s in %.1f seconds (%s).", host, delay, reason)
+        return True
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """stats reports, per host, how many connections were opened
+        and how many requests reused an already open connection.
+
+        Returns:
+            dict[str, dict[str, int]]: requests, connections, and reused counts keyed by host.
+        """
+        report: dict[str, dict[str, int]] = {}
+        with self.lock:
+            sessions = list(self.sessions.items())
+        for host, session in sessions:
+            requests_made = connections = 0
+            for adapter in session.adapters.values():
+                pools = adapter.poolmanager.pools  # type: ignore
+                for key in list(pools.keys()):
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    requests_made += pool.num_requests
+                    connections += pool.num_connections
+            if requests_made:
+                report[host] = {
+                    "requests": requests_made,
+                    "connections": connections,
+                    "reused": requests_made - connections,
+                }
+        return report
+
+    def close(self) -> None:
+        """Closes every pooled Session."""
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+
+
+_client = HttpClient()
+
+
+def configure_client(config: JobScrapeConfig) -> HttpClient:
+    """configure_client replaces the shared client with one built from the config.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+
+    Returns:
+        HttpClient: the new shared client.
+    """
+    global _client  # pylint: disable=global-statement
+    _client.close()
+    _client = HttpClient.from_config(config)
+    return _client
+
+
+def get_client() -> HttpClient:
+    """Returns the process-wide shared HttpClient."""
+    return _client
@@ -0,0 +1,191 @@
+import json
+import sqlite3
+from dataclasses import asdict
+from threading import Lock
+from time import time
+
+from scrape.business_card import BusinessCard
+from scrape.company_result import CompanyResult
+from scrape.configs import JobScrapeConfig
+from scrape.log import logger
+
+STAGES = ("listing_seen", "lookup_done", "contact_resolved", "letter_written")
+
+
+class RunJournal:
+    """RunJournal records, per job, which stages of a run have finished,
+    along with the company and contact each finished stage produced,
+    so that a resumed run can skip straight to the work that is left.
+    It also counts the times a job has failed; a job that has failed max_attempts times
+    is given up on, rather than tried again by every resumed run.
+
+    Args:
+        path (str): the SQLite file to keep the journal in.
+        resume (bool): keep the entries of the previous run. Defaults to False, starting afresh.
+        max_attempts (int): how many times a job may fail before it is given up on. Defaults to 3.
+    """
+
+    def __init__(self, path: str, resume: bool = False, max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max(1, max_attempts)
+        self.lock = Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                page INTEGER,
+                listing_seen REAL,
+                lookup_done REAL,
+                contact_resolved REAL,
+                letter_written REAL,
+                company TEXT,
+                contact TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            )"""
+        )
+        # journals written before failures were recorded lack their columns
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(jobs)")}
+        if "attempts" not in columns:
+            self.connection.execute(
+                "ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0"
+            )
+            self.connection.execute("ALTER TABLE jobs ADD COLUMN error TEXT")
+        if not resume:
+            self.connection.execute("DELETE FROM jobs")
+        self.connection.commit()
+
+    @classmethod
+    def from_config(cls, config: JobScrapeConfig, resume: bool = False) -> "RunJournal":
+        """Opens the journal at config.journal_path, or next to the export directory if that isn't set."""
+        return cls(
+            config.journal_path or f"{config.export_dir}_journal.sqlite",
+            resume,
+            max_attempts=config.journal_max_attempts,
+        )
+
+    def mark_listing(self, job_id: str, page: int) -> None:
+        """Records that a job was seen on a listing page."""
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, page, listing_seen) VALUES (?, ?, ?)",
+                (job_id, page, time()),
+            )
+            self.connection.commit()
+
+    def mark_lookup(self, company: CompanyResult) -> None:
+        """Records the looked up company of a job."""
+        self.update(company.job_id, "lookup_done", company=json.dumps(asdict(company)))
+
+    def mark_contact(self, company: CompanyResult, contact: BusinessCard) -> None:
+        """Records the resolved contact of a job."""
+        self.update(company.job_id, "contact_resolved", contact=json.dumps(asdict(contact)))
+
+    def mark_letter(self, company: CompanyResult) -> None:
+        """Records that a job's letter was written."""
+        self.update(company.job_id, "letter_written")
+
+    def mark_failure(self, job_id: str, stage: str, error_found: BaseException) -> bool:
+        """mark_failure records, and logs, that a stage of a job raised.
+
+        Returns:
+            bool: whether the job has now failed max_attempts times, and is given up on.
+        """
+        with self.lock:
+            self.connection.execute(
+                "UPDATE jobs SET attempts = attempts + 1, error = ? WHERE job_id = ?",
+                (f"{stage}: {error_found!r}", job_id),
+            )
+            self.connection.commit()
+            row = self.connection.execute(
+                "SELECT attempts FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        attempts = 0 if row is None else row[0]
+        given_up = attempts >= self.max_attempts
+        logger.warning(
+            "Job %s failed at %s (attempt %s of %s%s): %s",
+            job_id,
+            stage,
+            attempts,
+            self.max_attempts,
+            ", giving up" if given_up else "",
+            error_found,
+        )
+        return given_up
+
+    def update(self, job_id: str, stage: str, **columns: str) -> None:
+        """Stamps a stage of a job as finished, storing any columns alongside it."""
+        assignments = ", ".join(f"{column} = ?" for column in (stage, *columns))
+        with self.lock:
+            self.connection.execute(
+                f"UPDATE jobs SET {assignments} WHERE job_id = ?",
+                (time(), *columns.values(), job_id),
+            )
+            self.connection.commit()
+
+    def letter_written(self, job_id: str) -> bool:
+        """Whether the job's letter was already written."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT letter_written FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return row is not None and row[0] is not None
+
+    def settled(self, job_id: str) -> bool:
+        """Whether the job needs no more work: its letter was written, or it was given up on."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT letter_written, attempts FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return row is not None and (row[0] is not None or row[1] >= self.max_attempts)
+
+    def company(self, job_id: str) -> CompanyResult | None:
+        """Returns the recorded company of a job, if its lookup finished."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT company FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return CompanyResult(**json.loads(row[0]))
+
+    def contact(self, job_id: str) -> BusinessCard | None:
+        """Returns the recorded contact of a job, if it was resolved."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT contact FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return BusinessCard(**json.loads(row[0]))
+
+    def pending_letters(self) -> list[tuple[CompanyResult, BusinessCard]]:
+        """Returns the company and contact of every resolved job whose letter is yet to be written,
+        in listing order, leaving out the jobs given up on.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                """SELECT company, contact FROM jobs
+                WHERE contact_resolved IS NOT NULL AND letter_written IS NULL AND attempts < ?
+                ORDER BY page, rowid""",
+                (self.max_attempts,),
+            ).fetchall()
+        return [
+            (CompanyResult(**json.loads(company)), BusinessCard(**json.loads(contact)))
+            for company, contact in rows
+        ]
+
+    def progress(self) -> dict[str, int]:
+        """Returns how many jobs have finished each stage, and how many were given up on."""
+        counts = ", ".join(f"COUNT({stage})" for stage in STAGES)
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT {counts}, COALESCE(SUM(attempts >= ?), 0) FROM jobs",
+                (self.max_attempts,),
+            ).fetchone()
+        return dict(zip((*STAGES, "given_up"), row))
+
+    def close(self) -> None:
+        """Closes the underlying database."""
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,102 @@
+import re
+from json import JSONDecodeError
+from typing import Any, Iterable, Iterator
+
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+# the characters that change the scanner's state, outside and inside a string
+STRUCTURAL = re.compile(rb'["{}\[\],]')
+STRING_END = re.compile(rb'["\\]')
+
+
+def iter_array_items(chunks: Iterable[bytes], keys: set[str]) -> Iterator[tuple[str, Any]]:
+    """iter_array_items decodes a JSON object as its bytes arrive, yielding the elements of
+    its top-level arrays named in keys one at a time, each as soon as it is complete.
+    Only the element being read is held in memory; everything else is skipped.
+
+    Args:
+        chunks (Iterable[bytes]): the raw bytes of a JSON object, in pieces of any size.
+        keys (set[str]): the names of the top-level arrays to decode.
+
+    Raises:
+        JSONDecodeError: if the bytes end in the middle of an array being read.
+
+    Yields:
+        tuple[str, Any]: the array's name and one decoded element, in document order.
+    """
+    buffer = bytearray()
+    pos = 0
+    depth = 0
+    in_string = False
+    key_start: int | None = None
+    last_key = ""
+    array: str | None = None  # the named array being read
+    item_start = 0
+
+    for chunk in chunks:
+        buffer += chunk
+        items = []
+        while pos < len(buffer):
+            if in_string:
+                match = STRING_END.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                index = match.start()
+                if buffer[index] == 0x5C:  # backslash: skip the escaped character
+                    if index + 1 >= len(buffer):
+                        pos = index
+                        break
+                    pos = index + 2
+                    continue
+                in_string = False
+                if key_start is not None:
+                    last_key = buffer[key_start:index].decode("utf-8", "replace")
+                    key_start = None
+                pos = index + 1
+                continue
+
+            match = STRUCTURAL.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            index = match.start()
+            char = buffer[index]
+            pos = index + 1
+            if char == 0x22:  # "
+                in_string = True
+                if depth == 1:
+                    key_start = pos
+            elif char in (0x7B, 0x5B):  # { [
+                depth += 1
+                if depth == 2 and char == 0x5B and last_key in keys:
+                    array, item_start = last_key, pos
+            elif char in (0x7D, 0x5D):  # } ]
+                if depth == 2 and array is not None:
+                    item = bytes(buffer[item_start:index]).strip()
+                    if item:
+                        items.append((array, loads(item)))
+                    array = None
+                depth -= 1
+            elif depth == 2 and array is not None:  # , between elements
+                items.append((array, loads(bytes(buffer[item_start:index]))))
+                item_start = pos
+
+        # drop what has been read, keeping the element and key still being read
+        keep = pos
+        if array is not None:
+            keep = min(keep, item_start)
+        if key_start is not None:
+            keep = min(keep, key_start)
+        del buffer[:keep]
+        pos -= keep
+        item_start -= keep
+        if key_start is not None:
+            key_start -= keep
+        yield from items
+
+    if array is not None or in_string:
+        raise JSONDecodeError("The response ended before the JSON was complete", "", 0)
@@ -0,0 +1,304 @@
+from io import BytesIO
+from threading import Lock
+from typing import TYPE_CHECKING, Callable
+
+import reportlab.rl_config
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import (ParagraphStyle, StyleSheet1,
+                                  getSampleStyleSheet)
+from reportlab.lib.units import inch
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import (BaseDocTemplate, Flowable, Frame, Image,
+                                PageBreak, PageTemplate, SimpleDocTemplate)
+
+from scrape.configs import JobScrapeConfig, PersonaConfig
+from scrape.log import logger
+from scrape.metrics import timed
+
+if TYPE_CHECKING:
+    from scrape.output_sink import OutputSink
+
+reportlab.rl_config.warnOnMissingFontGlyphs = 0  # type: ignore
+
+_registered_fonts: set[tuple[str, str, str, str]] = set()
+_font_lock = Lock()
+
+
+def register_fonts(config: JobScrapeConfig) -> None:
+    """This registers the fonts for use in the PDF, querying them from the config.json file.
+    Each set of font files is only parsed once per process.
+    """
+    fonts = (
+        config.font_regular,
+        config.font_bold,
+        config.font_italic,
+        config.font_bolditalic,
+    )
+    with _font_lock:
+        if fonts in _registered_fonts:
+            return
+        pdfmetrics.registerFont(TTFont("IBMPlex", config.font_regular))
+        pdfmetrics.registerFont(TTFont("IBMPlexBd", config.font_bold))
+        pdfmetrics.registerFont(TTFont("IBMPlexIt", config.font_italic))
+        pdfmetrics.registerFont(TTFont("IBMPlexBI", config.font_bolditalic))
+        pdfmetrics.registerFontFamily(
+            "IBMPlex",
+            normal="IBMPlex",
+            bold="IBMPlexBd",
+            italic="IBMPlexIT",
+            boldItalic="IBMPlexBI",
+        )
+        _registered_fonts.add(fonts)
+
+
+def build_styles() -> StyleSheet1:
+    """This builds the stylesheet used by every letter."""
+    styles = getSampleStyleSheet()
+    styles.add(
+        ParagraphStyle(
+            "Main",
+            parent=styles["Normal"],
+            fontName="IBMPlex",
+            spaceBefore=16,
+            fontSize=12,
+            leading=16,
+            firstLineIndent=0,
+        )
+    )
+
+    styles.add(ParagraphStyle("MainBody", parent=styles["Main"], firstLineIndent=16))
+
+    styles.add(
+        ParagraphStyle(
+            "ListItem",
+            parent=styles["Main"],
+            spaceBefore=8,
+            firstLineIndent=16,
+            bulletText="•",
+        )
+    )
+    return styles
+
+
+class LetterRenderer:
+    """LetterRenderer holds everything a cover letter PDF needs that doesn't change between letters:
+    the registered fonts, the stylesheet, and the decoded signature image.
+    """
+
+    def __init__(self, config: JobScrapeConfig, persona: PersonaConfig):
+        self.config = config
+        self.persona = persona
+        register_fonts(config)
+        self.styles = build_styles()
+        # lazy=1 keeps the decoded image on the flowable, so it is shared by every letter
+        self.signature = Image(
+            filename=persona.signature, width=80, height=40, hAlign="LEFT", lazy=1
+        )
+        # decode it once now, rather than in whichever letter comes first
+        self.signature.wrap(0, 0)
+
+    @timed("letter_pdf_seconds")
+    def build_pdf(
+        self, filename: str, flowables: list[Flowable], company_name: str
+    ) -> bytes:
+        """build_pdf lays out a letter's flowables into a PDF, in memory.
+
+        Args:
+            filename (str): the PDF's file name, used as its title.
+            flowables (list[Flowable]): the content of the letter.
+            company_name (str): the company the letter is addressed to.
+
+        Returns:
+            bytes: the PDF, for the caller to write wherever it belongs.
+        """
+        output = BytesIO()
+        cover_letter = SimpleDocTemplate(
+            output,
+            pagesize=letter,
+            rightMargin=inch,
+            leftMargin=inch,
+            topMargin=inch,
+            bottomMargin=inch,
+            title=filename,
+            author=self.persona.name,
+            creator=self.persona.name,
+            subject=f"{self.persona.name}'s Cover Letter for {company_name}",
+        )
+        cover_letter.build(flowables)
+        return output.getvalue()
+
+
+class LetterBookmark(Flowable):
+    """LetterBookmark takes up no space; it marks the page a letter starts on
+    and adds that page to the PDF's outline.
+    """
+
+    def __init__(self, key: str, title: str):
+        super().__init__()
+        self.key = key
+        self.title = title
+
+    def wrap(self, *args):
+        return (0, 0)
+
+    def draw(self):
+        self.canv.bookmarkPage(self.key)
+        self.canv.addOutlineEntry(self.title, self.key, level=0)
+
+
+class LetterBatch:
+    """LetterBatch lays letters out one after another into a shared PDF, each on a new page
+    under its own outline entry, starting a new file every letters_per_file letters.
+    The letters of a file are kept until it is full, or the batch is closed, and are then
+    built into the PDF in memory and written through the sink, so that a run that dies
+    never leaves half a PDF behind. The fonts and signature image are embedded once per file.
+    A letter only counts as written once its file is on disk: its on_written callback is called then,
+    and not when it is added; should the file fail to build or write, its on_failed callback is called.
+    A full file is written as the next letter arrives, so that the letter being added is never
+    caught up in the failure of the file before it.
+
+    Args:
+        renderer (LetterRenderer): the styles and signature the letters were built with.
+        sink (OutputSink): writes the PDFs under the run's export directory.
+        prefix (str): the start of each file's name, followed by its number.
+        letters_per_file (int): how many letters go in each file. Defaults to 0, putting them all
+        in one, which holds every letter of the run in memory until it ends.
+    """
+
+    def __init__(
+        self,
+        renderer: LetterRenderer,
+        sink: "OutputSink",
+        prefix: str,
+        letters_per_file: int = 0,
+    ):
+        self.renderer = renderer
+        self.sink = sink
+        self.prefix = prefix
+        self.letters_per_file = letters_per_file
+        self.story: list[Flowable] = []
+        # the company name, on_written and on_failed of each letter in the current file
+        self.written: list[tuple] = []
+        self.letters = 0
+        self.letters_in_file = 0
+        self.paths: list[str] = []
+        self.lock = Lock()
+
+    def add(
+        self,
+        company_name: str,
+        flowables: list[Flowable],
+        on_written: Callable[[], None] | None = None,
+        on_failed: Callable[[Exception], None] | None = None,
+    ) -> None:
+        """add puts one letter at the end of the current PDF, writing the current PDF first if it is full.
+
+        Args:
+            company_name (str): the company the letter is addressed to, used as its bookmark.
+            flowables (list[Flowable]): the content of the letter.
+            on_written (Callable[[], None] | None): called once the file holding the letter is written.
+            on_failed (Callable[[Exception], None] | None): called with the error if that file could not be.
+        """
+        with self.lock:
+            if self.letters_per_file and self.letters_in_file >= self.letters_per_file:
+                try:
+                    self.close_file()
+                except Exception as error_found:
+                    # close_file has failed the letters of that file; this one starts the next
+                    logger.warning(
+                        "Writing %s_%03d.pdf failed: %r",
+                        self.prefix,
+                        len(self.paths) + 1,
+                        error_found,
+                    )
+            if self.letters_in_file:
+                self.story.append(PageBreak())
+            self.story += [LetterBookmark(f"letter{self.letters}", company_name), *flowables]
+            self.written.append((company_name, on_written, on_failed))
+            self.letters += 1
+            self.letters_in_file += 1
+
+    @timed("letter_batch_pdf_seconds")
+    def close_file(self) -> list[str]:
+        """Builds the current PDF from its letters and writes it,
+        then calls back each letter it holds.
+
+        Raises:
+            Exception: whatever building or writing the file raised, once each letter's on_failed was called.
+
+        Returns:
+            list[str]: the companies whose letters the file holds.
+        """
+        filename = f"{self.prefix}_{len(self.paths) + 1:03d}.pdf"
+        name = self.renderer.persona.name
+        output = BytesIO()
+        doc = BaseDocTemplate(
+            output,
+            pagesize=letter,
+            rightMargin=inch,
+            leftMargin=inch,
+            topMargin=inch,
+            bottomMargin=inch,
+            title=filename,
+            author=name,
+            creator=name,
+            subject=f"{name}'s Cover Letters",
+        )
+        frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id="letter")
+        doc.addPageTemplates([PageTemplate(id="Letter", frames=[frame], pagesize=letter)])
+        story, self.story = self.story, []
+        written, self.written = self.written, []
+        self.letters_in_file = 0
+        try:
+            doc.build(story)
+            outcome: list[BaseException | None] = []
+            self.sink.write_bytes(filename, output.getvalue(), outcome.append)
+            # the sink may write behind; the letters aren't written until the file is
+            self.sink.wait()
+            if outcome[0] is not None:
+                raise outcome[0]
+        except Exception as error_found:
+            for _company_name, _on_written, on_failed in written:
+                if on_failed is not None:
+                    on_failed(error_found)
+            raise
+        self.paths.append(self.sink.path(filename))
+        for _company_name, on_written, _on_failed in written:
+            if on_written is not None:
+                on_written()
+        return [company_name for company_name, _on_written, _on_failed in written]
+
+    def close(self) -> list[str]:
+        """Writes the PDF still being filled, if there is one.
+
+        Returns:
+            list[str]: the companies whose letters it held.
+        """
+        with self.lock:
+            if self.letters_in_file:
+                return self.close_file()
+            return []
+
+
+_renderers: dict[tuple, LetterRenderer] = {}
+_renderer_lock = Lock()
+
+
+def get_renderer(config: JobScrapeConfig, persona: PersonaConfig) -> LetterRenderer:
+    """get_renderer returns the process-wide LetterRenderer for the config's fonts and the persona's signature,
+    creating it on first use.
+    """
+    key = (
+        config.font_regular,
+        config.font_bold,
+        config.font_italic,
+        config.font_bolditalic,
+        persona.signature,
+        persona.name,
+    )
+    with _renderer_lock:
+        renderer = _renderers.get(key)
+        if renderer is None:
+            renderer = _renderers[key] = LetterRenderer(config, persona)
+        return renderer
@@ -0,0 +1,143 @@
+import os
+import re
+from dataclasses import dataclass
+from html import escape
+from threading import Lock
+
+SECTION_HEADER = re.compile(r"^\[(\w+)(?:\s+(\w+))?\]\s*$")
+FIELD = re.compile(r"\{(\w+)\}")
+BOLD = re.compile(r"\*\*(.+?)\*\*")
+LINK = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)")
+
+
+@dataclass(slots=True)
+class TemplateSection:
+    """dataclass of one compiled paragraph of a letter template"""
+
+    name: str
+    style: str | None
+    html: str
+    text: str
+
+
+class LetterTemplate:
+    """LetterTemplate is a letter template compiled into a pair of format strings per section:
+    one producing the ReportLab paragraph markup and one producing plain text,
+    so that rendering a letter is a format_map per section.
+
+    Args:
+        sections (list[TemplateSection]): the compiled sections, in letter order.
+    """
+
+    def __init__(self, sections: list[TemplateSection]):
+        self.sections = sections
+        self.fields = {
+            name
+            for section in sections
+            for name in FIELD.findall(section.text)
+        }
+
+    def render_markup(self, values: dict[str, str]) -> list[tuple[TemplateSection, str]]:
+        """render_markup fills in every section as ReportLab paragraph markup.
+
+        Args:
+            values (dict[str, str]): the letter's fields; they are escaped here.
+
+        Returns:
+            list[tuple[TemplateSection, str]]: each section and its markup.
+        """
+        escaped = {name: escape(str(value)) for name, value in values.items()}
+        return [(section, section.html.format_map(escaped)) for section in self.sections]
+
+    def render_text(self, values: dict[str, str]) -> str:
+        """render_text fills in every section as plain text, a blank line between sections."""
+        return "\n\n".join(
+            rendered
+            for rendered in (section.text.format_map(values) for section in self.sections)
+            if rendered
+        ) + "\n"
+
+
+def compile_template(source: str) -> LetterTemplate:
+    """compile_template parses a letter template.
+
+    A template is a series of sections, each opened by a "[name style]" line naming
+    the section and the stylesheet style it is set in. A section without a style,
+    such as "[signature]", marks where the signature image goes.
+    Each line of a section is a line of the letter; "{field}" is replaced by the letter's field,
+    "**text**" is set in bold and "[text](url)" is a link. Lines starting with "#" are comments.
+
+    Args:
+        source (str): the template's text.
+
+    Raises:
+        ValueError: if text comes before the first section.
+
+    Returns:
+        LetterTemplate: the compiled template.
+    """
+    sections: list[TemplateSection] = []
+    current: tuple[str, str | None] | None = None
+    lines: list[str] = []
+
+    def close_section() -> None:
+        if current is None:
+            return
+        while lines and not lines[-1].strip():
+            lines.pop()
+        name, style = current
+        sections.append(
+            TemplateSection(
+                name=name,
+                style=style,
+                html="<br />".join(markup_line(line) for line in lines),
+                text="\n".join(text_line(line) for line in lines),
+            )
+        )
+
+    for number, line in enumerate(source.splitlines(), start=1):
+        if line.startswith("#"):
+            continue
+        header = SECTION_HEADER.match(line)
+        if header:
+            close_section()
+            current, lines = (header.group(1), header.group(2)), []
+        elif current is not None:
+            if lines or line.strip():
+                lines.append(line.rstrip())
+        elif line.strip():
+            raise ValueError(f"Line {number} of the letter template is outside any section.")
+    close_section()
+    return LetterTemplate(sections)
+
+
+def markup_line(line: str) -> str:
+    """Converts one template line into a ReportLab markup format string."""
+    line = escape(line, quote=False)
+    line = BOLD.sub(r"<b>\1</b>", line)
+    return LINK.sub(r'<a href="\2" color="blue">\1</a>', line)
+
+
+def text_line(line: str) -> str:
+    """Converts one template line into a plain text format string."""
+    return LINK.sub(r"\1", BOLD.sub(r"\1", line))
+
+
+_templates: dict[str, tuple[float, LetterTemplate]] = {}
+_template_lock = Lock()
+
+
+def load_template(path: str) -> LetterTemplate:
+    """load_template returns the compiled template at path,
+    compiling it on first use and again whenever the file changes.
+    """
+    path = os.path.abspath(path)
+    modified = os.path.getmtime(path)
+    with _template_lock:
+        cached = _templates.get(path)
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+        with open(path, encoding="utf-8") as file:
+            template = compile_template(file.read())
+        _templates[path] = (modified, template)
+        return template
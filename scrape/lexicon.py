@@ -0,0 +1,247 @@
+import mmap
+import os
+import struct
+from array import array
+from functools import cached_property
+from hashlib import sha256
+from threading import Lock
+from zlib import crc32
+
+from scrape.brand_matcher import BrandMatcher
+from scrape.configs import JobScrapeConfig
+from scrape.log import logger
+from scrape.prefix_index import PrefixIndex
+
+LEXICON_VERSION = 1
+MAGIC = b"JSLX"
+HEADER = struct.Struct("<4sHH32s")
+SECTION = struct.Struct("<16sIIQ")
+EMPTY_SLOT = 0xFFFFFFFF
+SECTIONS = ("first_names", "surnames", "brand_names", "webtext")
+
+
+class LexiconSection:
+    """LexiconSection is a read-only, set-like view over one word list of a compiled lexicon.
+    Words are stored sorted, with a crc32 hash table over them for constant time membership tests.
+    """
+
+    def __init__(self, buffer: memoryview, offset: int, count: int, table_size: int):
+        self.count = count
+        self.table_size = table_size
+        self.offsets = buffer[offset : offset + 4 * (count + 1)].cast("I")
+        slots_start = offset + 4 * (count + 1)
+        self.slots = buffer[slots_start : slots_start + 4 * table_size].cast("I")
+        self.data = buffer[slots_start + 4 * table_size :]
+
+    def entry(self, index: int) -> bytes:
+        """Returns the encoded word stored at the given sorted position."""
+        return bytes(self.data[self.offsets[index] : self.offsets[index + 1]])
+
+    def __contains__(self, word: object) -> bool:
+        if not isinstance(word, str) or not self.table_size:
+            return False
+        encoded = word.encode("utf-8", "surrogatepass")
+        mask = self.table_size - 1
+        slot = crc32(encoded) & mask
+        while True:
+            index = self.slots[slot]
+            if index == EMPTY_SLOT:
+                return False
+            if self.data[self.offsets[index] : self.offsets[index + 1]] == encoded:
+                return True
+            slot = (slot + 1) & mask
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.entry(index).decode("utf-8", "surrogatepass")
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class Lexicon:
+    """Lexicon memory-maps a compiled lexicon artifact read-only,
+    exposing each of its word lists as a LexiconSection.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self.mmap)
+        magic, version, section_count, self.fingerprint = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != LEXICON_VERSION:
+            raise ValueError(f"{path} is not a version {LEXICON_VERSION} lexicon.")
+        for position in range(section_count):
+            name, count, table_size, offset = SECTION.unpack_from(
+                buffer, HEADER.size + position * SECTION.size
+            )
+            section = LexiconSection(buffer, offset, count, table_size)
+            setattr(self, name.rstrip(b"\0").decode("ascii"), section)
+
+    first_names: LexiconSection
+    surnames: LexiconSection
+    brand_names: LexiconSection
+    webtext: LexiconSection
+
+    @cached_property
+    def first_name_index(self) -> PrefixIndex:
+        """A prefix trie over the first names, built on first use."""
+        return PrefixIndex(self.first_names)
+
+    @cached_property
+    def brand_matcher(self) -> BrandMatcher:
+        """An Aho-Corasick automaton over the brand names, built on first use."""
+        return BrandMatcher(self.brand_names)
+
+
+def read_source_words(config: JobScrapeConfig) -> dict[str, list[str]]:
+    """read_source_words loads every word list the lexicon is compiled from.
+
+    Args:
+        config (JobScrapeConfig): the configuration naming the brand and surname files.
+
+    Returns:
+        dict[str, list[str]]: the words of each section, keyed by section name.
+    """
+    from nltk.corpus import names, webtext
+
+    with open(config.brand_names, "r", encoding="utf8") as f:
+        brand_names = [brand.strip("\n") for brand in f.readlines()]
+    with open(config.surnames, "r", encoding="utf8") as f:
+        surnames = [surname.strip() for surname in f.readlines() if surname.strip()]
+    return {
+        "first_names": names.words(),
+        "surnames": surnames,
+        "brand_names": brand_names,
+        "webtext": webtext.words(),
+    }
+
+
+def source_fingerprint(config: JobScrapeConfig) -> bytes | None:
+    """source_fingerprint hashes the path, size and modification time of every source word list,
+    so that the artifact is rebuilt whenever one of them changes.
+
+    Args:
+        config (JobScrapeConfig): the configuration naming the brand and surname files.
+
+    Returns:
+        bytes | None: a sha256 digest of the sources, or None if nltk or its corpora aren't installed.
+    """
+    try:
+        from nltk.corpus import names, webtext
+
+        paths = [config.brand_names, config.surnames]
+        for corpus in (names, webtext):
+            paths.extend(str(corpus.abspath(fileid)) for fileid in corpus.fileids())
+    except (ImportError, LookupError):
+        return None
+
+    digest = sha256(f"lexicon-v{LEXICON_VERSION}".encode())
+    for source in paths:
+        digest.update(source.encode())
+        if os.path.exists(source):
+            stat = os.stat(source)
+            digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.digest()
+
+
+def compile_section(words) -> tuple[bytes, int, int]:
+    """compile_section encodes a word list as its offsets, hash table and sorted data.
+
+    Returns:
+        tuple[bytes,int,int]: the encoded section, its word count, and its hash table size.
+    """
+    entries = sorted({word.encode("utf-8", "surrogatepass") for word in words})
+    count = len(entries)
+    table_size = 1
+    while table_size < count * 2:
+        table_size *= 2
+
+    offsets = array("I", [0])
+    for entry in entries:
+        offsets.append(offsets[-1] + len(entry))
+    slots = array("I", [EMPTY_SLOT]) * table_size
+    mask = table_size - 1
+    for index, entry in enumerate(entries):
+        slot = crc32(entry) & mask
+        while slots[slot] != EMPTY_SLOT:
+            slot = (slot + 1) & mask
+        slots[slot] = index
+    data = offsets.tobytes() + slots.tobytes() + b"".join(entries)
+    # pad so that the next section's offsets stay 4-byte aligned
+    data += b"\0" * (-len(data) % 4)
+    return data, count, table_size
+
+
+def build_lexicon(config: JobScrapeConfig, fingerprint: bytes | None = None) -> None:
+    """build_lexicon compiles the source word lists into the artifact at config.lexicon_path.
+    The artifact is written to a temporary file and renamed into place,
+    so processes that already mapped the old artifact are unaffected.
+
+    Args:
+        config (JobScrapeConfig): the configuration naming the sources and the artifact.
+        fingerprint (bytes | None): the source fingerprint, computed if not provided.
+    """
+    fingerprint = fingerprint or source_fingerprint(config)
+    words = read_source_words(config)
+
+    compiled = [(name, *compile_section(words[name])) for name in SECTIONS]
+    position = HEADER.size + SECTION.size * len(compiled)
+    header = HEADER.pack(MAGIC, LEXICON_VERSION, len(compiled), fingerprint)
+    table = b""
+    for name, data, count, table_size in compiled:
+        table += SECTION.pack(name.encode("ascii"), count, table_size, position)
+        position += len(data)
+
+    temp_path = f"{config.lexicon_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(header + table)
+        for _name, data, _count, _table_size in compiled:
+            file.write(data)
+    os.replace(temp_path, config.lexicon_path)
+    logger.info("Compiled lexicon to %s", config.lexicon_path)
+
+
+_lexicons: dict[str, Lexicon] = {}
+_lexicon_lock = Lock()
+
+
+def load_lexicon(config: JobScrapeConfig) -> Lexicon:
+    """load_lexicon returns the process-wide Lexicon for the config,
+    compiling the artifact first if it is missing or its sources have changed.
+    On a host without the nltk corpora the sources can't be checked, so a valid artifact,
+    e.g. one shipped prebuilt, is used as it is.
+
+    Args:
+        config (JobScrapeConfig): the configuration naming the sources and the artifact.
+
+    Returns:
+        Lexicon: a memory-mapped, read-only lexicon.
+    """
+    with _lexicon_lock:
+        lexicon = _lexicons.get(config.lexicon_path)
+        if lexicon is not None:
+            return lexicon
+
+        fingerprint = source_fingerprint(config)
+        try:
+            lexicon = Lexicon(config.lexicon_path)
+        except (OSError, ValueError, struct.error):
+            lexicon = None
+        if fingerprint is None and lexicon is not None:
+            logger.info(
+                "The lexicon sources aren't installed, using %s as it is.", config.lexicon_path
+            )
+        elif lexicon is None or lexicon.fingerprint != fingerprint:
+            build_lexicon(config, fingerprint)
+            lexicon = Lexicon(config.lexicon_path)
+
+        _lexicons[config.lexicon_path] = lexicon
+        return lexicon
+
+
+if __name__ == "__main__":
+    from scrape.configs import read_config
+
+    build_lexicon(read_config("./config.json")[0])
@@ -1,4 +1,18 @@
+import atexit
+import json
 import logging
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from queue import Queue
+from threading import Lock
+from time import monotonic
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+if TYPE_CHECKING:
+    from scrape.configs import JobScrapeConfig
 
 logger = logging.getLogger("jobscraper")
 logger.setLevel(level=logging.INFO)
@@ -7,3 +21,161 @@ formatter = logging.Formatter("[jobscraper]: %(asctime)s - %(message)s")
 stream_handler = logging.StreamHandler()
 stream_handler.setFormatter(formatter)
 logger.addHandler(stream_handler)
+
+# the company and stage each thread is working on, stamped on every record it logs
+company_id: ContextVar[str] = ContextVar("company_id", default="")
+job_id: ContextVar[str] = ContextVar("job_id", default="")
+stage: ContextVar[str] = ContextVar("stage", default="")
+CONTEXT = {"company_id": company_id, "job_id": job_id, "stage": stage}
+run_id = ""
+
+
+@contextmanager
+def log_context(**ids: str):
+    """Stamps the records logged inside the block, on this thread, with a company_id, job_id or stage."""
+    tokens = [(CONTEXT[name], CONTEXT[name].set(value)) for name, value in ids.items()]
+    try:
+        yield
+    finally:
+        for variable, token in reversed(tokens):
+            variable.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """ContextFilter copies the run id and the logging thread's context onto each record,
+    as the listener formatting it runs on another thread.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.run_id = run_id
+        for name, variable in CONTEXT.items():
+            setattr(record, name, variable.get())
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """SamplingFilter thins out the records of chatty messages, by message template,
+    so that a run of thousands of companies still leaves a readable log.
+    Warnings and errors are always kept.
+    The next record kept of a template carries how many were dropped since the last one.
+
+    Args:
+        sampling (dict[str, float]): the share of records kept, per message template.
+        rate_limit (float): the most records a second kept per message template; 0 keeps them all.
+    """
+
+    def __init__(self, sampling: dict[str, float] | None = None, rate_limit: float = 0.0):
+        super().__init__()
+        self.sampling = sampling or {}
+        self.rate_limit = rate_limit
+        self.burst = max(1.0, rate_limit)
+        # per template: the tokens left, when they were last topped up, and the records dropped
+        self.buckets: dict[str, list[float]] = {}
+        self.lock = Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        template = str(record.msg)
+        keep = random.random() < self.sampling.get(template, 1.0)
+        with self.lock:
+            bucket = self.buckets.setdefault(template, [self.burst, monotonic(), 0])
+            if keep and self.rate_limit > 0:
+                now = monotonic()
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate_limit)
+                bucket[1] = now
+                keep = bucket[0] >= 1
+                if keep:
+                    bucket[0] -= 1
+            if not keep:
+                bucket[2] += 1
+                return False
+            record.suppressed = int(bucket[2])
+            bucket[2] = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """JsonFormatter writes each record as one line of JSON, with its run, company, job and stage ids."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, DATEFMT),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+            "run_id": getattr(record, "run_id", ""),
+        }
+        for name in (*CONTEXT, "suppressed"):
+            value = getattr(record, name, None)
+            if value:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """DeferredQueueHandler hands records to the listener as they are,
+    leaving the message to be merged with its arguments and formatted on the listener's thread.
+    Arguments should therefore not be changed after they are logged.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: QueueListener | None = None
+_listener_lock = Lock()
+
+
+def configure_logging(config: "JobScrapeConfig") -> QueueListener:
+    """configure_logging moves the logger's output onto a background listener thread:
+    records are queued by the thread that logs them, and formatted and written by the listener,
+    as text or, with config.log_format set to "json", as JSON lines.
+    Records go to config.log_path, or to stderr if it isn't set.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+
+    Returns:
+        QueueListener: the running listener.
+    """
+    global _listener, run_id  # pylint: disable=global-statement
+    stop_logging()
+    # a render process forked from the run keeps the run's id
+    run_id = run_id or uuid4().hex[:12]
+    handler = logging.FileHandler(config.log_path) if config.log_path else logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if config.log_format == "json" else formatter)
+
+    queue_handler = DeferredQueueHandler(Queue())
+    queue_handler.addFilter(SamplingFilter(config.log_sampling, config.log_rate_limit))
+    queue_handler.addFilter(ContextFilter())
+    for existing in list(logger.handlers):
+        logger.removeHandler(existing)
+    logger.addHandler(queue_handler)
+    logger.setLevel(config.log_level.upper())
+
+    with _listener_lock:
+        _listener = QueueListener(queue_handler.queue, handler, respect_handler_level=True)
+        _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Writes every record still queued and stops the listener, if there is one,
+    handing the logger back to the plain stream handler.
+    """
+    global _listener  # pylint: disable=global-statement
+    with _listener_lock:
+        if _listener is not None:
+            for existing in list(logger.handlers):
+                logger.removeHandler(existing)
+            logger.addHandler(stream_handler)
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+
+
+atexit.register(stop_logging)
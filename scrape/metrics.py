@@ -0,0 +1,232 @@
+import json
+import os
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from threading import Event, Lock, Thread
+from time import perf_counter
+
+from scrape.configs import JobScrapeConfig
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_NOOP = nullcontext()
+
+
+def label_key(labels: dict[str, object]) -> tuple[tuple[str, str], ...]:
+    """Turns keyword labels into a hashable, ordered key."""
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def render_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    """Renders a label key as Prometheus labels, e.g. {host="api.builtin.com"}."""
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Histogram:
+    """Histogram counts observations into fixed latency buckets, in seconds."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, share: float) -> float:
+        """Estimates a quantile as the upper bound of the bucket it falls in."""
+        rank = share * self.count
+        seen = 0
+        for bound, count in zip((*BUCKETS, float("inf")), self.counts):
+            seen += count
+            if seen >= rank and count:
+                return bound
+        return 0.0
+
+
+class Metrics:
+    """Metrics is a registry of labelled counters and latency histograms.
+    When it is disabled, recording a metric returns straight away.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.counters: dict[tuple, float] = {}
+        self.histograms: dict[tuple, Histogram] = {}
+        self.lock = Lock()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Adds value to a counter."""
+        if not self.enabled:
+            return
+        key = (name, label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """Records a latency in a histogram."""
+        if not self.enabled:
+            return
+        key = (name, label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def timer(self, name: str, **labels):
+        """Returns a context manager that records how long its block took."""
+        if not self.enabled:
+            return _NOOP
+        return self._timer(name, labels)
+
+    @contextmanager
+    def _timer(self, name: str, labels: dict):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start, **labels)
+
+    def summary(self) -> dict:
+        """summary returns every metric as plain data, for the end of run JSON export."""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {
+                key: (h.count, h.sum, h.quantile(0.5), h.quantile(0.95))
+                for key, h in self.histograms.items()
+            }
+        return {
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(counters.items())
+            ],
+            "histograms": [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": count,
+                    "sum_seconds": round(total, 6),
+                    "p50_seconds": p50,
+                    "p95_seconds": p95,
+                }
+                for (name, labels), (count, total, p50, p95) in sorted(histograms.items())
+            ],
+        }
+
+    def prometheus_text(self) -> str:
+        """prometheus_text renders every metric in the Prometheus text exposition format."""
+        lines = []
+        typed: set[str] = set()
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE jobscraper_{name} counter")
+                    typed.add(name)
+                lines.append(f"jobscraper_{name}{render_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE jobscraper_{name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, count in zip((*BUCKETS, "+Inf"), histogram.counts):
+                    cumulative += count
+                    bucket = render_labels((*labels, ("le", str(bound))))
+                    lines.append(f"jobscraper_{name}_bucket{bucket} {cumulative}")
+                lines.append(f"jobscraper_{name}_sum{render_labels(labels)} {histogram.sum}")
+                lines.append(f"jobscraper_{name}_count{render_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str) -> None:
+        """Writes the summary to a JSON file."""
+        atomic_write(path, json.dumps(self.summary(), indent=2))
+
+    def write_textfile(self, path: str) -> None:
+        """Writes the metrics to a Prometheus textfile, replacing the previous one in one step."""
+        atomic_write(path, self.prometheus_text())
+
+
+def atomic_write(path: str, text: str) -> None:
+    """Writes text to a temporary file, then renames it over path."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(temp_path, path)
+
+
+class TextfileExporter:
+    """TextfileExporter rewrites the Prometheus textfile every interval seconds on a background thread."""
+
+    def __init__(self, metrics: Metrics, path: str, interval: float = 15.0):
+        self.metrics = metrics
+        self.path = os.path.abspath(path)
+        self.interval = interval
+        self.stopped = Event()
+        self.thread = Thread(target=self.run, name="metrics_textfile", daemon=True)
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.metrics.write_textfile(self.path)
+
+    def start(self) -> "TextfileExporter":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the thread and writes the final values."""
+        self.stopped.set()
+        self.thread.join()
+        self.metrics.write_textfile(self.path)
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Returns the process-wide Metrics registry."""
+    return _metrics
+
+
+def configure_metrics(config: JobScrapeConfig) -> Metrics:
+    """configure_metrics turns the shared registry on or off, as config.metrics_enabled says.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+
+    Returns:
+        Metrics: the shared registry.
+    """
+    _metrics.enabled = config.metrics_enabled
+    return _metrics
+
+
+def timed(name: str, **labels):
+    """timed is a decorator recording how long each call of the function takes in a histogram.
+
+    Args:
+        name (str): the histogram's name.
+        **labels: labels to attach to the histogram.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _metrics.enabled:
+                return func(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _metrics.observe(name, perf_counter() - start, **labels)
+
+        return wrapper
+
+    return decorator
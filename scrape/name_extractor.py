@@ -0,0 +1,78 @@
+from html.parser import HTMLParser
+
+from scrape.lexicon import LexiconSection
+
+SKIPPED_TAGS = {"script", "style", "noscript", "template"}
+
+
+class NameExtractor(HTMLParser):
+    """NameExtractor tokenises raw HTML as it is fed, without building a tree,
+    and collects first-name candidates along with the token that follows each of them.
+    Tokens are split on single spaces and filtered against the webtext words,
+    as fetch_names_from_page_sources does with a BeautifulSoup page.
+
+    Args:
+        set_of_firstnames (LexiconSection): the first names to look for.
+        set_webtext (LexiconSection): common words that are skipped.
+        max_candidates (int): stop once this many candidates have a following token.
+    """
+
+    def __init__(
+        self,
+        set_of_firstnames: LexiconSection,
+        set_webtext: LexiconSection,
+        max_candidates: int = 20,
+    ):
+        super().__init__(convert_charrefs=True)
+        self.set_of_firstnames = set_of_firstnames
+        self.set_webtext = set_webtext
+        self.max_candidates = max_candidates
+        self.candidates: list[tuple[str, str | None]] = []
+        self.skip_depth = 0
+        self.partial = ""
+        self.awaiting_next = False
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_data(self, data):
+        if self.skip_depth or self.done:
+            return
+        *tokens, self.partial = (self.partial + data).split(" ")
+        for token in tokens:
+            self.add_token(token)
+
+    def close(self):
+        super().close()
+        if not self.done:
+            self.add_token(self.partial)
+        self.partial = ""
+
+    def add_token(self, token: str) -> None:
+        """add_token records one token of visible text."""
+        if self.done or token.lower() in self.set_webtext:
+            return
+        if self.awaiting_next:
+            first, _ = self.candidates[-1]
+            self.candidates[-1] = (first, token)
+            self.awaiting_next = False
+            if len(self.candidates) >= self.max_candidates:
+                self.done = True
+                return
+        if token and token.title() in self.set_of_firstnames:
+            self.candidates.append((token, None))
+            self.awaiting_next = True
+
+    def best_candidate(self) -> tuple[str, str | None]:
+        """best_candidate returns the longest first-name candidate, and the token after it.
+
+        Raises:
+            ValueError: if no first names were found.
+        """
+        return max(self.candidates, key=lambda candidate: len(candidate[0]))
@@ -1,29 +1,48 @@
 import re
 from contextlib import suppress
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
-from bs4 import BeautifulSoup
-from googlesearch import search
-from nltk.corpus import names, webtext
 from requests.exceptions import (HTTPError, ProxyError, RequestException,
                                  Timeout)
 from tld import get_tld
 
+from scrape.brand_matcher import BrandMatcher
+from scrape.business_card import BusinessCard
 from scrape.company_result import CompanyResult
 from scrape.configs import JobScrapeConfig
-from scrape.log import logger
-from scrape.web_scraper import webscrape_results
+from scrape.lexicon import LexiconSection, load_lexicon
+from scrape.log import log_context, logger
+from scrape.metrics import get_metrics
+from scrape.name_extractor import NameExtractor
+from scrape.prefix_index import PrefixIndex
+from scrape.run_memo import get_run_memo
+from scrape.search_provider import get_search
+from scrape.web_scraper import stream_page, webscrape_results
 
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
-@dataclass(order=True)
-class BusinessCard:
-    """_summary_"""
+DEFAULT_NAME = ("To", "Whom It", "May Concern")
+# cheapest and most reliable first: a slug needs no request, a page needs a download
+STRATEGY_ORDER = ("linkedin_slug", "username_split", "page_scrape")
+STRATEGY_SCORES = {"linkedin_slug": 0.5, "username_split": 0.4, "page_scrape": 0.4}
+
+
+@dataclass(slots=True)
+class NameCandidate:
+    """dataclass of a name found by one strategy, and how confident we are in it"""
 
+    score: float
     greeting: str
-    fname: str
-    surname: str
-    fullname: str
-    workplace: str
+    first: str
+    last: str
+    strategy: str
+    link: str
+
+    @property
+    def fullname(self) -> str:
+        return f"{self.first} {self.last}"
 
 
 class NameFetcher:
@@ -37,103 +56,128 @@ class NameFetcher:
         self.company = company
         self.config = config
 
-        with open(config.brand_names, "r", encoding="utf8") as f:
-            brand_names = set(f.readlines())
-            self.set_of_brandnames: set[str] = {
-                brand.strip("\n") for brand in brand_names
-            }
-
-        self.set_of_firstnames: set[str] = set(names.words())
-        self.set_webtext: set[str] = set(webtext.words())
-        self.greeting: str = "To"
-        self.first: str = "Whom It"
-        self.last: str = "May Concern"
+        lexicon = load_lexicon(config)
+        self.set_of_brandnames: LexiconSection = lexicon.brand_names
+        self.set_of_firstnames: LexiconSection = lexicon.first_names
+        self.set_of_surnames: LexiconSection = lexicon.surnames
+        self.set_webtext: LexiconSection = lexicon.webtext
+        self.first_name_index: PrefixIndex = lexicon.first_name_index
+        self.brand_matcher: BrandMatcher = lexicon.brand_matcher
+        self.greeting, self.first, self.last = DEFAULT_NAME
 
-    def generate_urls_from_search_query(self):
-        """generate_urls_from_search_query searches google for urls matching its provided search query.
+    def generate_urls_from_search_query(self) -> list[str]:
+        """generate_urls_from_search_query searches the configured search provider for urls matching its provided search query.
 
         Returns:
-            A Generator that yields URL paths to be assessed or requested.
+            list[str]: URL paths to be assessed or requested.
         """
-        return search(
-            query=f'"{self.company.company_name}" \
-                            {self.config.search_query}',
-            start=0,
-            stop=3,
-            pause=4,
-            country="US",
-            verify_ssl=False,
-        )
+        return get_search().urls(self.company.company_name, self.config.search_query)
 
     def parse_provided_search_queries(self) -> BusinessCard:
         """parse_provided_search_queries searches for contact information based on urls and source page data.
+        The search results are tried cheapest and most reliable strategy first, each name found is scored,
+        and the search stops as soon as a name scores config.resolution_threshold or more.
+        The best name is used if it scores at least config.resolution_min_score;
+        otherwise the letter keeps its generic greeting.
 
         Returns:
             BusinessCard: A dataclass containing the contact's contact information and company.
         """
-
-        linkedin = self.config.site_queries[0]
         search_results: list[str] = self.generate_urls_from_search_query()
-        for link in search_results:
+        best: NameCandidate | None = None
+        for strategy, link in self.prioritise_links(search_results):
             logger.info("Getting: %s | %s", link, self.company.company_name)
+            candidate = self.try_strategy(strategy, link)
+            if candidate is None:
+                continue
+            logger.debug("%s scored %.2f by %s", candidate.fullname, candidate.score, strategy)
+            if best is None or candidate.score > best.score:
+                best = candidate
+            if best.score >= self.config.resolution_threshold:
+                break
+
+        if best is not None and best.score >= self.config.resolution_min_score:
+            self.greeting, self.first, self.last = best.greeting, best.first, best.last
+        else:
+            if best is not None:
+                logger.info(
+                    "%s scored only %.2f, keeping the generic greeting for %s",
+                    best.fullname,
+                    best.score,
+                    self.company.company_name,
+                )
+            self.greeting, self.first, self.last = DEFAULT_NAME
+        return BusinessCard(
+            greeting=self.greeting,
+            fname=self.first,
+            surname=self.last,
+            fullname=f"{self.first} {self.last}",
+            workplace=self.company.company_name,
+        )
 
-            if linkedin in link:
-                (
-                    self.greeting,
-                    self.first,
-                    self.last,
-                ) = self.fetch_names_from_linkedin_urls(link)
+    def prioritise_links(self, links: list[str]) -> list[tuple[str, str]]:
+        """prioritise_links pairs each search result with the strategies that read a name from it,
+        ordered LinkedIn slugs first, then domain usernames, then page scrapes,
+        each kept in search order. Reserved urls are dropped.
+        A link without a brand in it is tried as a domain username, and then, should no name
+        have scored well enough by the time the page scrapes come round, as a page too.
 
+        Args:
+            links (list[str]): the search results.
+
+        Returns:
+            list[tuple[str, str]]: (strategy, link) pairs, in the order to try them.
+        """
+        linkedin = self.config.site_queries[0]
+        planned = []
+        for link in links:
+            if linkedin in link:
+                strategy = "linkedin_slug"
             elif link.startswith(
                 self.config.site_queries[1]
                 or self.config.site_queries[2]
                 or self.config.site_queries[3],
             ):
                 logger.error("Skipping: %s, as it is a reserved url.", link)
-
-            elif [brand for brand in self.set_of_brandnames if brand in link] != 0:
+                continue
+            # the baseline's brand check compared a list to 0, which is always unequal, so every link
+            # was scraped; a brand-free link is now split as a username first, as it was meant to be
+            elif self.brand_matcher.find_all(link):
                 logger.debug("Brand matches found...")
-                try:
-                    response = webscrape_results(link, run_beautiful_soup=True)
-                    (
-                        self.greeting,
-                        self.first,
-                        self.last,
-                    ) = self.fetch_names_from_page_sources(response)
-                except (
-                    TypeError,
-                    HTTPError,
-                    AttributeError,
-                    ConnectionError,
-                    ProxyError,
-                    Timeout,
-                    IndexError,
-                    ValueError,
-                    RequestException,
-                ) as error_found:
-                    logger.error(error_found)
-
-            elif len([brand for brand in self.set_of_brandnames if brand in link]) == 0:
+                strategy = "page_scrape"
+            else:
                 logger.debug("no brand matches found")
-                username = get_tld(link, fail_silently=True, as_object=True).domain  # type: ignore
-                (
-                    self.greeting,
-                    self.first,
-                    self.last,
-                ) = self.compare_username_against_firstnames_set(username)
+                planned.append(("username_split", link))
+                strategy = "page_scrape"
+            planned.append((strategy, link))
+        return sorted(planned, key=lambda pair: STRATEGY_ORDER.index(pair[0]))
 
+    def try_strategy(self, strategy: str, link: str) -> NameCandidate | None:
+        """try_strategy reads a name from a link with the given strategy, and scores it.
+
+        Returns:
+            NameCandidate | None: the scored name, or None if the strategy found none.
+        """
+        self.greeting, self.first, self.last = DEFAULT_NAME
+        metrics = get_metrics()
+        metrics.inc("resolution_links_tried_total", strategy=strategy)
+        # timed here, not on the methods, as a dashless LinkedIn slug is split like a username
+        with metrics.timer("name_strategy_seconds", strategy=strategy):
+            if strategy == "linkedin_slug":
+                name = self.fetch_names_from_linkedin_urls(link)
+            elif strategy == "username_split":
+                username = link_domain(link)
+                if not username:
+                    logger.debug("%s has no domain to split into a name.", link)
+                    return None
+                name = self.compare_username_against_firstnames_set(username)
             else:
                 try:
-                    response = webscrape_results(link, run_beautiful_soup=True)
-                    (
-                        self.greeting,
-                        self.first,
-                        self.last,
-                    ) = self.fetch_names_from_page_sources(response)
+                    name = self.fetch_names_from_page(link)
                 except (
                     TypeError,
-                    AttributeError,
                     HTTPError,
+                    AttributeError,
                     ConnectionError,
                     ProxyError,
                     Timeout,
@@ -142,17 +186,96 @@ class NameFetcher:
                     RequestException,
                 ) as error_found:
                     logger.error(error_found)
+                    return None
+        if tuple(name) == DEFAULT_NAME or not name[1] or not name[2]:
+            return None
+        greeting, first, last = name
+        return NameCandidate(
+            score=self.score_name(first, last, strategy),
+            greeting=greeting,
+            first=first,
+            last=last,
+            strategy=strategy,
+            link=link,
+        )
 
-        return BusinessCard(
-            greeting=self.greeting,
-            fname=self.first,
-            surname=self.last,
-            fullname=f"{self.first} {self.last}",
-            workplace=self.company.company_name,
+    def score_name(self, first: str, last: str, strategy: str) -> float:
+        """score_name rates how likely a name is to be a real person's, between 0 and 1:
+        a base for the strategy that found it, plus a bonus for a known first name
+        and for a known surname, less a penalty if the surname is a brand.
+
+        Args:
+            first (str): the first name.
+            last (str): the surname.
+            strategy (str): the strategy that found the name.
+
+        Returns:
+            float: the name's score.
+        """
+        score = STRATEGY_SCORES[strategy]
+        if first.title() in self.set_of_firstnames:
+            score += 0.25
+        if last.upper() in self.set_of_surnames:
+            score += 0.25
+        if last in self.set_of_brandnames or last.title() in self.set_of_brandnames:
+            score -= 0.5
+        return max(0.0, min(1.0, score))
+
+    def fetch_names_from_page(self, link: str) -> tuple[str, str, str]:
+        """fetch_names_from_page fetches a candidate page and extracts a name from it,
+        streaming the page through a NameExtractor unless streaming_extraction is turned off.
+
+        Args:
+            link (str): the url of the page.
+
+        Returns:
+            tuple[str,str,str]: A tuple containing a self.greeting, self.first, and self.last name.
+        """
+        if self.config.streaming_extraction:
+            return self.fetch_names_from_page_stream(link)
+        response = webscrape_results(link, run_beautiful_soup=True)
+        return self.fetch_names_from_page_sources(response)
+
+    def fetch_names_from_page_stream(self, link: str) -> tuple[str, str, str]:
+        """fetch_names_from_page_stream feeds a page to a NameExtractor as it downloads,
+        and stops reading once enough first-name candidates have been seen.
+
+        Args:
+            link (str): the url of the page.
+
+        Returns:
+            tuple[str,str,str]: A tuple containing a self.greeting, self.first, and self.last name.
+        """
+        extractor = NameExtractor(
+            self.set_of_firstnames,
+            self.set_webtext,
+            max_candidates=self.config.page_max_candidates,
         )
+        for chunk in stream_page(link, max_bytes=self.config.page_max_bytes):
+            extractor.feed(chunk)
+            if extractor.done:
+                break
+        extractor.close()
+
+        try:
+            self.first, next_token = extractor.best_candidate()
+        except ValueError as error_found:
+            logger.error(error_found)
+            return self.greeting, self.first, self.last
+
+        with suppress(TypeError, IndexError):
+            name = (self.first, upper_camel_case_split(next_token)[0])  # type: ignore
+            logger.debug("Name found: %s", name)
+            if name[1] in self.set_of_brandnames:
+                logger.info(
+                    "%s is for a brand, or is otherwise invalid. We encourage further review. Proceeding to next name.",
+                    name,
+                )
+            self.greeting, self.first, self.last = "Dear", name[0], name[1]
+        return self.greeting, self.first, self.last
 
     def fetch_names_from_page_sources(
-        self, soup: BeautifulSoup
+        self, soup: "BeautifulSoup"
     ) -> tuple[str, str, str]:
         """fetch_names_from_page_sources takes a page source object from BeautifulSoup
             and from it extracts a self.first and self.last name.
@@ -163,7 +286,9 @@ class NameFetcher:
         Returns:
             tuple[str,str]: A tuple containing a self.first and self.last name.
         """
-        soup_text = soup.text.split(" ")
+        page_text = soup.text
+        page_brands = set(self.brand_matcher.find_all(page_text))
+        soup_text = page_text.split(" ")
         all_text: list[str] = [word for word in soup_text]
         entire_body: list[str] = [
             word for word in all_text if word.lower() not in self.set_webtext
@@ -181,16 +306,15 @@ class NameFetcher:
 
         with suppress(TypeError, IndexError):
             full_names = next_grams(entire_body, self.first)
-            logger.info(full_names)
+            logger.debug("Names found: %s", full_names)
             for name in full_names:
-                logger.info(name)
-                if name[1] in self.set_of_brandnames:
+                if name[1] in page_brands:
                     logger.info(
                         "%s is for a brand, or is otherwise invalid. We encourage further review. Proceeding to next name.",
                         name,
                     )
                 elif name[1] is None:
-                    logger.info(f"{name} is not a name.")
+                    logger.debug("%s is not a name.", name)
                 self.greeting, self.first, self.last = "Dear", name[0], name[1]
         return self.greeting, self.first, self.last
 
@@ -209,7 +333,7 @@ class NameFetcher:
         # split out the vanity url into a list.
         # the self.first part of the url will almost definitely have it.
         counter = username.count("-")
-        logger.info(f"{counter}-dashes found in username: \n {username}")
+        logger.debug("%s-dashes found in username: %s", counter, username)
 
         if counter == 0:
             (
@@ -251,11 +375,7 @@ class NameFetcher:
             _type_: _description_
         """
         self.greeting = "Dear"
-        first_candidates = [
-            first_name.strip()
-            for first_name in self.set_of_firstnames
-            if first_name.lower() in username and username.find(first_name.lower()) == 0
-        ]
+        first_candidates = self.first_name_index.prefixes(username)
         len_first_candidates = len(first_candidates)
 
         if (
@@ -266,12 +386,11 @@ class NameFetcher:
 
         elif len_first_candidates >= 2:
             # if multiple matches found, then go for the
-            # longest one as that's likely to be the whole name
-            logger.info(first_candidates)
-            self.first = max(first_candidates, key=len).title()
-            logger.info(self.first)
+            # longest one as that's likely to be the whole name;
+            # the index returns the candidates longest first
+            self.first = first_candidates[0].title()
             self.last = username[len(self.first) :].title()
-            logger.info(self.last)
+            logger.debug("%s split into %s %s", first_candidates, self.first, self.last)
 
         else:  # if no other matches, but a username is present,
             # split that username down the middle as close as
@@ -284,6 +403,17 @@ class NameFetcher:
         return self.greeting, self.first, self.last
 
 
+def resolve_contact(company: CompanyResult, config: JobScrapeConfig) -> BusinessCard:
+    """resolve_contact finds the contact of a company once per company alias for the whole run,
+    so that every job the company posts, in whichever search, is addressed to the same person.
+    """
+    with log_context(stage="resolve", company_id=company.alias, job_id=company.job_id):
+        return get_run_memo().contacts.get(
+            company.alias,
+            lambda: NameFetcher(company=company, config=config).parse_provided_search_queries(),
+        )
+
+
 def next_grams(
     target_list: list, target_name: str, num_grams: int = 1
 ) -> list[tuple[str, str]]:
@@ -326,14 +456,19 @@ def fetch_username_str_from_link(link: str) -> str:
     Returns:
         str: _description_
     """
-    logger.info(link)
-
     # split up linkedin url so that the vanity content is on the right
     if "/in/" in link:
         __prefix, __sep, username = link.partition("/in/")
-        i = min(username.find("?"), username.find("/"))
-        username = username[:i].strip()
+        username = re.split(r"[/?#]", username, maxsplit=1)[0].strip()
     else:
-        username = get_tld(link, fail_silently=True, as_object=True).domain  # type: ignore
-    logger.info(username)
+        username = link_domain(link)
+    logger.debug("Username of %s: %s", link, username)
     return username
+
+
+def link_domain(link: str) -> str:
+    """link_domain returns the registered domain of a link, without its TLD,
+    or an empty string for a link without one, such as an IP address or an unknown TLD.
+    """
+    parsed = get_tld(link, fail_silently=True, as_object=True)
+    return "" if parsed is None else parsed.domain  # type: ignore
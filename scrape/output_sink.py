@@ -0,0 +1,235 @@
+import os
+import tempfile
+from queue import Queue
+from threading import Lock, Thread
+from typing import Callable
+
+from scrape.configs import JobScrapeConfig
+from scrape.log import logger
+
+STOP = object()
+
+
+class OutputSink:
+    """OutputSink writes the files of a run under one root directory, by explicit path,
+    so that writing never depends on, or changes, the working directory.
+    Each directory is created once. Every file is written to a temporary file beside it
+    and renamed into place, so a reader never sees half a letter.
+    With write_behind, files are handed to a background thread and written in order,
+    so the thread rendering the letters doesn't wait on the disk; the files still waiting
+    when the process dies are lost, though never left half written.
+    Files handed over with an on_done callback are reported through it once they are on disk,
+    or failed to be, on whichever thread wrote them. An error writing a file without one
+    is re-raised by the next write, flush or close. A failed file never stops the files behind it.
+
+    Args:
+        root (str): the directory every file is written under.
+        write_behind (bool): write on a background thread. Defaults to False, writing in the caller.
+        queue_size (int): how many files may wait for the background thread before a write blocks.
+    """
+
+    def __init__(self, root: str, write_behind: bool = False, queue_size: int = 64):
+        self.root = os.path.abspath(root)
+        self.directories: set[str] = set()
+        self.error: BaseException | None = None
+        self.lock = Lock()
+        self.queue: Queue | None = None
+        self.thread: Thread | None = None
+        if write_behind:
+            self.queue = Queue(maxsize=max(1, queue_size))
+            self.thread = Thread(target=self.drain, name="output_sink", daemon=True)
+            self.thread.start()
+
+    def path(self, *parts: str) -> str:
+        """Returns the absolute path of a file under the root."""
+        return os.path.join(self.root, *parts)
+
+    def directory(self, *parts: str) -> str:
+        """Returns the absolute path of a directory under the root, creating it on first use."""
+        directory = self.path(*parts)
+        with self.lock:
+            if directory not in self.directories:
+                os.makedirs(directory, exist_ok=True)
+                self.directories.add(directory)
+        return directory
+
+    def write_text(self, path: str, text: str) -> None:
+        """Writes text, encoded as UTF-8, to a path under the root."""
+        self.write_bytes(path, text.encode("utf-8"))
+
+    def write_bytes(
+        self,
+        path: str,
+        data: bytes,
+        on_done: Callable[[BaseException | None], None] | None = None,
+    ) -> None:
+        """write_bytes writes data to a path under the root, now or on the background thread.
+
+        Args:
+            path (str): the file's path, relative to the root.
+            data (bytes): the file's contents.
+            on_done (Callable[[BaseException | None], None] | None): called once the file is written,
+            with None, or with the error writing it raised. Defaults to None, raising that error.
+        """
+        self.write_files([(path, data)], on_done)
+
+    def write_files(
+        self,
+        files: list[tuple[str, bytes]],
+        on_done: Callable[[BaseException | None], None] | None = None,
+    ) -> None:
+        """write_files writes several files under the root, now or on the background thread,
+        reporting them together once the last one is written.
+
+        Args:
+            files (list[tuple[str, bytes]]): the path, relative to the root, and contents of each file.
+            on_done (Callable[[BaseException | None], None] | None): called once every file is written,
+            with None, or with the first error writing them raised. Defaults to None, raising that error.
+        """
+        targets = [(self.path(path), data) for path, data in files]
+        for target, _data in targets:
+            self.directory(os.path.dirname(target))
+        if self.queue is None:
+            error_found = write_all(targets)
+            if on_done is None:
+                if error_found is not None:
+                    raise error_found
+            else:
+                on_done(error_found)
+        else:
+            self.raise_error()
+            self.queue.put((targets, on_done))
+
+    def drain(self) -> None:
+        """The loop of the background thread, writing each file in the order it was handed over."""
+        while True:
+            item = self.queue.get()  # type: ignore
+            try:
+                if item is STOP:
+                    return
+                targets, on_done = item
+                error_found = write_all(targets)
+                if on_done is not None:
+                    try:
+                        on_done(error_found)
+                    except Exception:
+                        logger.exception("Reporting %s as written failed.", targets[0][0])
+                elif error_found is not None and self.error is None:
+                    self.error = error_found
+            finally:
+                self.queue.task_done()  # type: ignore
+
+    def wait(self) -> None:
+        """Waits until every file handed to the background thread is written, or failed to be."""
+        if self.queue is not None:
+            self.queue.join()
+
+    def flush(self) -> None:
+        """Waits until every file handed to the background thread is written."""
+        self.wait()
+        self.raise_error()
+
+    def raise_error(self) -> None:
+        """Re-raises the first error the background thread met writing a file with no on_done, if there was one."""
+        if self.error is not None:
+            error_found, self.error = self.error, None
+            raise error_found
+
+    def close(self) -> None:
+        """Writes whatever is still waiting and stops the background thread."""
+        if self.thread is not None:
+            self.queue.put(STOP)  # type: ignore
+            self.thread.join()
+            self.thread = None
+        self.raise_error()
+
+
+def write_all(targets: list[tuple[str, bytes]]) -> BaseException | None:
+    """Writes every file, even past one that fails, returning the first error raised, if any."""
+    first_error = None
+    for target, data in targets:
+        try:
+            atomic_write_bytes(target, data)
+        except Exception as error_found:
+            first_error = first_error or error_found
+    return first_error
+
+
+_file_mode: int | None = None
+_file_mode_lock = Lock()
+
+
+def file_mode(directory: str) -> int:
+    """file_mode returns the mode open() gives a new file, rather than mkstemp's 0600,
+    probed once per process by creating a file in directory. The umask itself can only be read
+    by setting it, which would change it for every other thread while it was being read.
+    """
+    global _file_mode  # pylint: disable=global-statement
+    with _file_mode_lock:
+        if _file_mode is None:
+            handle, probe = tempfile.mkstemp(dir=directory, prefix=".mode.", suffix=".tmp")
+            os.close(handle)
+            os.unlink(probe)
+            handle = os.open(probe, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            try:
+                _file_mode = os.fstat(handle).st_mode & 0o777
+            finally:
+                os.close(handle)
+                os.unlink(probe)
+        return _file_mode
+
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    """Writes data to a temporary file in path's directory, then renames it over path."""
+    directory = os.path.dirname(path)
+    mode = file_mode(directory)
+    handle, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        os.fchmod(handle, mode)
+        with os.fdopen(handle, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+_sink: OutputSink | None = None
+_sink_lock = Lock()
+
+
+def _forget_sink() -> None:
+    """Drops the sink a forked process inherits: its background thread didn't come along,
+    and the files still queued in it are the parent's to write.
+    """
+    global _sink, _sink_lock  # pylint: disable=global-statement
+    _sink = None
+    _sink_lock = Lock()
+
+
+os.register_at_fork(after_in_child=_forget_sink)
+
+
+def get_sink(config: JobScrapeConfig, root: str) -> OutputSink:
+    """get_sink returns the process-wide OutputSink for root, opening it on first use,
+    writing behind as config.write_behind says.
+    """
+    global _sink  # pylint: disable=global-statement
+    root = os.path.abspath(root)
+    with _sink_lock:
+        if _sink is None or _sink.root != root:
+            if _sink is not None:
+                _sink.close()
+            _sink = OutputSink(root, config.write_behind, config.write_behind_queue)
+        return _sink
+
+
+def close_sink() -> None:
+    """Writes whatever the process-wide OutputSink still holds, and forgets it."""
+    global _sink  # pylint: disable=global-statement
+    with _sink_lock:
+        if _sink is not None:
+            _sink.close()
+            _sink = None
@@ -0,0 +1,304 @@
+from json import JSONDecodeError
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Iterable, Iterator
+
+from requests import RequestException
+
+from scrape.builtinscrape import (ListingEntry, listing_entries,
+                                  prefetch_listings, shared_company_lookup,
+                                  stream_listing_entries)
+from scrape.business_card import BusinessCard
+from scrape.company_result import CompanyResult
+from scrape.configs import (JobScrapeConfig, ListingSearch, PersonaConfig,
+                            listing_searches)
+from scrape.coverletterwriter import CoverLetterWriter
+from scrape.dataset import append_row, get_dataset
+from scrape.journal import RunJournal
+from scrape.log import log_context, logger
+from scrape.namefetcher import resolve_contact
+from scrape.run_memo import get_run_memo
+
+STOP = object()
+POLL_SECONDS = 0.1
+
+
+class Pipeline:
+    """Pipeline runs a chain of stages on worker threads, joined by bounded queues.
+    A full queue blocks the stage feeding it, so no stage runs further ahead than the queue allows.
+    The first error raised by any stage, or by the items being fed in,
+    stops every stage and is re-raised by run.
+
+    Args:
+        queue_size (int): the capacity of the queue in front of each stage.
+    """
+
+    def __init__(self, queue_size: int = 8):
+        self.queue_size = queue_size
+        self.stages: list[tuple[str, Callable[[Any], Iterable], int]] = []
+        self.aborted = Event()
+        self.error: BaseException | None = None
+        self.lock = Lock()
+
+    def add_stage(
+        self, name: str, func: Callable[[Any], Iterable], workers: int = 1
+    ) -> "Pipeline":
+        """add_stage appends a stage. func takes one item and returns, or yields,
+        the items to hand to the next stage.
+        """
+        self.stages.append((name, func, max(1, workers)))
+        return self
+
+    def run(self, items: Iterable) -> None:
+        """run feeds the items to the first stage and blocks until every stage has drained."""
+        queues = [Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = []
+        for position, (name, func, workers) in enumerate(self.stages):
+            remaining = [workers]
+            for worker in range(workers):
+                thread = Thread(
+                    target=self.work,
+                    args=(name, func, queues[position], queues[position + 1], remaining),
+                    name=f"{name}-{worker}",
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        sink = Thread(target=self.drain, args=(queues[-1],), daemon=True)
+        sink.start()
+        try:
+            for item in items:
+                if not self.put(queues[0], item):
+                    break
+        except BaseException as error_found:
+            # an error reading the items stops the stages too, rather than leaving them waiting
+            self.abort(error_found)
+        self.put(queues[0], STOP)
+        for thread in threads:
+            thread.join()
+        sink.join()
+        if self.error is not None:
+            raise self.error
+
+    def work(self, name: str, func, inbox: Queue, outbox: Queue, remaining: list[int]) -> None:
+        """The loop each worker thread runs until its stage's input is exhausted."""
+        with log_context(stage=name):
+            while True:
+                item = self.get(inbox)
+                if item is STOP or self.aborted.is_set():
+                    # let the stage's other workers see the stop as well
+                    self.put(inbox, STOP)
+                    break
+                try:
+                    for result in func(item) or ():
+                        if not self.put(outbox, result):
+                            break
+                except BaseException as error_found:
+                    self.abort(error_found)
+                    break
+        with self.lock:
+            remaining[0] -= 1
+            last_worker = remaining[0] == 0
+        if last_worker:
+            self.put(outbox, STOP)
+
+    def drain(self, outbox: Queue) -> None:
+        """Discards whatever the last stage hands on, until it stops."""
+        while self.get(outbox) is not STOP:
+            pass
+
+    def abort(self, error_found: BaseException) -> None:
+        """Records the first error and tells every stage to stop."""
+        with self.lock:
+            if self.error is None:
+                self.error = error_found
+        self.aborted.set()
+
+    def put(self, queue: Queue, item) -> bool:
+        """Puts an item on a queue, waiting for room unless the pipeline has been aborted."""
+        while not self.aborted.is_set():
+            try:
+                queue.put(item, timeout=POLL_SECONDS)
+                return True
+            except Full:
+                continue
+        return False
+
+    def get(self, queue: Queue):
+        """Takes an item from a queue, returning STOP if the pipeline is aborted while waiting."""
+        while True:
+            try:
+                return queue.get(timeout=POLL_SECONDS)
+            except Empty:
+                if self.aborted.is_set():
+                    return STOP
+
+
+def run_pipeline(
+    config: JobScrapeConfig,
+    persona: PersonaConfig,
+    journal: RunJournal,
+    render_letters: bool = True,
+) -> None:
+    """run_pipeline writes the same cover letters as run_serial,
+    with listing fetches, company lookups, contact resolution and letter rendering
+    each running on their own workers, as set by config.pipeline_workers.
+    Listing pages are fetched config.prefetch_pages ahead by prefetch_listings,
+    or, with config.streaming_listings, read one at a time as they download,
+    so that the first company's lookup starts before the rest of its page has arrived;
+    a page is then only requested once the one before it has shown it holds jobs.
+    The pages of every search of listing_searches flow through the same stages,
+    each job going through them once however many searches list it.
+    A job that raises in a stage is recorded as failed in the journal and dropped,
+    rather than stopping the pipeline; a resumed run tries it again until it runs out of attempts.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+        persona (PersonaConfig): information on you, the applicant.
+        journal (RunJournal): records each finished stage, and the work to skip when resuming.
+        render_letters (bool): write the letters, or stop once each contact is resolved,
+        leaving the letters to a later render. Defaults to True.
+    """
+    workers = {"listing": 1, "lookup": 1, "resolve": 1, "render": 1}
+    workers.update(config.pipeline_workers)
+    dataset = get_dataset()
+
+    run_memo = get_run_memo()
+    searches = listing_searches(config)
+
+    def unwritten(entries: Iterable[ListingEntry], page: int) -> Iterator[ListingEntry]:
+        for entry in entries:
+            if not run_memo.first_sighting(entry.job_id):
+                continue
+            journal.mark_listing(entry.job_id, page)
+            if not journal.settled(entry.job_id):
+                yield entry
+
+    def read_listing(listing: tuple[ListingSearch, int, dict]) -> Iterator[ListingEntry]:
+        search, page, docs = listing
+        yield from unwritten(listing_entries(docs, search.region_id), page)
+
+    # the first page of a search to come back without jobs ends that search's listing
+    last_page = {search.name: config.total_pages for search in searches}
+
+    def stream_listing(listing: tuple[ListingSearch, int, Event]) -> Iterator[ListingEntry]:
+        search, page, decided = listing
+        entries = stream_listing_entries(
+            search.url_builtin,
+            {**search.querystring, "page": page},
+            search.region_id,
+            descriptions=dataset is not None,
+        )
+        # the page's own jobs, counted before the journal and earlier searches filter them,
+        # so that a page whose jobs were all handled already doesn't end the listing
+        seen = [0]
+
+        def counted(entries: Iterable[ListingEntry]) -> Iterator[ListingEntry]:
+            for entry in entries:
+                seen[0] += 1
+                # the page has jobs, so the next one may be fetched
+                decided.set()
+                yield entry
+
+        try:
+            yield from unwritten(counted(entries), page)
+        except (RequestException, JSONDecodeError) as error_found:
+            logger.warning(
+                "Listing page %s of the %s search could not be read: %s",
+                page,
+                search.name,
+                error_found,
+            )
+            return
+        else:
+            if not seen[0]:
+                last_page[search.name] = min(last_page[search.name], page)
+        finally:
+            decided.set()
+
+    def streamed_pages() -> Iterator[tuple[ListingSearch, int, Event]]:
+        for search in searches:
+            for page in range(config.total_pages):
+                decided = Event()
+                yield search, page, decided
+                # the next page isn't handed on until this one has shown whether it holds jobs,
+                # so that nothing past the first page without jobs is fetched
+                while not decided.wait(POLL_SECONDS):
+                    if pipeline.aborted.is_set():
+                        return
+                if page >= last_page[search.name]:
+                    break
+
+    def lookup(entry: ListingEntry) -> list[CompanyResult]:
+        company = journal.company(entry.job_id)
+        if company is None:
+            try:
+                company = entry.to_company_result(
+                    shared_company_lookup(entry.alias, entry.region_id)
+                )
+            except Exception as error_found:
+                journal.mark_failure(entry.job_id, "lookup_done", error_found)
+                company = None
+            if company is None:
+                append_row(entry.without_company(), outcome="lookup_failed")
+                return []
+            journal.mark_lookup(company)
+        return [company]
+
+    def resolve(company: CompanyResult) -> list[tuple[CompanyResult, BusinessCard]]:
+        business_card = journal.contact(company.job_id)
+        if business_card is None:
+            try:
+                business_card = resolve_contact(company, config)
+            except Exception as error_found:
+                journal.mark_failure(company.job_id, "contact_resolved", error_found)
+                append_row(company, outcome="resolve_failed")
+                return []
+            journal.mark_contact(company, business_card)
+        # a contact resumed from the journal is part of this run's dataset too
+        append_row(company, business_card)
+        return [(company, business_card)]
+
+    def letter_failed(company: CompanyResult, error_found: Exception) -> None:
+        journal.mark_failure(company.job_id, "letter_written", error_found)
+
+    def render(pair: tuple[CompanyResult, BusinessCard]) -> None:
+        company, business_card = pair
+        logger.info(
+            "Writing cover letter to %s at %s for the role of %s",
+            business_card.fullname,
+            business_card.workplace,
+            company.job_name,
+        )
+        try:
+            CoverLetterWriter(
+                company, contact=business_card, persona=persona, config=config
+            ).write(on_written=journal.mark_letter, on_failed=letter_failed)
+        except Exception as error_found:
+            letter_failed(company, error_found)
+
+    if config.streaming_listings:
+        listing_stage = stream_listing
+        pages: Iterable = streamed_pages()
+    else:
+        listing_stage = read_listing
+        pages = (
+            (search, page, docs)
+            for search in searches
+            for page, docs in prefetch_listings(
+                search.url_builtin,
+                search.querystring,
+                config.total_pages,
+                depth=config.prefetch_pages,
+            )
+        )
+    pipeline = (
+        Pipeline(queue_size=config.pipeline_queue_size)
+        .add_stage("listing", listing_stage, workers["listing"])
+        .add_stage("lookup", lookup, workers["lookup"])
+        .add_stage("resolve", resolve, workers["resolve"])
+    )
+    if render_letters:
+        pipeline.add_stage("render", render, workers["render"])
+    pipeline.run(pages)
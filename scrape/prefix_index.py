@@ -0,0 +1,42 @@
+from typing import Iterable
+
+TERMINAL = None
+
+
+class PrefixIndex:
+    """PrefixIndex is a lowercase prefix trie over a word list.
+    A single walk down a string finds every word the string starts with.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self.root: dict = {}
+        for word in words:
+            word = word.strip()
+            if not word:
+                continue
+            node = self.root
+            for char in word.lower():
+                node = node.setdefault(char, {})
+            node.setdefault(TERMINAL, []).append(word)
+
+    def prefixes(self, text: str) -> list[str]:
+        """prefixes returns every indexed word whose lowercase form is a prefix of text, longest first.
+        Words that share a lowercase form, e.g. "Lee" and "LEE", are all returned.
+
+        Args:
+            text (str): the string to match, e.g. a username.
+
+        Returns:
+            list[str]: the matching words as they were indexed, longest first.
+        """
+        found: list[str] = []
+        node = self.root
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                break
+            words = node.get(TERMINAL)
+            if words:
+                found.extend(words)
+        found.reverse()
+        return found
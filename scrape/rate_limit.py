@@ -0,0 +1,216 @@
+import random
+from email.utils import parsedate_to_datetime
+from math import isfinite
+from threading import Lock
+from time import monotonic, sleep, time
+
+from requests.exceptions import RequestException
+
+from scrape.configs import JobScrapeConfig
+
+
+class CircuitOpenError(RequestException):
+    """Raised instead of sending a request to a host whose circuit breaker is open."""
+
+
+class TokenBucket:
+    """TokenBucket lets through rate requests a second on average, and up to burst at once.
+    A rate of 0 or less lets everything through.
+
+    Args:
+        rate (float): tokens added per second.
+        burst (int): the most tokens the bucket holds.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = monotonic()
+        self.paused_until = 0.0
+        self.lock = Lock()
+
+    def acquire(self) -> float:
+        """acquire blocks until a token is free, and takes it.
+
+        Returns:
+            float: the seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = monotonic()
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.rate <= 0:
+                        return waited
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    wait = (1 - self.tokens) / self.rate
+            sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        """Holds back every request for the next seconds, as after a 429 or an outage."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """CircuitBreaker opens after threshold failures in a row, refusing requests for cooldown seconds.
+    After that a single trial request is let through: success closes the circuit, failure reopens it.
+
+    Args:
+        threshold (int): consecutive failures that open the circuit.
+        cooldown (float): seconds the circuit stays open.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 120.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial = False
+        self.lock = Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may go out now."""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial or monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.trial = True
+            return True
+
+    def success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def failure(self) -> bool:
+        """Records a failure. Returns whether it opened the circuit."""
+        with self.lock:
+            self.failures += 1
+            if self.trial or (self.opened_at is None and self.failures >= self.threshold):
+                self.opened_at = monotonic()
+                self.trial = False
+                return True
+            return False
+
+    def release(self) -> None:
+        """Ends a trial request that failed for reasons of its own, rather than the host's,
+        without closing or reopening the circuit, so that the next request may be the trial.
+        """
+        with self.lock:
+            self.trial = False
+
+
+class HostLimiter:
+    """HostLimiter is the rate limit and circuit breaker of one host."""
+
+    def __init__(self, bucket: TokenBucket, breaker: CircuitBreaker):
+        self.bucket = bucket
+        self.breaker = breaker
+
+
+class RateLimiter:
+    """RateLimiter hands out a HostLimiter per host and decides how long to back off between retries.
+    Hosts are matched against the configured domains by suffix, the longest domain winning,
+    so "linkedin.com" covers "www.linkedin.com".
+
+    Args:
+        default_rate (float): requests a second for hosts without their own limit; 0 is unlimited.
+        default_burst (int): the burst of hosts without their own limit.
+        limits (dict[str, dict]): {"domain": {"rate": ..., "burst": ...}} per domain.
+        max_retries (int): how many times a throttled or failed request is retried.
+        backoff_base (float): the backoff of the first retry, doubling with each retry after it.
+        backoff_max (float): the longest backoff.
+        breaker_threshold (int): consecutive failures that open a host's circuit.
+        breaker_cooldown (float): seconds a host's circuit stays open.
+    """
+
+    def __init__(
+        self,
+        default_rate: float = 0.0,
+        default_burst: int = 1,
+        limits: dict[str, dict] | None = None,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 120.0,
+    ):
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        # longest domain first, so the most specific limit wins
+        self.limits = sorted((limits or {}).items(), key=lambda item: -len(item[0]))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.hosts: dict[str, HostLimiter] = {}
+        self.lock = Lock()
+
+    @classmethod
+    def from_config(cls, config: JobScrapeConfig) -> "RateLimiter":
+        """Builds a limiter from the config. request_delay sets the default spacing of requests to a host."""
+        return cls(
+            default_rate=1 / config.request_delay if config.request_delay > 0 else 0.0,
+            default_burst=config.rate_limit_burst,
+            limits=config.rate_limits,
+            max_retries=config.max_retries,
+            backoff_base=config.backoff_base,
+            backoff_max=config.backoff_max,
+            breaker_threshold=config.breaker_threshold,
+            breaker_cooldown=config.breaker_cooldown,
+        )
+
+    def for_host(self, host: str) -> HostLimiter:
+        """Returns the limiter of a host, creating it on first use."""
+        with self.lock:
+            limiter = self.hosts.get(host)
+            if limiter is None:
+                rate, burst = self.default_rate, self.default_burst
+                for domain, limit in self.limits:
+                    if host == domain or host.endswith(f".{domain}"):
+                        rate = limit.get("rate", rate)
+                        burst = limit.get("burst", burst)
+                        break
+                limiter = self.hosts[host] = HostLimiter(
+                    TokenBucket(rate, burst),
+                    CircuitBreaker(self.breaker_threshold, self.breaker_cooldown),
+                )
+            return limiter
+
+    def backoff(self, attempt: int) -> float:
+        """The delay before retry number attempt, with full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """retry_after_seconds reads a Retry-After header, given either in seconds or as an HTTP date.
+    Fractional seconds are accepted, and a negative delay is read as no delay at all.
+
+    Returns:
+        float | None: the seconds to wait, or None if the header is missing or unreadable.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        # "nan" and "inf" parse as floats too, but aren't delays
+        return max(0.0, seconds) if isfinite(seconds) else None
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time())
+    except (TypeError, ValueError):
+        return None
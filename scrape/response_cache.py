@@ -0,0 +1,245 @@
+import sqlite3
+from dataclasses import dataclass
+from threading import Lock
+from time import time
+from urllib.parse import urlencode
+
+from scrape.configs import JobScrapeConfig
+
+# how stale an entry's access time may get before a hit writes it again;
+# eviction only needs a rough order, and most hits then stay read-only
+ACCESS_INTERVAL = 300.0
+
+
+@dataclass
+class CachedResponse:
+    """dataclass of a response body stored in the cache"""
+
+    text: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+    ttl: float
+
+    @property
+    def fresh(self) -> bool:
+        """Whether the entry can be served without asking the server again."""
+        return time() - self.fetched_at < self.ttl
+
+    def validators(self) -> dict[str, str]:
+        """The conditional request headers used to revalidate a stale entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def cache_key(target_url: str, querystring: dict | str | None = None) -> str:
+    """cache_key builds the cache key from a url and its querystring,
+    sorting the query parameters so that equivalent requests share an entry.
+
+    Args:
+        target_url (str): the url being requested.
+        querystring (dict | str | None): the params passed alongside it.
+
+    Returns:
+        str: the canonical key.
+    """
+    if not querystring:
+        return target_url
+    if isinstance(querystring, dict):
+        querystring = urlencode(sorted((str(k), str(v)) for k, v in querystring.items()))
+    return f"{target_url}?{querystring}"
+
+
+class ResponseCache:
+    """ResponseCache is a SQLite backed store of response bodies,
+    with per-endpoint TTLs and a size bound enforced by evicting the least recently used entries.
+    The size of the stored bodies is kept as a running total, so the table is only scanned
+    once it goes over the bound, and access times are recorded to within ACCESS_INTERVAL.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        default_ttl: float = 86400,
+        ttls: dict[str, float] | None = None,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # longest prefix first, so the most specific endpoint wins
+        self.ttls = sorted((ttls or {}).items(), key=lambda item: -len(item[0]))
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.lock = Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )"""
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)"
+        )
+        self.connection.commit()
+        (self.total_bytes,) = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+    @classmethod
+    def from_config(cls, config: JobScrapeConfig) -> "ResponseCache":
+        """Builds a cache from the cache settings in the config."""
+        return cls(
+            path=config.cache_path,
+            max_bytes=config.cache_max_bytes,
+            default_ttl=config.cache_default_ttl,
+            ttls=config.cache_ttls,
+        )
+
+    def ttl_for(self, key: str) -> float:
+        """ttl_for returns the TTL of the endpoint the key belongs to.
+        Endpoints are matched on the url without its scheme, e.g. "api.builtin.com/companies/alias".
+        """
+        bare = key.split("://", 1)[-1]
+        for prefix, ttl in self.ttls:
+            if bare.startswith(prefix):
+                return ttl
+        return self.default_ttl
+
+    def get(self, key: str) -> CachedResponse | None:
+        """get returns the stored entry for the key, fresh or stale, or None if there isn't one."""
+        with self.lock:
+            row = self.connection.execute(
+                """SELECT body, etag, last_modified, fetched_at, accessed_at
+                FROM responses WHERE key = ?""",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            now = time()
+            if now - row[4] >= ACCESS_INTERVAL:
+                self.connection.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                self.connection.commit()
+        entry = CachedResponse(*row[:4], ttl=self.ttl_for(key))
+        if entry.fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return entry
+
+    def put(
+        self,
+        key: str,
+        text: str,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        """put stores a response body, then evicts old entries if the cache is over its size bound."""
+        now = time()
+        size = len(text.encode("utf-8"))
+        with self.lock:
+            replaced = self.connection.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self.connection.execute(
+                "REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, text, etag, last_modified, now, now, size),
+            )
+            self.total_bytes += size - (replaced[0] if replaced else 0)
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+            self.connection.commit()
+
+    def refresh(self, key: str) -> None:
+        """refresh marks a stale entry as fresh again after the server answered 304 Not Modified."""
+        now = time()
+        with self.lock:
+            self.revalidated += 1
+            self.connection.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, key),
+            )
+            self.connection.commit()
+
+    def evict(self) -> None:
+        """Drops the least recently used entries until the cache fits within max_bytes."""
+        # recounted here, as other processes sharing the file may have changed it
+        (total,) = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        self.total_bytes = total
+        if total <= self.max_bytes:
+            return
+        rows = self.connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self.connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.total_bytes = total
+
+    def stats(self) -> dict[str, int]:
+        """Returns the hit, miss and revalidation counts, plus the number of stored entries."""
+        with self.lock:
+            (entries,) = self.connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "entries": entries,
+        }
+
+    def close(self) -> None:
+        """Closes the underlying database."""
+        with self.lock:
+            self.connection.close()
+
+
+_cache: ResponseCache | None = None
+
+
+def configure_cache(config: JobScrapeConfig) -> ResponseCache | None:
+    """configure_cache opens the shared response cache described by the config.
+    A config with cache_bypass set, or without a cache_path, runs uncached,
+    as does a run recording fixtures, so that every exchange reaches the network,
+    and one replaying them, so that every request is answered from the fixtures
+    rather than from whatever an earlier live run left in the cache.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+
+    Returns:
+        ResponseCache | None: the shared cache, or None if caching is off.
+    """
+    global _cache  # pylint: disable=global-statement
+    if _cache is not None:
+        _cache.close()
+    _cache = None
+    if config.cache_path and not config.cache_bypass and not config.fixture_mode:
+        _cache = ResponseCache.from_config(config)
+    return _cache
+
+
+def get_cache() -> ResponseCache | None:
+    """Returns the process-wide shared ResponseCache, or None if caching is off."""
+    return _cache
@@ -0,0 +1,102 @@
+from concurrent.futures import Future
+from threading import Lock
+from typing import Callable, Hashable
+
+
+class Memo:
+    """Memo computes the value of each key once, however many threads ask for it at once:
+    the first caller computes it while the others wait for its result.
+    A computation that raises is forgotten, so the key can be tried again,
+    as is a value the caller's keep rejects, once it is handed to the callers waiting on it.
+    """
+
+    def __init__(self):
+        self.futures: dict[Hashable, Future] = {}
+        self.hits = 0
+        self.lock = Lock()
+
+    def get(
+        self,
+        key: Hashable,
+        compute: Callable[[], object],
+        keep: Callable[[object], bool] | None = None,
+    ):
+        """Returns the value of key, computing it with compute if no one has yet.
+        A value for which keep returns False is not remembered for later callers.
+        """
+        with self.lock:
+            future = self.futures.get(key)
+            owner = future is None
+            if owner:
+                future = self.futures[key] = Future()
+            else:
+                self.hits += 1
+        if owner:
+            try:
+                future.set_result(compute())  # type: ignore
+            except BaseException as error_found:
+                with self.lock:
+                    del self.futures[key]
+                future.set_exception(error_found)  # type: ignore
+                raise
+            if keep is not None and not keep(future.result()):  # type: ignore
+                with self.lock:
+                    del self.futures[key]
+        return future.result()  # type: ignore
+
+    def __len__(self) -> int:
+        return len(self.futures)
+
+
+class RunMemo:
+    """RunMemo holds what every listing search of a run shares, so that searches overlapping
+    on a job or a company don't do its work twice: the jobs already listed by an earlier search,
+    the companies already looked up, keyed by company alias and region, as the profile
+    is region-specific, the contacts already resolved, keyed by company alias alone,
+    as the person hiring doesn't change with the region, and the search results already found,
+    keyed by company name and query.
+    """
+
+    def __init__(self):
+        self.jobs_seen: set[str] = set()
+        self.duplicate_jobs = 0
+        self.companies = Memo()
+        self.contacts = Memo()
+        self.searches = Memo()
+        self.lock = Lock()
+
+    def first_sighting(self, job_id: str) -> bool:
+        """Records a job as listed, returning whether no search of the run had listed it yet."""
+        with self.lock:
+            if job_id in self.jobs_seen:
+                self.duplicate_jobs += 1
+                return False
+            self.jobs_seen.add(job_id)
+            return True
+
+    def stats(self) -> dict[str, int]:
+        """Returns how many jobs, companies and contacts were seen, and how many repeats were saved."""
+        return {
+            "jobs": len(self.jobs_seen),
+            "duplicate_jobs": self.duplicate_jobs,
+            "companies": len(self.companies),
+            "shared_lookups": self.companies.hits,
+            "contacts": len(self.contacts),
+            "shared_contacts": self.contacts.hits,
+            "shared_searches": self.searches.hits,
+        }
+
+
+_run_memo = RunMemo()
+
+
+def reset_run_memo() -> RunMemo:
+    """Starts a fresh RunMemo for a new run."""
+    global _run_memo  # pylint: disable=global-statement
+    _run_memo = RunMemo()
+    return _run_memo
+
+
+def get_run_memo() -> RunMemo:
+    """Returns the RunMemo of the current run."""
+    return _run_memo
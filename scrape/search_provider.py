@@ -0,0 +1,302 @@
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+from threading import Lock
+from time import time
+from urllib.error import URLError
+
+from requests import RequestException
+
+from scrape.configs import JobScrapeConfig
+from scrape.fixtures import FixtureStore, get_fixtures
+from scrape.http_client import get_client
+from scrape.log import logger
+from scrape.metrics import get_metrics
+from scrape.run_memo import get_run_memo
+
+
+def build_search_query(company_name: str, search_query: str) -> str:
+    """build_search_query combines a company's name with the configured search query.
+
+    Args:
+        company_name (str): the company being searched for.
+        search_query (str): the search_query from the config.
+
+    Returns:
+        str: the query sent to the search engine.
+    """
+    return f'"{company_name}" \
+                            {search_query}'
+
+
+class SearchProvider(ABC):
+    """SearchProvider is the interface every search backend implements."""
+
+    name = "base"
+
+    @abstractmethod
+    def search(self, query: str) -> list[str]:
+        """search returns the urls found for a query, best first,
+        raising RequestException, or URLError, if the backend could not answer.
+        """
+
+
+class GoogleSearchProvider(SearchProvider):
+    """GoogleSearchProvider scrapes Google's result pages, pausing between requests as Google expects.
+
+    Args:
+        results (int): how many urls to return. Defaults to 3.
+        pause (float): seconds to wait between result pages. Defaults to 4.
+    """
+
+    name = "google"
+
+    def __init__(self, results: int = 3, pause: float = 4.0):
+        self.results = results
+        self.pause = pause
+
+    def search(self, query: str) -> list[str]:
+        # imported here so that other providers don't need googlesearch installed
+        from googlesearch import search
+
+        return list(
+            search(
+                query=query,
+                start=0,
+                stop=self.results,
+                pause=self.pause,
+                country="US",
+                verify_ssl=False,
+            )
+        )
+
+
+class JsonApiSearchProvider(SearchProvider):
+    """JsonApiSearchProvider asks a JSON search API, such as Google's Custom Search JSON API,
+    which answers {"items": [{"link": ...}, ...]}.
+    The key goes in a header rather than the querystring, keeping it out of the cache keys
+    and the recorded fixtures, so that rotating it doesn't invalidate either.
+
+    Args:
+        url (str): the API endpoint.
+        api_key (str): sent in the key_header header.
+        params (dict): any other parameters the API needs, such as "cx".
+        results (int): how many urls to return. Defaults to 3.
+        key_header (str): the header the API reads its key from. Defaults to Google's "X-Goog-Api-Key".
+    """
+
+    name = "api"
+
+    def __init__(
+        self,
+        url: str,
+        api_key: str = "",
+        params: dict | None = None,
+        results: int = 3,
+        key_header: str = "X-Goog-Api-Key",
+    ):
+        self.url = url
+        self.api_key = api_key
+        self.params = params or {}
+        self.results = results
+        self.key_header = key_header
+
+    def search(self, query: str) -> list[str]:
+        querystring = {**self.params, "q": query, "num": self.results}
+        headers = {self.key_header: self.api_key} if self.api_key else {}
+        response = get_client().get(self.url, params=querystring, headers=headers)
+        response.raise_for_status()
+        items = response.json().get("items") or []
+        return [item["link"] for item in items if "link" in item][: self.results]
+
+
+class FixtureSearchProvider(SearchProvider):
+    """FixtureSearchProvider answers from the search results recorded in a fixture store."""
+
+    name = "fixture"
+
+    def __init__(self, store: FixtureStore):
+        self.store = store
+
+    def search(self, query: str) -> list[str]:
+        return self.store.load_search(query)
+
+
+class SearchMemo:
+    """SearchMemo is a SQLite backed memo of search results,
+    keyed by the company, the query template it was searched with and the provider that searched,
+    so that switching provider doesn't answer from another provider's results.
+
+    Args:
+        path (str): the SQLite file to keep the memo in.
+        ttl (float): seconds a result stays usable. Defaults to a week.
+    """
+
+    def __init__(self, path: str, ttl: float = 604800):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        keyed = [
+            name
+            for _cid, name, _type, _notnull, _default, pk in self.connection.execute(
+                "PRAGMA table_info(searches)"
+            )
+            if pk
+        ]
+        if keyed and "provider" not in keyed:
+            # a memo from before the provider was part of the key; it is only a cache
+            self.connection.execute("DROP TABLE searches")
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS searches (
+                company TEXT NOT NULL,
+                template TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                urls TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (company, template, provider)
+            )"""
+        )
+        self.connection.commit()
+
+    def get(self, company: str, template: str, provider: str) -> list[str] | None:
+        """get returns the urls provider found, or None if there are none younger than the TTL."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT urls, fetched_at FROM searches"
+                " WHERE company = ? AND template = ? AND provider = ?",
+                (company, template, provider),
+            ).fetchone()
+        if row is None or time() - row[1] >= self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, company: str, template: str, provider: str, urls: list[str]) -> None:
+        """Stores the urls a search returned."""
+        with self.lock:
+            self.connection.execute(
+                "REPLACE INTO searches VALUES (?, ?, ?, ?, ?)",
+                (company, template, provider, json.dumps(urls), time()),
+            )
+            self.connection.commit()
+
+    def stats(self) -> dict[str, int]:
+        """Returns the hit and miss counts, plus the number of stored searches."""
+        with self.lock:
+            (entries,) = self.connection.execute("SELECT COUNT(*) FROM searches").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self) -> None:
+        """Closes the underlying database."""
+        with self.lock:
+            self.connection.close()
+
+
+class Searcher:
+    """Searcher finds the candidate urls for a company through a SearchProvider,
+    answering from the memo when it can and recording fixtures when asked to.
+    """
+
+    def __init__(self, provider: SearchProvider, memo: SearchMemo | None = None):
+        self.provider = provider
+        self.memo = memo
+
+    def urls(self, company_name: str, search_query: str) -> list[str]:
+        """urls returns the search results for a company.
+        A search the provider fails, e.g. once an API's quota is used up, finds no urls,
+        leaving the letter to its generic greeting, and is neither memoized nor shared.
+
+        Args:
+            company_name (str): the company being searched for.
+            search_query (str): the query template from the config.
+
+        Returns:
+            list[str]: the urls found, best first.
+        """
+        # a company listed by more than one search of the run is searched for once
+        try:
+            return get_run_memo().searches.get(
+                (company_name, search_query), lambda: self.search(company_name, search_query)
+            )
+        except (RequestException, URLError) as error_found:
+            logger.warning(
+                "%s could not search for %s: %s", self.provider.name, company_name, error_found
+            )
+            return []
+
+    def search(self, company_name: str, search_query: str) -> list[str]:
+        """search answers from the memo, or asks the provider and records the answer."""
+        if self.memo is not None:
+            urls = self.memo.get(company_name, search_query, self.provider.name)
+            if urls is not None:
+                return urls
+
+        query = build_search_query(company_name, search_query)
+        with get_metrics().timer("search_seconds", provider=self.provider.name):
+            urls = self.provider.search(query)
+        logger.debug("%s found %s urls for %s", self.provider.name, len(urls), company_name)
+
+        fixtures = get_fixtures()
+        if fixtures is not None and fixtures.recording:
+            fixtures.store.save_search(query, urls)
+        if self.memo is not None:
+            self.memo.put(company_name, search_query, self.provider.name, urls)
+        return urls
+
+    def close(self) -> None:
+        """Closes the memo, if there is one."""
+        if self.memo is not None:
+            self.memo.close()
+
+
+def provider_from_config(config: JobScrapeConfig) -> SearchProvider:
+    """provider_from_config builds the provider config.search_provider names.
+    A run replaying fixtures always searches the fixtures.
+    """
+    fixtures = get_fixtures()
+    if (fixtures is not None and fixtures.replaying) or config.search_provider == "fixture":
+        store = fixtures.store if fixtures is not None else FixtureStore(config.fixture_dir)
+        return FixtureSearchProvider(store)
+    if config.search_provider == "api":
+        return JsonApiSearchProvider(
+            config.search_api_url,
+            api_key=config.search_api_key,
+            params=config.search_api_params,
+            results=config.search_results,
+            key_header=config.search_api_key_header,
+        )
+    if config.search_provider == "google":
+        return GoogleSearchProvider(results=config.search_results, pause=config.search_pause)
+    raise ValueError(f"Unknown search_provider: {config.search_provider!r}")
+
+
+_searcher = Searcher(GoogleSearchProvider())
+
+
+def configure_search(config: JobScrapeConfig) -> Searcher:
+    """configure_search replaces the shared Searcher with one built from the config.
+    The memo is left out when search_memo_path is empty, when cache_bypass is set,
+    or while fixtures are being recorded or replayed, so that every search reaches the provider.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+
+    Returns:
+        Searcher: the new shared Searcher.
+    """
+    global _searcher  # pylint: disable=global-statement
+    _searcher.close()
+    memo = None
+    if config.search_memo_path and not config.cache_bypass and not config.fixture_mode:
+        memo = SearchMemo(config.search_memo_path, config.search_memo_ttl)
+    _searcher = Searcher(provider_from_config(config), memo)
+    return _searcher
+
+
+def get_search() -> Searcher:
+    """Returns the process-wide shared Searcher."""
+    return _searcher
@@ -0,0 +1,227 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from json import JSONDecodeError
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from requests import RequestException
+from tqdm import tqdm
+
+from scrape.builtinscrape import (ListingEntry, listing_entries,
+                                  prefetch_listings, shared_company_lookup,
+                                  stream_listing_entries)
+from scrape.company_result import CompanyResult
+from scrape.configs import (JobScrapeConfig, ListingSearch, PersonaConfig,
+                            listing_searches)
+from scrape.coverletterwriter import write_letters
+from scrape.dataset import append_row, get_dataset
+from scrape.journal import RunJournal
+from scrape.log import logger
+from scrape.namefetcher import resolve_contact
+from scrape.run_memo import RunMemo, get_run_memo
+
+
+def run_serial(
+    config: JobScrapeConfig,
+    persona: PersonaConfig,
+    journal: RunJournal,
+    render_letters: bool = True,
+) -> None:
+    """run_serial fetches one listing page at a time and writes each of its letters in turn,
+    skipping whatever the journal says is already done, or has given up on.
+    A job that raises is recorded as failed in the journal, and the run moves on to the next.
+    With config.streaming_listings, a page's companies are looked up, and their contacts resolved,
+    as the page downloads, keeping one listing at a time rather than the page;
+    its letters are still written together once the page has been read.
+    The searches of listing_searches run one after the other; a job listed by an earlier search
+    is skipped, and companies and contacts found by an earlier search are reused.
+
+    Args:
+        config (JobScrapeConfig): the run configuration.
+        persona (PersonaConfig): information on you, the applicant.
+        journal (RunJournal): records each finished stage, and the work to skip when resuming.
+        render_letters (bool): write the letters, or stop once each contact is resolved,
+        leaving the letters to a later render. Defaults to True.
+    """
+    run_memo = get_run_memo()
+    for search in listing_searches(config):
+        logger.info("Running the %s search", search.name)
+        for page, listed in listing_pages(search, config):
+            entries = unsettled(listed, page, journal, run_memo)
+            company_collection = lookup_entries(entries, journal, config, search.region_id)
+
+            letters = []
+            for company in tqdm(
+                company_collection,
+                desc=f"Finding Contacts | Bundle {page} of {config.total_pages}",
+                unit="contact",
+            ):
+                business_card = journal.contact(company.job_id)
+                if business_card is None:
+                    try:
+                        business_card = resolve_contact(company, config)
+                    except Exception as error_found:
+                        journal.mark_failure(company.job_id, "contact_resolved", error_found)
+                        append_row(company, outcome="resolve_failed")
+                        continue
+                    journal.mark_contact(company, business_card)
+                # a contact resumed from the journal is part of this run's dataset too
+                append_row(company, business_card)
+
+                logger.info(
+                    "Writing cover letter to %s at %s for the role of %s",
+                    business_card.fullname,
+                    business_card.workplace,
+                    company.job_name,
+                )  # type: ignore
+                letters.append((company, business_card))
+
+            if render_letters:
+                write_letters(
+                    letters,
+                    config,
+                    persona,
+                    processes=config.render_processes,
+                    on_written=journal.mark_letter,
+                    on_failed=lambda company, error_found: journal.mark_failure(
+                        company.job_id, "letter_written", error_found
+                    ),
+                )
+
+
+def unsettled(
+    listed: Iterable[ListingEntry], page: int, journal: RunJournal, run_memo: RunMemo
+) -> Iterator[ListingEntry]:
+    """unsettled records each listing of a page in the journal, yielding those the journal
+    hasn't finished or given up on, and that no earlier search of the run listed.
+    """
+    for entry in listed:
+        if not run_memo.first_sighting(entry.job_id):
+            continue
+        journal.mark_listing(entry.job_id, page)
+        if not journal.settled(entry.job_id):
+            yield entry
+
+
+def listing_pages(
+    search: ListingSearch, config: JobScrapeConfig
+) -> Iterator[tuple[int, Iterable[ListingEntry]]]:
+    """listing_pages yields each page number of a search with its listings.
+    Pages are fetched config.prefetch_pages ahead by prefetch_listings,
+    or, with config.streaming_listings, handed over as iterators decoding the page as it downloads,
+    so that the first company can be looked up before the rest of the page has arrived;
+    such a page must be read to its end before the next is asked for.
+    The first page without jobs ends the search either way.
+    """
+    if not config.streaming_listings:
+        for page, docs in prefetch_listings(
+            search.url_builtin, search.querystring, config.total_pages, depth=config.prefetch_pages
+        ):
+            yield page, listing_entries(docs, search.region_id)
+        return
+
+    for page in range(config.total_pages):
+        entries = streamed_listing(search, page, descriptions=get_dataset() is not None)
+        try:
+            # the first listing tells a page without jobs from one that couldn't be read
+            first = next(entries, None)
+        except (RequestException, JSONDecodeError) as error_found:
+            log_unreadable(search, page, error_found)
+            continue
+        if first is None:
+            return
+        yield page, chain([first], entries)
+
+
+def streamed_listing(
+    search: ListingSearch, page: int, descriptions: bool = True
+) -> Iterator[ListingEntry]:
+    """streamed_listing yields the listings of a page as stream_listing_entries decodes them.
+    A page that breaks off after its first listing is logged, and ends with what was read;
+    one that breaks off before raises.
+    """
+    entries = stream_listing_entries(
+        search.url_builtin,
+        {**search.querystring, "page": page},
+        search.region_id,
+        descriptions=descriptions,
+    )
+    read = 0
+    try:
+        for entry in entries:
+            read += 1
+            yield entry
+    except (RequestException, JSONDecodeError) as error_found:
+        if not read:
+            raise
+        log_unreadable(search, page, error_found)
+
+
+def log_unreadable(search: ListingSearch, page: int, error_found: Exception) -> None:
+    """Logs a listing page that could not be read."""
+    logger.warning(
+        "Listing page %s of the %s search could not be read: %s",
+        page,
+        search.name,
+        error_found,
+    )
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def map_ahead(
+    function: Callable[[T], R], items: Iterable[T], concurrency: int = 1
+) -> Iterator[R]:
+    """map_ahead yields function of each item, in order, with up to concurrency calls running ahead
+    of the one being consumed. Unlike Executor.map, it takes the items one at a time,
+    so that a streamed page is only read as far as the calls have got.
+    """
+    if concurrency <= 1:
+        yield from map(function, items)
+        return
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="company_lookup"
+    ) as executor:
+        in_flight: deque = deque()
+        for item in items:
+            in_flight.append(executor.submit(function, item))
+            if len(in_flight) >= concurrency:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def lookup_entries(
+    entries: Iterable[ListingEntry],
+    journal: RunJournal,
+    config: JobScrapeConfig,
+    region_id: str = "5",
+) -> Iterator[CompanyResult]:
+    """lookup_entries looks up the company of every listing in region_id,
+    with up to config.lookup_concurrency lookups running ahead,
+    reusing the companies the journal already holds.
+    It yields each company as soon as it is looked up, in listing order,
+    and leaves out the listings whose company could not be looked up,
+    recording them in the dataset as such.
+    """
+
+    def lookup(entry: ListingEntry) -> CompanyResult | None:
+        company = journal.company(entry.job_id)
+        if company is not None:
+            return company
+        try:
+            company = entry.to_company_result(shared_company_lookup(entry.alias, region_id))
+        except Exception as error_found:
+            journal.mark_failure(entry.job_id, "lookup_done", error_found)
+            company = None
+        if company is None:
+            append_row(entry.without_company(), outcome="lookup_failed")
+            return None
+        journal.mark_lookup(company)
+        return company
+
+    for company in map_ahead(lookup, entries, config.lookup_concurrency):
+        if company is not None:
+            yield company
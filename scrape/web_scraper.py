@@ -1,17 +1,24 @@
+import codecs
 from json import loads
 from json.decoder import JSONDecodeError
-from time import sleep
-from typing import Any
+from typing import Any, Iterator
+from urllib.parse import urlsplit
 
-from bs4 import BeautifulSoup
-from requests import get
 from requests.exceptions import HTTPError, RequestException
 
+from scrape.http_client import get_client
 from scrape.log import logger
+from scrape.metrics import get_metrics
+from scrape.response_cache import cache_key, get_cache
+
+HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml"}
 
 
 def webscrape_results(
-    target_url: str, run_beautiful_soup: bool = False, querystring: str | None = None
+    target_url: str,
+    run_beautiful_soup: bool = False,
+    querystring: str | None = None,
+    use_cache: bool = True,
 ) -> Any:
     """webscrape_results takes a target_url, run_beautiful_soup,
     and querystring to extract results for further parsing purposes.
@@ -24,20 +31,177 @@ def webscrape_results(
         Defaults to False.
         - querystring (Optional[str], optional):
         A querystring to govern the requested results. Defaults to None.
+        - use_cache (bool): whether the shared response cache may answer,
+        or store, this request. Defaults to True.
 
     Returns:
         Any: Is either text from JSON, text from BeautifulSoup, or None if no results were found.
     """
-    sleep(1.5)
     try:
-        response = get(target_url, params=querystring)
-        if response.ok:
-            response_text = response.text
+        response_text = fetch_text(target_url, querystring, use_cache)
+        if response_text is not None:
             if run_beautiful_soup:
+                from bs4 import BeautifulSoup
+
                 return BeautifulSoup(response_text, "html.parser")
             return loads(response_text)
     except (JSONDecodeError, RequestException, HTTPError, AttributeError) as exception:
         logger.warning(
-            f"An error has occurred, moving to next item in sequence.\
-            Cause of error: {exception}"
+            "An error has occurred, moving to next item in sequence. Cause of error: %s", exception
+        )
+
+
+def fetch_text(
+    target_url: str, querystring: str | None = None, use_cache: bool = True
+) -> str | None:
+    """fetch_text returns the body of target_url, serving it from the response cache
+    when a fresh entry exists and revalidating stale entries with the server.
+
+    Args:
+        target_url (str): a website to be scraped.
+        querystring (Optional[str], optional): the params of the request. Defaults to None.
+        use_cache (bool): whether the cache may be used. Defaults to True.
+
+    Returns:
+        str | None: the response body, or None if the server did not answer OK.
+    """
+    cache = get_cache() if use_cache else None
+    key = cache_key(target_url, querystring)  # type: ignore
+    entry = cache.get(key) if cache is not None else None
+    if entry is not None and entry.fresh:
+        return entry.text
+
+    client = get_client()
+    headers = entry.validators() if entry is not None else {}
+    response = client.get(target_url, params=querystring, headers=headers)
+    if response.status_code == 304 and entry is not None:
+        cache.refresh(key)  # type: ignore
+        return entry.text
+    if not response.ok:
+        return None
+    if cache is not None:
+        cache.put(
+            key,
+            response.text,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+    return response.text
+
+
+def stream_bytes(
+    target_url: str,
+    querystring: dict | None = None,
+    chunk_size: int = 64 * 1024,
+    use_cache: bool = True,
+) -> Iterator[bytes]:
+    """stream_bytes yields the raw body of target_url as it downloads.
+    Fresh entries in the response cache are served from the cache;
+    streamed bodies are not stored, so that they never have to be held whole.
+
+    Args:
+        target_url (str): the url to read.
+        querystring (dict | None): the params of the request. Defaults to None.
+        chunk_size (int): the size of each read. Defaults to 64 KiB.
+        use_cache (bool): whether the response cache may answer. Defaults to True.
+
+    Raises:
+        HTTPError: if the server did not answer OK.
+
+    Yields:
+        bytes: successive pieces of the body.
+    """
+    cache = get_cache() if use_cache else None
+    entry = cache.get(cache_key(target_url, querystring)) if cache is not None else None
+    if entry is not None and entry.fresh:
+        body = entry.text.encode("utf-8")
+        for start in range(0, len(body), chunk_size):
+            yield body[start : start + chunk_size]
+        return
+
+    client = get_client()
+    with client.get(target_url, params=querystring, stream=True) as response:
+        response.raise_for_status()
+        bytes_read = 0
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            bytes_read += len(chunk)
+            yield chunk
+        get_metrics().inc(
+            "http_response_bytes_total", bytes_read, host=urlsplit(target_url).netloc
+        )
+
+
+def stream_page(
+    target_url: str,
+    max_bytes: int = 2 * 1024 * 1024,
+    chunk_size: int = 64 * 1024,
+    use_cache: bool = True,
+) -> Iterator[str]:
+    """stream_page yields the body of an HTML page as decoded text chunks,
+    so a caller can stop reading as soon as it has what it needs.
+    Pages that declare a non-HTML content type are rejected before their body is read,
+    and reading stops after max_bytes. Fresh entries in the response cache are served whole,
+    and stale ones are revalidated with the server. A page read to its end is stored in the cache;
+    one cut off at max_bytes, or left by its caller before the end, is not.
+
+    Args:
+        target_url (str): the page to read.
+        max_bytes (int): the most body bytes to read. Defaults to 2 MiB.
+        chunk_size (int): the size of each read. Defaults to 64 KiB.
+        use_cache (bool): whether the response cache may answer, or store, the page. Defaults to True.
+
+    Yields:
+        str: successive chunks of the page's text.
+    """
+    cache = get_cache() if use_cache else None
+    key = cache_key(target_url)
+    entry = cache.get(key) if cache is not None else None
+    if entry is not None and entry.fresh:
+        yield entry.text[:max_bytes]
+        return
+
+    client = get_client()
+    headers = entry.validators() if entry is not None else {}
+    with client.get(target_url, headers=headers, stream=True) as response:
+        if response.status_code == 304 and entry is not None:
+            cache.refresh(key)  # type: ignore
+            yield entry.text[:max_bytes]
+            return
+        if not response.ok:
+            return
+        content_type = response.headers.get("Content-Type", "")
+        mime_type = content_type.split(";", 1)[0].strip().lower()
+        if mime_type and mime_type not in HTML_CONTENT_TYPES:
+            logger.info("Skipping %s, as it is %s rather than HTML.", target_url, mime_type)
+            return
+        try:
+            decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")("replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")("replace")
+
+        bytes_read = 0
+        complete = True
+        parts: list[str] = []
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            bytes_read += len(chunk)
+            text = decoder.decode(chunk)
+            if cache is not None:
+                parts.append(text)
+            yield text
+            if bytes_read >= max_bytes:
+                logger.info("Stopped reading %s after %s bytes.", target_url, bytes_read)
+                complete = False
+                break
+        get_metrics().inc(
+            "http_response_bytes_total", bytes_read, host=urlsplit(target_url).netloc
         )
+        text = decoder.decode(b"", final=True)
+        if cache is not None and complete:
+            parts.append(text)
+            cache.put(
+                key,
+                "".join(parts),
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        yield text
@@ -0,0 +1,239 @@
+import json
+import sqlite3
+from dataclasses import asdict
+from threading import Lock
+from time import time
+from typing import Iterable
+
+from scrape.business_card import BusinessCard
+from scrape.company_result import CompanyResult
+from scrape.configs import JobScrapeConfig
+from scrape.log import logger
+
+STATES = ("pending", "leased", "done", "failed")
+
+
+class WorkQueue:
+    """WorkQueue is a durable queue of jobs kept in a SQLite file, shared by a coordinator,
+    which enqueues the looked up companies, and any number of worker processes, which claim them.
+    A claimed job is leased to its worker until it is acknowledged; the lease of a worker that
+    dies runs out, and the job goes to the next worker to ask. A job that fails max_attempts
+    times is set aside as failed. The jobs of workers that only resolve contacts are left for
+    a later render to write the letters of.
+
+    Args:
+        path (str): the SQLite file to keep the queue in.
+        lease_seconds (float): how long a worker holds a job before it may be handed to another.
+        max_attempts (int): how many times a job is tried before it is set aside.
+        shared (bool): whether workers on other hosts share the file over a network file system,
+        which must honour file locks. WAL needs memory shared between the processes,
+        so a shared queue uses SQLite's rollback journal instead. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 600.0,
+        max_attempts: int = 3,
+        shared: bool = False,
+    ):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.lock = Lock()
+        # autocommit, so that claims can take the write lock up front with BEGIN IMMEDIATE
+        self.connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.connection.execute(f"PRAGMA journal_mode={'DELETE' if shared else 'WAL'}")
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS items (
+                job_id TEXT PRIMARY KEY,
+                company TEXT NOT NULL,
+                contact TEXT,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_expires REAL,
+                enqueued REAL,
+                finished REAL,
+                error TEXT,
+                rendered REAL
+            )"""
+        )
+        # queues made before letters were rendered from them lack the column
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(items)")}
+        if "rendered" not in columns:
+            self.connection.execute("ALTER TABLE items ADD COLUMN rendered REAL")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS items_state ON items (state, lease_expires)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+
+    @classmethod
+    def from_config(cls, config: JobScrapeConfig) -> "WorkQueue":
+        """Opens the queue at config.queue_path, or next to the export directory if that isn't set."""
+        return cls(
+            config.queue_path or f"{config.export_dir}_queue.sqlite",
+            lease_seconds=config.queue_lease_seconds,
+            max_attempts=config.queue_max_attempts,
+            shared=config.queue_shared,
+        )
+
+    def enqueue(self, companies: Iterable[CompanyResult]) -> int:
+        """Adds the jobs not already in the queue, whatever their state.
+
+        Returns:
+            int: how many jobs were added.
+        """
+        now = time()
+        rows = [(company.job_id, json.dumps(asdict(company)), now) for company in companies]
+        with self.lock:
+            before = self.connection.total_changes
+            self.connection.execute("BEGIN IMMEDIATE")
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO items (job_id, company, enqueued) VALUES (?, ?, ?)", rows
+            )
+            self.connection.execute("COMMIT")
+            return self.connection.total_changes - before
+
+    def claim(self, worker: str, count: int = 1) -> list[CompanyResult]:
+        """claim leases up to count jobs to a worker: pending jobs first, in the order they were queued,
+        then jobs whose lease has run out.
+
+        Args:
+            worker (str): the worker claiming them.
+            count (int): the most jobs to claim. Defaults to 1.
+
+        Returns:
+            list[CompanyResult]: the companies of the claimed jobs; empty if there is nothing to claim.
+        """
+        now = time()
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                # a job whose workers keep dying on it is set aside like any other failure
+                self.connection.execute(
+                    """UPDATE items SET state = 'failed', error = 'the lease ran out'
+                    WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?""",
+                    (now, self.max_attempts),
+                )
+                rows = self.connection.execute(
+                    """SELECT job_id, company, worker FROM items
+                    WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?)
+                    ORDER BY state = 'leased', rowid LIMIT ?""",
+                    (now, max(1, count)),
+                ).fetchall()
+                self.connection.executemany(
+                    """UPDATE items SET state = 'leased', worker = ?, lease_expires = ?,
+                    attempts = attempts + 1 WHERE job_id = ?""",
+                    [(worker, now + self.lease_seconds, job_id) for job_id, _c, _w in rows],
+                )
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+        for job_id, _company, previous in rows:
+            if previous is not None:
+                logger.warning(
+                    "The lease of %s on %s ran out, handing it to %s.", previous, job_id, worker
+                )
+        return [CompanyResult(**json.loads(company)) for _job_id, company, _worker in rows]
+
+    def renew(self, job_id: str, worker: str) -> bool:
+        """Extends a worker's lease on a job.
+
+        Returns:
+            bool: whether the worker still held the lease.
+        """
+        return self.execute(
+            """UPDATE items SET lease_expires = ?
+            WHERE job_id = ? AND worker = ? AND state = 'leased'""",
+            (time() + self.lease_seconds, job_id, worker),
+        )
+
+    def ack(self, job_id: str, worker: str, contact: BusinessCard, rendered: bool = False) -> bool:
+        """Marks a job as done, storing the contact its worker resolved.
+
+        Args:
+            job_id (str): the job.
+            worker (str): the worker that holds its lease.
+            contact (BusinessCard): the contact the worker resolved.
+            rendered (bool): whether the worker wrote the job's letter too. Defaults to False,
+            leaving it to a render from the queue.
+
+        Returns:
+            bool: whether the worker still held the lease; a job handed on to another worker is left to it.
+        """
+        now = time()
+        return self.execute(
+            """UPDATE items SET state = 'done', contact = ?, finished = ?, rendered = ?,
+            lease_expires = NULL, error = NULL
+            WHERE job_id = ? AND worker = ? AND state = 'leased'""",
+            (json.dumps(asdict(contact)), now, now if rendered else None, job_id, worker),
+        )
+
+    def render_pending(self) -> list[tuple[CompanyResult, BusinessCard]]:
+        """Returns the company and contact of every done job whose letter is yet to be written,
+        in the order they were queued.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                """SELECT company, contact FROM items
+                WHERE state = 'done' AND rendered IS NULL
+                ORDER BY enqueued, rowid"""
+            ).fetchall()
+        return [
+            (CompanyResult(**json.loads(company)), BusinessCard(**json.loads(contact)))
+            for company, contact in rows
+        ]
+
+    def mark_rendered(self, company: CompanyResult) -> None:
+        """Records that a done job's letter was written."""
+        self.execute("UPDATE items SET rendered = ? WHERE job_id = ?", (time(), company.job_id))
+
+    def fail(self, job_id: str, worker: str, error: str) -> None:
+        """Hands a job that failed back to the queue, or sets it aside once it has run out of attempts."""
+        self.execute(
+            """UPDATE items SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+            worker = NULL, lease_expires = NULL, error = ?
+            WHERE job_id = ? AND worker = ? AND state = 'leased'""",
+            (self.max_attempts, f"{worker}: {error}", job_id, worker),
+        )
+
+    def set_complete(self, complete: bool) -> None:
+        """Records whether the coordinator has finished enqueuing, so that idle workers know to stop."""
+        self.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('complete', ?)", (str(int(complete)),)
+        )
+
+    def finished(self) -> bool:
+        """Whether the coordinator has finished and no job is left pending or leased."""
+        with self.lock:
+            complete = self.connection.execute(
+                "SELECT value FROM meta WHERE key = 'complete'"
+            ).fetchone()
+            open_items = self.connection.execute(
+                "SELECT COUNT(*) FROM items WHERE state IN ('pending', 'leased')"
+            ).fetchone()[0]
+        return complete is not None and complete[0] == "1" and not open_items
+
+    def counts(self) -> dict[str, int]:
+        """Returns how many jobs are in each state."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT state, COUNT(*) FROM items GROUP BY state"
+            ).fetchall()
+        return {state: 0 for state in STATES} | dict(rows)
+
+    def execute(self, statement: str, parameters: tuple) -> bool:
+        """Runs one write, returning whether it changed a row."""
+        with self.lock:
+            return self.connection.execute(statement, parameters).rowcount > 0
+
+    def close(self) -> None:
+        """Closes the underlying database."""
+        with self.lock:
+            self.connection.close()
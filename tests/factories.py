@@ -0,0 +1,17 @@
+from dataclasses import fields
+
+from scrape.business_card import BusinessCard
+from scrape.company_result import CompanyResult
+
+
+def company(job_id: str = "", **overrides) -> CompanyResult:
+    """A CompanyResult with every text field blank but its job id and alias, and whatever is overridden."""
+    text = {field.name: "" for field in fields(CompanyResult) if field.type is str}
+    return CompanyResult(
+        **{**text, "inner_id": 0, "alias": f"alias{job_id}", "job_id": job_id, **overrides}
+    )
+
+
+def card(name: str = "x") -> BusinessCard:
+    """A BusinessCard with name in every field."""
+    return BusinessCard(**{field.name: name for field in fields(BusinessCard)})
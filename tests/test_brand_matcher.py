@@ -0,0 +1,36 @@
+import random
+
+from scrape.brand_matcher import BrandMatcher
+
+
+def substring_check(brands, text):
+    """The check BrandMatcher replaced: every brand tested as a substring."""
+    return {brand for brand in brands if brand in text}
+
+
+def test_matches_the_substring_check():
+    rng = random.Random(6)
+    alphabet = "abcd"
+    brands = list({"".join(rng.choices(alphabet, k=rng.randint(1, 5))) for _ in range(60)})
+    matcher = BrandMatcher(brands)
+    for _ in range(500):
+        text = "".join(rng.choices(alphabet, k=rng.randint(0, 30)))
+        assert set(matcher.find_all(text)) == substring_check(brands, text)
+
+
+def test_overlapping_and_nested_brands():
+    brands = ["he", "she", "his", "hers", "s"]
+    text = "https://ushers.example/his"
+
+    found = BrandMatcher(brands).find_all(text)
+
+    assert set(found) == substring_check(brands, text)
+    assert len(found) == len(set(found))
+
+
+def test_empty_brand_matches_everything():
+    assert BrandMatcher(["", "acme"]).find_all("nothing here") == [""]
+
+
+def test_no_brands():
+    assert BrandMatcher([]).find_all("acme") == []
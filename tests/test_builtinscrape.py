@@ -0,0 +1,114 @@
+from threading import Lock
+from time import sleep
+from types import SimpleNamespace
+
+from scrape import builtinscrape
+
+DOCS = {
+    "jobs": [{"id": number, "title": f"Job {number}", "body": ""} for number in range(6)],
+    "companies": [{"title": f"Co {number}", "alias": f"/company/co{number}"} for number in range(6)],
+}
+
+
+def to_company_result(entry, company_dict):
+    return None if company_dict is None else company_dict["city"]
+
+
+def test_parse_results_looks_companies_up_concurrently_in_page_order(monkeypatch):
+    running = [0, 0]
+    lock = Lock()
+
+    def lookup(alias, region_id):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return None if alias == "co3" else {"city": alias}
+
+    monkeypatch.setattr(builtinscrape, "webscrape_results", lambda url, querystring: DOCS)
+    monkeypatch.setattr(builtinscrape, "shared_company_lookup", lookup)
+    monkeypatch.setattr(builtinscrape.ListingEntry, "to_company_result", to_company_result)
+    config = SimpleNamespace(lookup_concurrency=3, total_pages=1)
+
+    companies = builtinscrape.parse_results("https://api.example/jobs", {"page": 0}, 0, config)
+
+    # co3 could not be looked up and is left out
+    assert companies == ["co0", "co1", "co2", "co4", "co5"]
+    assert running[1] == 3
+
+
+def listing_pages(
+    pages_with_jobs: int, delays: dict[int, float] | None = None, failing: int | None = None
+):
+    """A webscrape_results standing in for the listing endpoint, recording the pages asked for
+    and the most requests it had in flight at once.
+    """
+    fetched = SimpleNamespace(pages=[], running=0, most=0)
+    lock = Lock()
+
+    def webscrape_results(url, querystring):
+        page = querystring["page"]
+        with lock:
+            fetched.pages.append(page)
+            fetched.running += 1
+            fetched.most = max(fetched.most, fetched.running)
+        sleep((delays or {}).get(page, 0.01))
+        with lock:
+            fetched.running -= 1
+        if page == failing:
+            return None
+        return {"jobs": [{"id": page}] if page < pages_with_jobs else [], "query": querystring}
+
+    return fetched, webscrape_results
+
+
+def test_prefetched_pages_come_in_page_order(monkeypatch):
+    # later pages answer first, and page 1 fails to fetch
+    fetched, fake = listing_pages(10, {0: 0.06, 1: 0.04, 2: 0.02, 3: 0.0}, failing=1)
+    monkeypatch.setattr(builtinscrape, "webscrape_results", fake)
+
+    pages = list(builtinscrape.prefetch_listings("https://api.example/jobs", {"q": "x"}, 4, depth=4))
+
+    assert [page for page, _docs in pages] == [0, 2, 3]
+    # every page has its own querystring
+    assert [docs["query"] for _page, docs in pages] == [
+        {"q": "x", "page": 0}, {"q": "x", "page": 2}, {"q": "x", "page": 3}
+    ]
+
+
+def test_no_page_is_requested_after_an_empty_one(monkeypatch):
+    fetched, fake = listing_pages(2)
+    monkeypatch.setattr(builtinscrape, "webscrape_results", fake)
+
+    pages = list(builtinscrape.prefetch_listings("https://api.example/jobs", {}, 10, depth=1))
+
+    assert [page for page, _docs in pages] == [0, 1]
+    assert fetched.pages == [0, 1, 2]
+
+
+def test_prefetching_stops_within_its_lookahead_of_an_empty_page(monkeypatch):
+    fetched, fake = listing_pages(2)
+    monkeypatch.setattr(builtinscrape, "webscrape_results", fake)
+
+    pages = list(builtinscrape.prefetch_listings("https://api.example/jobs", {}, 20, depth=3))
+
+    assert [page for page, _docs in pages] == [0, 1]
+    # the pages already in flight when page 2 came back empty, and none after
+    assert max(fetched.pages) <= 2 + 3 - 1
+
+
+def test_no_more_than_depth_pages_are_in_flight(monkeypatch):
+    fetched, fake = listing_pages(12)
+    monkeypatch.setattr(builtinscrape, "webscrape_results", fake)
+
+    consumed = []
+    for page, _docs in builtinscrape.prefetch_listings("https://api.example/jobs", {}, 12, depth=3):
+        # a slow consumer doesn't let the fetches run further ahead
+        sleep(0.02)
+        consumed.append((page, max(fetched.pages)))
+
+    assert fetched.most == 3
+    assert sorted(fetched.pages) == list(range(12))
+    assert all(requested < page + 3 for page, requested in consumed)
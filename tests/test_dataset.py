@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+import pytest
+from factories import card, company
+
+from scrape import dataset, serial
+from scrape.builtinscrape import ListingEntry
+from scrape.dataset import DatasetWriter, load_dataset
+
+
+def write_rows(directory: str) -> DatasetWriter:
+    writer = DatasetWriter(directory, batch_size=2, run_id="run")
+    writer.append(company("1", industries=["Fintech"]), card("ada"))
+    writer.append(company("2"), card("grace"))
+    writer.append(company("3"), None, outcome="resolve_failed")
+    writer.close()
+    return writer
+
+
+def check_round_trip(directory: str) -> None:
+    loaded = load_dataset(directory, ["run_id", "outcome", "job_id", "industries", "contact_fname"])
+
+    assert loaded == {
+        "run_id": ["run", "run", "run"],
+        "outcome": ["resolved", "resolved", "resolve_failed"],
+        "job_id": ["1", "2", "3"],
+        "industries": [["Fintech"], [], []],
+        "contact_fname": ["ada", "grace", None],
+    }
+
+
+def test_json_lines_round_trip_without_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset, "pa", None)
+
+    writer = write_rows(str(tmp_path))
+
+    assert writer.path.endswith("run.columns.jsonl")
+    assert writer.rows == 3
+    # one line per batch of rows
+    assert len(open(writer.path, encoding="utf-8").readlines()) == 2
+    check_round_trip(str(tmp_path))
+
+
+def test_parquet_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+
+    writer = write_rows(str(tmp_path))
+
+    assert writer.path.endswith("run.parquet")
+    check_round_trip(str(tmp_path))
+
+
+def test_columns_a_file_predates_load_as_none(tmp_path):
+    partition = tmp_path / "date=2026-01-01"
+    partition.mkdir()
+    (partition / "old.columns.jsonl").write_text('{"run_id": ["old"], "job_id": ["1"]}\n')
+
+    assert load_dataset(str(tmp_path), ["job_id", "outcome"]) == {"job_id": ["1"], "outcome": [None]}
+
+
+class Journal:
+    """Holds one company already looked up by an earlier run."""
+
+    def __init__(self):
+        self.failures = []
+
+    def company(self, job_id):
+        return company(job_id) if job_id == "resumed" else None
+
+    def mark_failure(self, job_id, stage, error_found):
+        self.failures.append((job_id, stage))
+
+    def mark_lookup(self, found):
+        pass
+
+
+def test_jobs_whose_lookup_fails_reach_the_dataset(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset, "pa", None)
+    writer = DatasetWriter(str(tmp_path), run_id="run")
+    monkeypatch.setattr(dataset, "_dataset", writer)
+
+    def lookup(alias, region_id):
+        if alias == "broken":
+            raise ValueError("bad profile")
+        return None
+
+    monkeypatch.setattr(serial, "shared_company_lookup", lookup)
+    entries = [
+        ListingEntry(0, "broken", "Broken", "Engineer", "", job_id="a"),
+        ListingEntry(1, "missing", "Missing", "Engineer", "", job_id="b"),
+        ListingEntry(2, "acme", "Acme", "Engineer", "", job_id="resumed"),
+    ]
+    journal = Journal()
+
+    found = list(
+        serial.lookup_entries(entries, journal, SimpleNamespace(lookup_concurrency=1))
+    )
+    writer.close()
+
+    assert [result.job_id for result in found] == ["resumed"]
+    assert journal.failures == [("a", "lookup_done")]
+    loaded = load_dataset(str(tmp_path), ["job_id", "outcome", "company_name", "city"])
+    assert loaded == {
+        "job_id": ["a", "b"],
+        "outcome": ["lookup_failed", "lookup_failed"],
+        "company_name": ["Broken", "Missing"],
+        "city": ["", ""],
+    }
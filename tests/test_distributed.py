@@ -0,0 +1,112 @@
+from time import sleep
+from types import SimpleNamespace
+
+import pytest
+from factories import card, company
+
+from scrape import distributed
+from scrape.work_queue import WorkQueue
+
+CONFIG = SimpleNamespace(queue_claim_batch=2, queue_poll_interval=0.01, worker_report_interval=60)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=60)
+    yield queue
+    queue.close()
+
+
+class BatchedWriter:
+    """Stands in for CoverLetterWriter with batched PDFs: letters are written as the batch is flushed."""
+
+    waiting: list = []
+
+    def __init__(self, company, contact, persona, config):
+        self.company = company
+
+    def write(self, on_written=None, on_failed=None):
+        if self.company.job_id == "bad":
+            raise ValueError("no letter")
+        BatchedWriter.waiting.append((self.company, on_written, on_failed))
+
+
+@pytest.fixture
+def batched(monkeypatch, queue):
+    flushes = []
+
+    def flush_batch():
+        flushes.append(queue.counts()["done"])
+        waiting, BatchedWriter.waiting = BatchedWriter.waiting, []
+        for company, on_written, _on_failed in waiting:
+            on_written(company)
+
+    BatchedWriter.waiting = []
+    monkeypatch.setattr(distributed, "CoverLetterWriter", BatchedWriter)
+    monkeypatch.setattr(distributed, "flush_batch", flush_batch)
+    monkeypatch.setattr(distributed, "letter_batch", lambda *args, **kwargs: None)
+    monkeypatch.setattr(distributed, "resolve_contact", lambda company, config: card())
+    return flushes
+
+
+def test_batched_jobs_are_acknowledged_once_their_file_is_written(queue, batched):
+    queue.enqueue([company("1"), company("2"), company("bad"), company("3")])
+    queue.set_complete(True)
+
+    report = distributed.run_worker(CONFIG, None, queue, "w1")
+
+    # nothing was acknowledged before the first flush, when the worker ran out of jobs
+    assert batched[0] == 0
+    assert queue.counts()["done"] == 3
+    assert report["done"] == 3
+    # the job whose letter raises is retried until it runs out of attempts
+    assert report["failed"] == 3
+    assert queue.counts()["failed"] == 1
+
+
+def test_batched_file_that_fails_fails_its_jobs(queue, batched, monkeypatch):
+    def failed_flush():
+        waiting, BatchedWriter.waiting = BatchedWriter.waiting, []
+        for company, _on_written, on_failed in waiting:
+            on_failed(company, OSError("disk full"))
+
+    monkeypatch.setattr(distributed, "flush_batch", failed_flush)
+    queue.enqueue([company("1"), company("2")])
+    queue.set_complete(True)
+    queue.max_attempts = 1
+
+    report = distributed.run_worker(CONFIG, None, queue, "w1")
+
+    assert report["failed"] == 2
+    assert queue.counts()["failed"] == 2
+
+
+def test_keep_lease_renews_the_held_jobs(queue):
+    queue.lease_seconds = 0.15
+    queue.enqueue([company("1")])
+    queue.claim("w1")
+    held = {"1"}
+
+    with distributed.keep_lease(queue, held, "w1"):
+        sleep(0.4)
+        assert queue.claim("w2") == []
+
+    assert held == {"1"}
+    assert queue.ack("1", "w1", card())
+
+
+def test_keep_lease_drops_a_job_whose_lease_moved_on(queue):
+    queue.lease_seconds = 0.15
+    queue.enqueue([company("1"), company("2")])
+    queue.claim("w1", 2)
+    held = {"1", "2"}
+
+    with distributed.keep_lease(queue, held, "w1"):
+        # the first lease runs out before it is renewed, and another worker takes the job
+        queue.execute("UPDATE items SET lease_expires = 0 WHERE job_id = '1'", ())
+        assert [job.job_id for job in queue.claim("w2")] == ["1"]
+        sleep(0.2)
+
+    assert held == {"2"}
+    assert not queue.ack("1", "w1", card())
+    assert queue.ack("1", "w2", card())
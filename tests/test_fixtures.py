@@ -0,0 +1,89 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from types import SimpleNamespace
+
+import pytest
+
+from scrape.fixtures import configure_fixtures
+from scrape.http_client import HttpClient
+from scrape.response_cache import configure_cache
+
+
+class Origin(BaseHTTPRequestHandler):
+    """Answers every GET with its own path, as JSON."""
+
+    protocol_version = "HTTP/1.1"
+    requests: list[str] = []
+
+    def do_GET(self):
+        Origin.requests.append(self.path)
+        body = ('{"path": "%s"}' % self.path).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def origin():
+    Origin.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Origin)
+    httpd.daemon_threads = True
+    Thread(target=httpd.serve_forever, daemon=True).start()
+    host, port = httpd.server_address[:2]
+    yield httpd, f"http://{host}:{port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def fixture_config(tmp_path, mode: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        fixture_mode=mode,
+        fixture_dir=str(tmp_path / "fixtures"),
+        replay_latency=0.0,
+        cache_path=str(tmp_path / "cache.sqlite"),
+        cache_bypass=False,
+        cache_max_bytes=1 << 20,
+        cache_default_ttl=60,
+        cache_ttls={},
+    )
+
+
+@pytest.fixture(autouse=True)
+def live_afterwards(tmp_path):
+    yield
+    configure_fixtures(fixture_config(tmp_path, ""))
+
+
+def test_a_recorded_run_replays_without_the_origin(tmp_path, origin):
+    httpd, url = origin
+    client = HttpClient()
+    configure_fixtures(fixture_config(tmp_path, "record"))
+    recorded = client.get(f"{url}/jobs", params={"page": 1, "region": "5"})
+    assert recorded.json() == {"path": "/jobs?page=1&region=5"}
+
+    httpd.shutdown()
+    configure_fixtures(fixture_config(tmp_path, "replay"))
+    # the same request, its querystring in another order
+    replayed = client.get(f"{url}/jobs", params={"region": "5", "page": 1})
+    missing = client.get(f"{url}/jobs", params={"page": 2, "region": "5"})
+    client.close()
+
+    assert Origin.requests == ["/jobs?page=1&region=5"]
+    assert replayed.status_code == 200
+    assert replayed.json() == recorded.json()
+    assert replayed.headers["Content-Type"] == "application/json"
+    assert missing.status_code == 404
+
+
+@pytest.mark.parametrize("mode", ["record", "replay"])
+def test_fixture_runs_leave_the_response_cache_off(tmp_path, mode):
+    assert configure_cache(fixture_config(tmp_path, mode)) is None
+    live = fixture_config(tmp_path, "")
+    assert configure_cache(live) is not None
+    live.cache_bypass = True
+    assert configure_cache(live) is None
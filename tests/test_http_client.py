@@ -0,0 +1,64 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import pytest
+
+from scrape.http_client import HttpClient
+
+
+class KeepAlive(BaseHTTPRequestHandler):
+    """Answers every GET on a kept-alive connection, recording the client port of each."""
+
+    protocol_version = "HTTP/1.1"
+    ports: list[int] = []
+
+    def do_GET(self):
+        KeepAlive.ports.append(self.client_address[1])
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def port():
+    KeepAlive.ports = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), KeepAlive)
+    httpd.daemon_threads = True
+    Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_requests_to_a_host_reuse_its_connection(port):
+    client = HttpClient()
+    url = f"http://127.0.0.1:{port}"
+    for page in range(5):
+        assert client.get(f"{url}/jobs", params={"page": page}).json() == {"ok": True}
+
+    assert client.stats() == {url: {"requests": 5, "connections": 1, "reused": 4}}
+    # the server saw a single connection too
+    assert len(set(KeepAlive.ports)) == 1
+    client.close()
+    assert client.stats() == {}
+
+
+def test_each_host_has_its_own_pool(port):
+    client = HttpClient()
+    for host in ("127.0.0.1", "localhost", "127.0.0.1"):
+        client.get(f"http://{host}:{port}/companies")
+
+    assert client.stats() == {
+        f"http://127.0.0.1:{port}": {"requests": 2, "connections": 1, "reused": 1},
+        f"http://localhost:{port}": {"requests": 1, "connections": 1, "reused": 0},
+    }
+    assert client.session_for(f"http://127.0.0.1:{port}/x") is not client.session_for(
+        f"http://localhost:{port}/x"
+    )
+    client.close()
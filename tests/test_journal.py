@@ -0,0 +1,106 @@
+import sqlite3
+
+import pytest
+from factories import card, company
+
+from scrape.journal import RunJournal
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "journal.sqlite")
+
+
+def test_resume_picks_up_where_the_last_run_stopped(path):
+    journal = RunJournal(path)
+    for job_id in ("1", "2", "3"):
+        journal.mark_listing(job_id, 0)
+        journal.mark_lookup(company(job_id))
+    journal.mark_contact(company("1"), card("ada"))
+    journal.mark_contact(company("2"), card("bob"))
+    journal.mark_letter(company("1"))
+    journal.close()
+
+    journal = RunJournal(path, resume=True)
+    try:
+        assert journal.letter_written("1")
+        assert not journal.letter_written("2")
+        assert journal.company("3") == company("3")
+        assert journal.contact("3") is None
+        assert journal.pending_letters() == [(company("2"), card("bob"))]
+        assert journal.progress() == {
+            "listing_seen": 3,
+            "lookup_done": 3,
+            "contact_resolved": 2,
+            "letter_written": 1,
+            "given_up": 0,
+        }
+    finally:
+        journal.close()
+
+
+def test_a_fresh_run_forgets_the_last_one(path):
+    journal = RunJournal(path)
+    journal.mark_listing("1", 0)
+    journal.close()
+
+    journal = RunJournal(path)
+    try:
+        assert journal.progress()["listing_seen"] == 0
+    finally:
+        journal.close()
+
+
+def test_failing_job_is_given_up_on_after_max_attempts(path):
+    for attempt in range(1, 4):
+        journal = RunJournal(path, resume=True, max_attempts=3)
+        journal.mark_listing("1", 0)
+        assert not journal.settled("1")
+        given_up = journal.mark_failure("1", "contact_resolved", ValueError("no contact"))
+        assert given_up == (attempt == 3)
+        journal.close()
+
+    journal = RunJournal(path, resume=True, max_attempts=3)
+    try:
+        assert journal.settled("1")
+        assert not journal.letter_written("1")
+        assert journal.progress()["given_up"] == 1
+        error = journal.connection.execute("SELECT error FROM jobs").fetchone()[0]
+        assert error == "contact_resolved: ValueError('no contact')"
+    finally:
+        journal.close()
+
+
+def test_pending_letters_leave_out_jobs_given_up_on(path):
+    journal = RunJournal(path, max_attempts=1)
+    try:
+        for job_id in ("1", "2"):
+            journal.mark_listing(job_id, 0)
+            journal.mark_lookup(company(job_id))
+            journal.mark_contact(company(job_id), card())
+        journal.mark_failure("1", "letter_written", OSError("disk full"))
+
+        assert journal.pending_letters() == [(company("2"), card())]
+    finally:
+        journal.close()
+
+
+def test_journal_from_before_failures_were_recorded_is_upgraded(path):
+    connection = sqlite3.connect(path)
+    connection.execute(
+        """CREATE TABLE jobs (
+            job_id TEXT PRIMARY KEY, page INTEGER, listing_seen REAL, lookup_done REAL,
+            contact_resolved REAL, letter_written REAL, company TEXT, contact TEXT
+        )"""
+    )
+    connection.execute("INSERT INTO jobs (job_id, page, listing_seen) VALUES ('1', 0, 1.0)")
+    connection.commit()
+    connection.close()
+
+    journal = RunJournal(path, resume=True, max_attempts=1)
+    try:
+        assert not journal.settled("1")
+        assert journal.mark_failure("1", "lookup_done", KeyError("name"))
+        assert journal.settled("1")
+    finally:
+        journal.close()
@@ -0,0 +1,58 @@
+import json
+from json import JSONDecodeError
+
+import pytest
+
+from scrape.json_stream import iter_array_items
+
+DOCUMENT = {
+    "total": 2,
+    "jobs": [
+        {"id": 1, "title": "Data \"Engineer\"", "body": "<p>[brackets], {braces} and \\ slashes</p>"},
+        {"id": 2, "title": "Café ☕", "tags": [1, [2, 3], {"nested": []}]},
+    ],
+    "meta": {"jobs": ["not", "top", "level"]},
+    "companies": [{"title": "Acme", "alias": "/company/acme"}, {"title": "Beta", "alias": "/company/beta"}],
+    "empty": [],
+}
+
+
+def chunked(data: bytes, size: int):
+    return [data[start : start + size] for start in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+def test_items_match_json_loads_whatever_the_chunk_size(size):
+    data = json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8")
+
+    items = list(iter_array_items(chunked(data, size), {"jobs", "companies", "empty"}))
+
+    expected = [("jobs", job) for job in DOCUMENT["jobs"]]
+    expected += [("companies", company) for company in DOCUMENT["companies"]]
+    assert items == expected
+
+
+def test_arrays_not_asked_for_are_skipped():
+    data = json.dumps(DOCUMENT).encode("utf-8")
+
+    assert [key for key, _item in iter_array_items([data], {"companies"})] == ["companies"] * 2
+
+
+def test_scalar_elements():
+    data = b'{"ids": [1, "two", null, true, 4.5]}'
+
+    assert [item for _key, item in iter_array_items(chunked(data, 3), {"ids"})] == [
+        1,
+        "two",
+        None,
+        True,
+        4.5,
+    ]
+
+
+def test_truncated_array_raises():
+    data = json.dumps(DOCUMENT).encode("utf-8")
+    cut = data.index(b'"companies"') + 30
+
+    with pytest.raises(JSONDecodeError):
+        list(iter_array_items(chunked(data[:cut], 16), {"companies"}))
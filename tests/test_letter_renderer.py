@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+import pytest
+
+from scrape.output_sink import OutputSink
+
+platypus = pytest.importorskip("reportlab.platypus")
+
+RENDERER = SimpleNamespace(persona=SimpleNamespace(name="Ada"))
+
+
+def letter(text: str) -> list:
+    return [platypus.Paragraph(text)]
+
+
+def test_letters_are_reported_written_once_their_file_is(tmp_path):
+    from scrape.letter_renderer import LetterBatch
+
+    sink = OutputSink(str(tmp_path), write_behind=True)
+    batch = LetterBatch(RENDERER, sink, "letters", letters_per_file=2)
+    written = []
+
+    for name in ("a", "b", "c"):
+        batch.add(name, letter(name), on_written=lambda name=name: written.append(name))
+    # the first file is written as the third letter arrives
+    assert written == ["a", "b"]
+    assert (tmp_path / "letters_001.pdf").exists()
+
+    assert batch.close() == ["c"]
+    assert written == ["a", "b", "c"]
+    assert batch.close() == []
+    assert batch.paths == [sink.path("letters_001.pdf"), sink.path("letters_002.pdf")]
+    sink.close()
+
+
+def test_file_that_cannot_be_written_fails_its_letters(tmp_path):
+    from scrape.letter_renderer import LetterBatch
+
+    sink = OutputSink(str(tmp_path))
+    batch = LetterBatch(RENDERER, sink, "letters")
+    failed = []
+
+    def broken(path, data, on_done=None):
+        raise OSError("disk full")
+
+    sink.write_bytes = broken
+    for name in ("a", "b"):
+        batch.add(
+            name,
+            letter(name),
+            on_written=lambda: failed.append("written"),
+            on_failed=lambda error_found, name=name: failed.append((name, str(error_found))),
+        )
+
+    with pytest.raises(OSError):
+        batch.close()
+    assert failed == [("a", "disk full"), ("b", "disk full")]
+
+
+def test_letter_added_is_kept_when_the_full_file_before_it_fails(tmp_path):
+    from scrape.letter_renderer import LetterBatch
+
+    sink = OutputSink(str(tmp_path))
+    batch = LetterBatch(RENDERER, sink, "letters", letters_per_file=1)
+    written, failed = [], []
+    real_write = sink.write_bytes
+
+    def broken_once(path, data, on_done=None):
+        sink.write_bytes = real_write
+        raise OSError("disk full")
+
+    sink.write_bytes = broken_once
+    for name in ("a", "b"):
+        batch.add(
+            name,
+            letter(name),
+            on_written=lambda name=name: written.append(name),
+            on_failed=lambda error_found, name=name: failed.append(name),
+        )
+
+    assert failed == ["a"]
+    assert batch.close() == ["b"]
+    assert written == ["b"]
+    assert batch.paths == [sink.path("letters_001.pdf")]
@@ -0,0 +1,103 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from scrape.letter_template import compile_template, load_template
+
+SOURCE = """# a comment, skipped
+[address Main]
+**{company_name}**
+{city}, {state}
+
+
+[body MainBody]
+Tom & Jerry at [{company_name}](https://example.com/{company_name}).
+# another comment
+
+[signature]
+"""
+
+VALUES = {"company_name": "A&B <Co>", "city": "New York", "state": "NY"}
+
+
+def test_sections_are_compiled_with_their_styles():
+    template = compile_template(SOURCE)
+
+    assert [(section.name, section.style) for section in template.sections] == [
+        ("address", "Main"),
+        ("body", "MainBody"),
+        ("signature", None),
+    ]
+    assert template.fields == {"company_name", "city", "state"}
+    # trailing blank lines are dropped from a section
+    assert template.sections[0].text == "{company_name}\n{city}, {state}"
+
+
+def test_render_text_drops_the_markup():
+    text = compile_template(SOURCE).render_text(VALUES)
+
+    assert text == "A&B <Co>\nNew York, NY\n\nTom & Jerry at A&B <Co>.\n"
+
+
+def test_render_markup_escapes_the_values_and_the_template():
+    rendered = {
+        section.name: markup
+        for section, markup in compile_template(SOURCE).render_markup(VALUES)
+    }
+
+    assert rendered["address"] == "<b>A&amp;B &lt;Co&gt;</b><br />New York, NY"
+    assert rendered["body"] == (
+        'Tom &amp; Jerry at <a href="https://example.com/A&amp;B &lt;Co&gt;" color="blue">'
+        "A&amp;B &lt;Co&gt;</a>."
+    )
+    assert rendered["signature"] == ""
+
+
+def test_text_outside_a_section_is_refused():
+    with pytest.raises(ValueError, match="Line 2"):
+        compile_template("# fine\nstray text\n[address Main]\n")
+
+
+def test_load_template_recompiles_only_when_the_file_changes(tmp_path):
+    path = tmp_path / "letter.txt"
+    path.write_text("[intro Main]\nHello {name}\n")
+
+    first = load_template(str(path))
+    assert load_template(str(path)) is first
+
+    path.write_text("[intro Main]\nGoodbye {name}\n")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    second = load_template(str(path))
+
+    assert second is not first
+    assert second.render_text({"name": "Ada"}) == "Goodbye Ada\n"
+
+
+def test_shipped_template_only_uses_the_letter_fields():
+    from scrape.coverletterwriter import CoverLetterWriter
+
+    writer = SimpleNamespace(
+        company=SimpleNamespace(company_name="", street_address="", city="", state=""),
+        persona=SimpleNamespace(
+            name="",
+            role="",
+            values="",
+            tools=["a", "b", "c", "d", "e"],
+            phone_number="",
+            email="",
+            portfolio="",
+        ),
+        config=SimpleNamespace(excitement_words=["thrilled"]),
+        letter_date="",
+        hiring_manager="",
+        job="",
+        reference="",
+        create_heresay=lambda: "",
+    )
+    template = load_template(
+        os.path.join(os.path.dirname(__file__), "..", "templates", "cover_letter.txt")
+    )
+
+    assert template.fields <= set(CoverLetterWriter.letter_fields(writer))
@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+import pytest
+
+from scrape import lexicon
+from scrape.lexicon import (Lexicon, build_lexicon, compile_section,
+                            load_lexicon)
+
+WORDS = {
+    "first_names": ["Ann", "Bob", "Zoë", "Ann"],
+    "surnames": ["Smith", "O'Neil"],
+    "brand_names": ["acme", "globex", ""],
+    "webtext": [],
+}
+FINGERPRINT = b"f" * 32
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    monkeypatch.setattr(lexicon, "read_source_words", lambda config: WORDS)
+    monkeypatch.setattr(lexicon, "source_fingerprint", lambda config: FINGERPRINT)
+    monkeypatch.setattr(lexicon, "_lexicons", {})
+    return SimpleNamespace(lexicon_path=str(tmp_path / "lexicon.bin"))
+
+
+def test_sections_hold_their_words(config):
+    build_lexicon(config, FINGERPRINT)
+    compiled = Lexicon(config.lexicon_path)
+
+    assert compiled.fingerprint == FINGERPRINT
+    assert len(compiled.first_names) == 3
+    assert list(compiled.first_names) == ["Ann", "Bob", "Zoë"]
+    for name, words in WORDS.items():
+        section = getattr(compiled, name)
+        assert all(word in section for word in words)
+    assert "ann" not in compiled.first_names
+    assert "Smith" not in compiled.first_names
+    assert None not in compiled.surnames
+    assert "anything" not in compiled.webtext
+
+
+def test_hash_table_survives_collisions():
+    words = [f"word{number}" for number in range(2000)]
+    data, count, table_size = compile_section(words)
+
+    assert count == 2000
+    assert table_size >= 2 * count
+    assert table_size & (table_size - 1) == 0
+    assert len(data) % 4 == 0
+
+
+def test_load_lexicon_builds_once_and_reuses(config, monkeypatch):
+    first = load_lexicon(config)
+    assert load_lexicon(config) is first
+
+    builds = []
+    monkeypatch.setattr(lexicon, "_lexicons", {})
+    monkeypatch.setattr(lexicon, "build_lexicon", lambda *args: builds.append(args))
+    assert "Bob" in load_lexicon(config).first_names
+    assert builds == []
+
+
+def test_load_lexicon_rebuilds_a_stale_artifact(config, monkeypatch):
+    build_lexicon(config, b"s" * 32)
+
+    assert load_lexicon(config).fingerprint == FINGERPRINT
+
+
+def test_prebuilt_artifact_is_used_without_its_sources(config, monkeypatch):
+    build_lexicon(config, b"s" * 32)
+    monkeypatch.setattr(lexicon, "source_fingerprint", lambda config: None)
+    monkeypatch.setattr(lexicon, "build_lexicon", lambda *args: pytest.fail("rebuilt"))
+
+    assert load_lexicon(config).fingerprint == b"s" * 32
+
+
+def test_fingerprint_without_the_nltk_corpora(tmp_path, monkeypatch):
+    nltk = pytest.importorskip("nltk")
+    monkeypatch.setattr(nltk.data, "path", [str(tmp_path)])
+    monkeypatch.delenv("NLTK_DATA", raising=False)
+    config = SimpleNamespace(brand_names="brands.txt", surnames="surnames.txt")
+
+    assert lexicon.source_fingerprint(config) is None
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"\0" * 64)
+
+    with pytest.raises(ValueError):
+        Lexicon(str(path))
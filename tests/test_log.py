@@ -0,0 +1,144 @@
+import json
+import logging
+from threading import Thread
+from types import SimpleNamespace
+
+import pytest
+from requests import RequestException
+
+from scrape import log, web_scraper
+from scrape.log import (ContextFilter, JsonFormatter, SamplingFilter,
+                        configure_logging, log_context, logger, stop_logging)
+
+
+def record(message: str = "Fetched %s", level: int = logging.INFO, *args) -> logging.LogRecord:
+    return logging.LogRecord("jobscraper", level, __file__, 1, message, args or ("x",), None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(log, "monotonic", lambda: clock.now)
+    return clock
+
+
+def test_rate_limit_keeps_a_burst_then_counts_what_it_dropped(clock):
+    sampling = SamplingFilter(rate_limit=2.0)
+
+    kept = [sampling.filter(record()) for _ in range(5)]
+    assert kept == [True, True, False, False, False]
+
+    clock.now += 0.5
+    late = record()
+    assert sampling.filter(late)
+    assert late.suppressed == 3
+    # templates are limited separately
+    assert sampling.filter(record("Resolved %s"))
+
+
+def test_sampling_keeps_a_share_of_a_template(monkeypatch):
+    draws = iter([0.05, 0.5, 0.95, 0.05])
+    monkeypatch.setattr(log.random, "random", lambda: next(draws))
+    sampling = SamplingFilter({"Fetched %s": 0.1})
+
+    kept = [sampling.filter(record()) for _ in range(4)]
+
+    assert kept == [True, False, False, True]
+
+
+def test_warnings_are_always_kept(clock):
+    sampling = SamplingFilter({"Failed %s": 0.0}, rate_limit=1.0)
+
+    assert all(sampling.filter(record("Failed %s", logging.WARNING)) for _ in range(10))
+    assert not sampling.filter(record("Failed %s"))
+
+
+def test_log_context_is_per_thread_and_nests():
+    seen = {}
+
+    def other_thread():
+        stamped = record()
+        ContextFilter().filter(stamped)
+        seen["other"] = stamped.company_id
+
+    with log_context(company_id="acme", stage="resolve"):
+        with log_context(stage="render", job_id="7"):
+            inner = record()
+            ContextFilter().filter(inner)
+            thread = Thread(target=other_thread)
+            thread.start()
+            thread.join()
+        outer = record()
+        ContextFilter().filter(outer)
+    after = record()
+    ContextFilter().filter(after)
+
+    assert (inner.company_id, inner.job_id, inner.stage) == ("acme", "7", "render")
+    assert (outer.company_id, outer.job_id, outer.stage) == ("acme", "", "resolve")
+    assert (after.company_id, after.stage) == ("", "")
+    assert seen["other"] == ""
+
+
+def test_json_lines_carry_the_context_ids(monkeypatch):
+    monkeypatch.setattr(log, "run_id", "run1")
+    with log_context(company_id="acme", job_id="7", stage="render"):
+        stamped = record("Wrote %s", logging.INFO, "letter.pdf")
+        ContextFilter().filter(stamped)
+    stamped.suppressed = 2
+
+    entry = json.loads(JsonFormatter().format(stamped))
+
+    assert entry["message"] == "Wrote letter.pdf"
+    assert entry["level"] == "INFO"
+    assert entry["run_id"] == "run1"
+    assert (entry["company_id"], entry["job_id"], entry["stage"]) == ("acme", "7", "render")
+    assert entry["suppressed"] == 2
+
+
+def test_configured_logging_writes_json_lines_from_the_listener(tmp_path):
+    path = tmp_path / "run.log"
+    config = SimpleNamespace(
+        log_path=str(path),
+        log_format="json",
+        log_level="info",
+        log_sampling={"Skipped %s": 0.0},
+        log_rate_limit=0.0,
+    )
+    configure_logging(config)
+    try:
+        with log_context(job_id="7"):
+            logger.info("Skipped %s", "one")
+            logger.info("Wrote %s", "letter.pdf")
+            logger.debug("Not at this level")
+    finally:
+        stop_logging()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(line["message"], line["job_id"]) for line in lines] == [("Wrote letter.pdf", "7")]
+    assert logger.handlers == [log.stream_handler]
+
+
+def test_failed_fetch_logs_one_template_and_its_cause(monkeypatch):
+    records = []
+
+    class Keep(logging.Handler):
+        def emit(self, record):
+            records.append(record)
+
+    def broken(target_url, querystring, use_cache):
+        raise RequestException("reset")
+
+    monkeypatch.setattr(web_scraper, "fetch_text", broken)
+    handler = Keep()
+    logger.addHandler(handler)
+    try:
+        assert web_scraper.webscrape_results("https://example.com") is None
+    finally:
+        logger.removeHandler(handler)
+
+    # formatted only once a handler keeps the record, and sampled by its template
+    (kept,) = records
+    assert kept.msg == (
+        "An error has occurred, moving to next item in sequence. Cause of error: %s"
+    )
+    assert kept.getMessage().endswith("Cause of error: reset")
@@ -0,0 +1,116 @@
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from scrape import coverletterwriter, journal, output_sink, serial
+
+
+def parse(*argv: str):
+    return main.build_parser().parse_known_args(list(argv))
+
+
+def test_bare_invocation_scrapes_with_the_default_config():
+    args, extra = parse()
+
+    assert (args.command, args.config, args.resume, args.text_only) == (
+        None,
+        "./config.json",
+        False,
+        False,
+    )
+    assert extra == []
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ("--config", "a.json", "render"),
+        ("render", "--config", "a.json"),
+    ],
+)
+def test_config_may_come_before_or_after_the_command(argv):
+    args, _extra = parse(*argv)
+
+    assert (args.command, args.config) == ("render", "a.json")
+
+
+def test_command_without_config_keeps_the_one_given_before_it():
+    # the command's own --config is suppressed, so it can't reset the top-level value
+    args, _extra = parse("--config", "a.json", "worker", "--id", "w1")
+
+    assert (args.config, args.worker_id) == ("a.json", "w1")
+    assert parse("worker")[0].config == "./config.json"
+
+
+def test_bench_arguments_are_passed_through(monkeypatch):
+    args, extra = parse("bench", "--companies", "20", "--config", "b.json")
+
+    assert args.command == "bench"
+    assert extra == ["--companies", "20", "--config", "b.json"]
+
+    handed = []
+    monkeypatch.setattr(
+        "benchmarks.bench_pipeline.main", lambda argv: handed.append(argv), raising=True
+    )
+    main.main(["bench", "--mode", "pipeline"])
+    assert handed == [["--mode", "pipeline"]]
+
+
+@pytest.mark.parametrize("argv", [["render", "--bogus"], ["--resume-all"], ["worker", "x"]])
+def test_unknown_arguments_of_other_commands_are_errors(argv, monkeypatch, capsys):
+    monkeypatch.setattr(main, "read_config", lambda path: pytest.fail("read the config"))
+
+    with pytest.raises(SystemExit) as exited:
+        main.main(argv)
+
+    assert exited.value.code == 2
+    assert "unrecognized arguments" in capsys.readouterr().err
+
+
+def test_journal_is_closed_when_closing_the_batch_fails(monkeypatch):
+    closed = []
+
+    class Journal:
+        def progress(self):
+            return {}
+
+        def close(self):
+            closed.append(True)
+
+    def broken_close_batch():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(main, "exported_metrics", lambda config: nullcontext())
+    monkeypatch.setattr(main, "run_services", lambda config: nullcontext())
+    monkeypatch.setattr(journal.RunJournal, "from_config", lambda config, resume: Journal())
+    monkeypatch.setattr(serial, "run_serial", lambda *args, **kwargs: None)
+    monkeypatch.setattr(coverletterwriter, "close_batch", broken_close_batch)
+
+    with pytest.raises(OSError):
+        main.scrape(SimpleNamespace(run_mode="serial"), None)
+
+    assert closed == [True]
+
+
+def test_letters_written_behind_are_recorded_before_the_journal_closes(monkeypatch):
+    events = []
+
+    class Journal:
+        def progress(self):
+            return {}
+
+        def close(self):
+            events.append("journal closed")
+
+    monkeypatch.setattr(main, "exported_metrics", lambda config: nullcontext())
+    monkeypatch.setattr(main, "run_services", lambda config: nullcontext())
+    monkeypatch.setattr(journal.RunJournal, "from_config", lambda config, resume: Journal())
+    monkeypatch.setattr(serial, "run_serial", lambda *args, **kwargs: None)
+    monkeypatch.setattr(coverletterwriter, "close_batch", lambda: events.append("batch closed"))
+    monkeypatch.setattr(output_sink, "close_sink", lambda: events.append("sink closed"))
+
+    main.scrape(SimpleNamespace(run_mode="serial"), None)
+
+    assert events == ["batch closed", "sink closed", "journal closed"]
@@ -0,0 +1,143 @@
+import json
+import os
+import re
+
+import pytest
+
+from scrape import metrics
+from scrape.metrics import Metrics, TextfileExporter, timed
+
+SAMPLE = re.compile(r'^(?P<name>[a-z_]+)(?:\{(?P<labels>.*)\})? (?P<value>\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse(text: str) -> tuple[dict[str, str], dict[tuple, float]]:
+    """Parses the exposition format into the type of each metric and the value of each sample."""
+    types, samples = {}, {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _hash, _type, name, kind = line.split(" ")
+            types[name] = kind
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        labels = tuple(LABEL.findall(match["labels"] or ""))
+        samples[(match["name"], labels)] = float(match["value"])
+    return types, samples
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = Metrics(enabled=True)
+    monkeypatch.setattr(metrics, "_metrics", registry)
+    return registry
+
+
+def test_disabled_registry_records_nothing():
+    registry = Metrics()
+    registry.inc("requests_total", host="a")
+    registry.observe("fetch_seconds", 0.1)
+    with registry.timer("fetch_seconds"):
+        pass
+
+    assert registry.summary() == {"counters": [], "histograms": []}
+
+
+def test_counters_timers_and_timed_are_summarised(registry):
+    @timed("lookup_seconds", strategy="slug")
+    def lookup(value):
+        return value * 2
+
+    registry.inc("requests_total", host="a")
+    registry.inc("requests_total", 2, host="a")
+    registry.inc("requests_total", host="b")
+    with registry.timer("render_seconds"):
+        pass
+    assert lookup(2) == 4
+
+    summary = registry.summary()
+    assert summary["counters"] == [
+        {"name": "requests_total", "labels": {"host": "a"}, "value": 3},
+        {"name": "requests_total", "labels": {"host": "b"}, "value": 1},
+    ]
+    assert [(h["name"], h["labels"], h["count"]) for h in summary["histograms"]] == [
+        ("lookup_seconds", {"strategy": "slug"}, 1),
+        ("render_seconds", {}, 1),
+    ]
+
+
+def test_quantiles_are_bucket_bounds(registry):
+    for seconds in (0.003, 0.02, 0.02, 0.7):
+        registry.observe("fetch_seconds", seconds)
+
+    (histogram,) = registry.summary()["histograms"]
+    assert (histogram["p50_seconds"], histogram["p95_seconds"]) == (0.025, 1.0)
+
+
+def test_write_json_writes_the_summary(registry, tmp_path):
+    registry.inc("letters_total")
+    path = tmp_path / "metrics.json"
+
+    registry.write_json(str(path))
+
+    assert json.loads(path.read_text()) == registry.summary()
+
+
+def test_textfile_is_valid_exposition_format(registry):
+    registry.inc("requests_total", host='api."builtin"\\com\nx')
+    registry.observe("fetch_seconds", 0.02, host="a")
+    registry.observe("fetch_seconds", 7.0, host="a")
+
+    types, samples = parse(registry.prometheus_text())
+
+    assert types == {
+        "jobscraper_requests_total": "counter",
+        "jobscraper_fetch_seconds": "histogram",
+    }
+    # quotes, backslashes and newlines in a label value are escaped
+    assert samples[
+        ("jobscraper_requests_total", (("host", 'api.\\"builtin\\"\\\\com\\nx'),))
+    ] == 1
+    buckets = {
+        dict(labels)["le"]: value
+        for (name, labels), value in samples.items()
+        if name == "jobscraper_fetch_seconds_bucket"
+    }
+    assert len(buckets) == len(metrics.BUCKETS) + 1
+    # buckets are cumulative, and +Inf holds every observation
+    assert (buckets["0.01"], buckets["0.025"], buckets["5.0"], buckets["10.0"]) == (0, 1, 1, 2)
+    assert buckets["+Inf"] == samples[("jobscraper_fetch_seconds_count", (("host", "a"),))] == 2
+    assert samples[("jobscraper_fetch_seconds_sum", (("host", "a"),))] == pytest.approx(7.02)
+
+
+def test_textfile_is_replaced_in_one_step(registry, tmp_path, monkeypatch):
+    path = tmp_path / "jobscraper.prom"
+    registry.inc("letters_total")
+    registry.write_textfile(str(path))
+    registry.inc("letters_total")
+
+    replaced = []
+    real_replace = os.replace
+
+    def replace(source, destination):
+        # the new text is complete before it takes the old file's place
+        replaced.append(open(source, encoding="utf-8").read())
+        assert parse(path.read_text())[1][("jobscraper_letters_total", ())] == 1
+        real_replace(source, destination)
+
+    monkeypatch.setattr(metrics.os, "replace", replace)
+    registry.write_textfile(str(path))
+
+    assert replaced == [path.read_text()]
+    assert parse(path.read_text())[1][("jobscraper_letters_total", ())] == 2
+    assert os.listdir(tmp_path) == ["jobscraper.prom"]
+
+
+def test_exporter_writes_the_final_values_on_stop(registry, tmp_path):
+    path = tmp_path / "jobscraper.prom"
+    exporter = TextfileExporter(registry, str(path), interval=60).start()
+    registry.inc("letters_total", 4)
+
+    exporter.stop()
+
+    assert parse(path.read_text())[1][("jobscraper_letters_total", ())] == 4
@@ -0,0 +1,64 @@
+import pytest
+
+from scrape.name_extractor import NameExtractor
+
+FIRST_NAMES = {"Ann", "Maria", "Jonathan", "Lee"}
+WEBTEXT = {"the", "and", "team", "our", "meet", "is"}
+PAGE = (
+    "<html><head><title>Meet the team </title></head><body> "
+    "<h1>Our <b>team</b> </h1><p>Ann Smith and Maria Lopez </p> "
+    "<div>Jonathan <span>Q.</span> Hartley &amp; co is our lead </div> "
+    "<p>Lee Chan</p></body></html>"
+)
+
+
+def soup_candidates(html: str) -> list[tuple[str, str]]:
+    """The candidates fetch_names_from_page_sources works from, via BeautifulSoup."""
+    from bs4 import BeautifulSoup
+
+    body = [
+        word
+        for word in BeautifulSoup(html, "html.parser").text.split(" ")
+        if word.lower() not in WEBTEXT
+    ]
+    return [
+        (word, body[index + 1])
+        for index, word in enumerate(body[:-1])
+        if word.title() in FIRST_NAMES and len(word)
+    ]
+
+
+def extract(html: str, size: int, max_candidates: int = 20) -> NameExtractor:
+    extractor = NameExtractor(FIRST_NAMES, WEBTEXT, max_candidates=max_candidates)
+    for start in range(0, len(html), size):
+        extractor.feed(html[start : start + size])
+    extractor.close()
+    return extractor
+
+
+@pytest.mark.parametrize("size", [1, 5, 17, 10000])
+def test_candidates_match_the_soup_path(size):
+    pytest.importorskip("bs4")
+
+    extractor = extract(PAGE, size)
+
+    assert extractor.candidates == soup_candidates(PAGE)
+    assert extractor.best_candidate() == ("Jonathan", "Q.")
+
+
+def test_scripts_and_styles_are_skipped():
+    html = "<script>var Maria = 1;</script><style>.Ann {}</style><p>Lee Chan</p>"
+
+    assert extract(html, 4).candidates == [("Lee", "Chan")]
+
+
+def test_stops_after_max_candidates():
+    extractor = extract(PAGE, 3, max_candidates=2)
+
+    assert extractor.done
+    assert [first for first, _next in extractor.candidates] == ["Ann", "Maria"]
+
+
+def test_no_names_raises():
+    with pytest.raises(ValueError):
+        extract("<p>nobody here</p>", 8).best_candidate()
@@ -0,0 +1,136 @@
+from types import SimpleNamespace
+
+import pytest
+from factories import company
+
+from scrape import namefetcher
+from scrape.brand_matcher import BrandMatcher
+from scrape.namefetcher import DEFAULT_NAME, NameFetcher
+from scrape.prefix_index import PrefixIndex
+
+FIRST_NAMES = ["Ada", "Grace", "Alan"]
+
+
+@pytest.fixture
+def fetcher(monkeypatch):
+    lexicon = SimpleNamespace(
+        brand_names={"Acme", "acme"},
+        first_names=set(FIRST_NAMES),
+        surnames={"LOVELACE", "HOPPER"},
+        webtext={"the", "team"},
+        first_name_index=PrefixIndex(FIRST_NAMES),
+        brand_matcher=BrandMatcher(["acme"]),
+    )
+    monkeypatch.setattr(namefetcher, "load_lexicon", lambda config: lexicon)
+    config = SimpleNamespace(
+        site_queries=["linkedin.com", "https://wiza.co/d/", "https://twitter.com/", "facebook.com/"],
+        search_query="",
+        resolution_threshold=0.9,
+        resolution_min_score=0.5,
+    )
+    return NameFetcher(company(company_name="Acme", alias="acme"), config)
+
+
+def resolve(fetcher, monkeypatch, links: list[str], pages: dict[str, tuple]) -> tuple:
+    tried = []
+
+    def fetch_names_from_page(link):
+        tried.append(link)
+        return pages.get(link, DEFAULT_NAME)
+
+    monkeypatch.setattr(fetcher, "generate_urls_from_search_query", lambda: links)
+    monkeypatch.setattr(fetcher, "fetch_names_from_page", fetch_names_from_page)
+    card = fetcher.parse_provided_search_queries()
+    return (card.greeting, card.fname, card.surname), tried
+
+
+def test_links_are_tried_cheapest_strategy_first(fetcher):
+    links = [
+        "https://acme.com/team",
+        "https://adalovelace.dev",
+        "https://www.linkedin.com/in/grace-hopper",
+    ]
+
+    assert fetcher.prioritise_links(links) == [
+        ("linkedin_slug", "https://www.linkedin.com/in/grace-hopper"),
+        ("username_split", "https://adalovelace.dev"),
+        ("page_scrape", "https://acme.com/team"),
+        ("page_scrape", "https://adalovelace.dev"),
+    ]
+
+
+def test_a_good_enough_slug_ends_the_search(fetcher, monkeypatch):
+    links = ["https://acme.com/team", "https://www.linkedin.com/in/ada-lovelace"]
+
+    name, tried = resolve(fetcher, monkeypatch, links, {})
+
+    assert name == ("Dear", "Ada", "Lovelace")
+    assert tried == []
+
+
+def test_pages_are_scraped_when_usernames_find_nothing_good_enough(fetcher, monkeypatch):
+    name, tried = resolve(
+        fetcher,
+        monkeypatch,
+        ["https://acme-corp.com/about"],
+        {"https://acme-corp.com/about": ("Dear", "Grace", "Hopper")},
+    )
+
+    assert name == ("Dear", "Grace", "Hopper")
+    assert tried == ["https://acme-corp.com/about"]
+
+
+def test_poorly_scored_names_keep_the_generic_greeting(fetcher, monkeypatch):
+    name, tried = resolve(fetcher, monkeypatch, ["https://acme-corp.com/about"], {})
+
+    # "acme-corp" only splits into a name no list knows of
+    assert name == DEFAULT_NAME
+    assert tried == ["https://acme-corp.com/about"]
+
+
+@pytest.mark.parametrize(
+    "link", ["https://acme.dev.internal/team", "http://10.0.0.1/about", "http://localhost:8000/"]
+)
+def test_links_without_a_known_domain_are_skipped(fetcher, monkeypatch, link):
+    assert fetcher.try_strategy("username_split", link) is None
+
+    name, tried = resolve(fetcher, monkeypatch, [link], {})
+
+    assert name == DEFAULT_NAME
+    assert tried == [link]
+    assert namefetcher.fetch_username_str_from_link(link) == ""
+
+
+@pytest.mark.parametrize(
+    "link",
+    [
+        "https://www.linkedin.com/in/ada-lovelace",
+        "https://www.linkedin.com/in/ada-lovelace/",
+        "https://www.linkedin.com/in/ada-lovelace?trk=people",
+    ],
+)
+def test_linkedin_slug_is_read_whole(link):
+    assert namefetcher.fetch_username_str_from_link(link) == "ada-lovelace"
+
+
+def test_strategies_are_timed_under_the_strategy_run(fetcher, monkeypatch):
+    metrics = namefetcher.get_metrics()
+    monkeypatch.setattr(metrics, "enabled", True)
+    monkeypatch.setattr(metrics, "histograms", {})
+
+    # a dashless slug is split like a username, but it is still the slug strategy
+    fetcher.try_strategy("linkedin_slug", "https://www.linkedin.com/in/adalovelace")
+
+    assert [labels for name, labels in metrics.histograms if name == "name_strategy_seconds"] == [
+        (("strategy", "linkedin_slug"),)
+    ]
+
+
+def test_only_brand_free_links_are_split_as_usernames(fetcher):
+    # unlike the baseline, which scraped every link that wasn't LinkedIn or reserved,
+    # a link without a brand in it is split as a username before its page is scraped
+    assert fetcher.prioritise_links(["https://gracehopper.io", "https://blog.acme.io/team"]) == [
+        ("username_split", "https://gracehopper.io"),
+        ("page_scrape", "https://gracehopper.io"),
+        ("page_scrape", "https://blog.acme.io/team"),
+    ]
@@ -0,0 +1,168 @@
+import multiprocessing
+import os
+from threading import Event
+from types import SimpleNamespace
+
+import pytest
+
+from scrape import output_sink
+from scrape.output_sink import OutputSink, atomic_write_bytes
+
+
+def files(root) -> list[str]:
+    return sorted(
+        os.path.relpath(os.path.join(directory, name), root)
+        for directory, _dirs, names in os.walk(root)
+        for name in names
+    )
+
+
+@pytest.mark.parametrize("write_behind", [False, True])
+def test_files_are_written_under_the_root_without_temporary_files(tmp_path, write_behind):
+    sink = OutputSink(str(tmp_path), write_behind=write_behind)
+    sink.write_text(os.path.join("Acme", "letter.txt"), "Dear Ada")
+    sink.write_bytes("batch.pdf", b"%PDF")
+    sink.close()
+
+    assert files(tmp_path) == ["Acme/letter.txt", "batch.pdf"]
+    assert (tmp_path / "Acme" / "letter.txt").read_text() == "Dear Ada"
+
+
+def test_failed_write_leaves_the_old_file_and_no_temporary_one(tmp_path, monkeypatch):
+    target = tmp_path / "letter.txt"
+    target.write_bytes(b"old")
+
+    def broken_replace(source, destination):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(output_sink.os, "replace", broken_replace)
+    with pytest.raises(OSError):
+        atomic_write_bytes(str(target), b"new")
+
+    assert files(tmp_path) == ["letter.txt"]
+    assert target.read_bytes() == b"old"
+
+
+def test_write_behind_keeps_the_order_files_were_handed_over(tmp_path, monkeypatch):
+    written = []
+    release = Event()
+
+    def record(path, data):
+        release.wait(5)
+        written.append((os.path.basename(path), data))
+
+    monkeypatch.setattr(output_sink, "atomic_write_bytes", record)
+    sink = OutputSink(str(tmp_path), write_behind=True, queue_size=8)
+    for number in range(5):
+        sink.write_bytes("letter.txt", str(number).encode())
+    # nothing has been written yet, the caller didn't wait for the disk
+    assert written == []
+
+    release.set()
+    sink.flush()
+
+    assert written == [("letter.txt", str(number).encode()) for number in range(5)]
+    sink.close()
+
+
+def test_background_error_is_raised_by_the_next_call(tmp_path, monkeypatch):
+    def broken(path, data):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(output_sink, "atomic_write_bytes", broken)
+    sink = OutputSink(str(tmp_path), write_behind=True)
+    sink.write_bytes("a.txt", b"a")
+
+    with pytest.raises(OSError, match="disk full"):
+        sink.flush()
+    # the error is raised once
+    sink.flush()
+    sink.close()
+
+
+def test_each_file_is_reported_once_on_disk_and_an_error_doesnt_stop_the_rest(
+    tmp_path, monkeypatch
+):
+    real_write = output_sink.atomic_write_bytes
+    reported = []
+
+    def write(path, data):
+        if os.path.basename(path) == "b.txt":
+            raise OSError("disk full")
+        real_write(path, data)
+
+    def report(name):
+        def on_done(error_found):
+            # the file is on disk by the time it is reported written
+            on_disk = (tmp_path / name).exists()
+            reported.append((name, on_disk, None if error_found is None else str(error_found)))
+
+        return on_done
+
+    monkeypatch.setattr(output_sink, "atomic_write_bytes", write)
+    sink = OutputSink(str(tmp_path), write_behind=True)
+    for name in ("a.txt", "b.txt", "c.txt"):
+        sink.write_bytes(name, name.encode(), report(name))
+    sink.write_files([("d.txt", b"d"), ("b.txt", b"b"), ("e.txt", b"e")], report("e.txt"))
+    sink.flush()
+    sink.close()
+
+    assert reported == [
+        ("a.txt", True, None),
+        ("b.txt", False, "disk full"),
+        ("c.txt", True, None),
+        ("e.txt", True, "disk full"),
+    ]
+    assert files(tmp_path) == ["a.txt", "c.txt", "d.txt", "e.txt"]
+
+
+def test_files_get_the_mode_the_umask_allows(tmp_path, monkeypatch):
+    umask = os.umask(0o022)
+    os.umask(umask)
+
+    def set_umask(mask):
+        raise AssertionError("the sink set the umask")
+
+    monkeypatch.setattr(output_sink, "_file_mode", None)
+    monkeypatch.setattr(os, "umask", set_umask)
+    sink = OutputSink(str(tmp_path))
+    sink.write_bytes("letter.txt", b"Dear Ada")
+
+    assert os.stat(tmp_path / "letter.txt").st_mode & 0o777 == 0o666 & ~umask
+    # the probe leaves nothing behind
+    assert files(tmp_path) == ["letter.txt"]
+
+
+def test_get_sink_reopens_for_a_new_root(tmp_path):
+    config = SimpleNamespace(write_behind=False, write_behind_queue=4)
+    try:
+        first = output_sink.get_sink(config, str(tmp_path / "a"))
+        assert output_sink.get_sink(config, str(tmp_path / "a")) is first
+        assert output_sink.get_sink(config, str(tmp_path / "b")) is not first
+    finally:
+        output_sink.close_sink()
+    assert output_sink._sink is None
+
+
+def report_sink(connection) -> None:
+    connection.send(output_sink._sink is None)
+    connection.close()
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+def test_forked_process_starts_without_the_parents_sink(tmp_path):
+    config = SimpleNamespace(write_behind=True, write_behind_queue=4)
+    output_sink.get_sink(config, str(tmp_path))
+    try:
+        context = multiprocessing.get_context("fork")
+        parent, child = context.Pipe()
+        process = context.Process(target=report_sink, args=(child,))
+        process.start()
+        forgotten = parent.recv()
+        process.join()
+    finally:
+        output_sink.close_sink()
+
+    assert forgotten
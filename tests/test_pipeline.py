@@ -0,0 +1,115 @@
+from threading import Event
+from types import SimpleNamespace
+
+import pytest
+
+from scrape import pipeline
+from scrape.builtinscrape import ListingEntry
+from scrape.pipeline import Pipeline
+from scrape.run_memo import RunMemo
+
+
+def test_items_go_through_every_stage():
+    done = []
+    pipeline = (
+        Pipeline(queue_size=2)
+        .add_stage("double", lambda item: [item, item], workers=3)
+        .add_stage("square", lambda item: [item * item], workers=2)
+        .add_stage("collect", done.append)
+    )
+
+    pipeline.run(range(50))
+
+    assert sorted(done) == sorted([number * number for number in range(50)] * 2)
+
+
+def test_first_error_aborts_every_stage_and_is_raised():
+    blocked = Event()
+    seen = []
+
+    def fail(item):
+        if item == 3:
+            raise ValueError("bad item")
+        return [item]
+
+    def slow(item):
+        seen.append(item)
+        blocked.wait(0.01)
+        return ()
+
+    pipeline = Pipeline(queue_size=1).add_stage("fail", fail, 2).add_stage("slow", slow)
+
+    with pytest.raises(ValueError, match="bad item"):
+        pipeline.run(range(10000))
+
+    assert pipeline.aborted.is_set()
+    assert len(seen) < 10000
+
+
+def test_error_in_the_last_stage_stops_the_feed():
+    fed = []
+
+    def items():
+        for number in range(10000):
+            fed.append(number)
+            yield number
+
+    def explode(item):
+        raise RuntimeError("render failed")
+
+    with pytest.raises(RuntimeError):
+        Pipeline(queue_size=1).add_stage("render", explode).run(items())
+
+    assert len(fed) < 10000
+
+
+def test_error_reading_the_items_stops_every_stage():
+    def items():
+        yield from range(3)
+        raise ConnectionError("listing page reset")
+
+    pipeline = Pipeline(queue_size=1).add_stage("lookup", lambda item: [item], 2)
+
+    with pytest.raises(ConnectionError, match="listing page reset"):
+        pipeline.run(items())
+
+    assert pipeline.aborted.is_set()
+
+
+def test_streamed_listing_fetches_no_page_past_the_first_without_jobs(monkeypatch):
+    requested = []
+
+    def stream(base_url, querystring, region_id, descriptions=True):
+        page = querystring["page"]
+        requested.append(page)
+        if page < 2:
+            yield ListingEntry(0, "acme", "Acme", "Engineer", "", job_id=f"{page}-a")
+
+    class Journal:
+        def mark_listing(self, job_id, page):
+            pass
+
+        def settled(self, job_id):
+            return False
+
+        def company(self, job_id):
+            return None
+
+    monkeypatch.setattr(pipeline, "stream_listing_entries", stream)
+    monkeypatch.setattr(pipeline, "shared_company_lookup", lambda alias, region_id: None)
+    monkeypatch.setattr(pipeline, "get_dataset", lambda: None)
+    monkeypatch.setattr(pipeline, "get_run_memo", RunMemo)
+    config = SimpleNamespace(
+        pipeline_workers={"listing": 2},
+        pipeline_queue_size=8,
+        streaming_listings=True,
+        total_pages=20,
+        searches=[],
+        querystring={},
+        region_id="5",
+        url_builtin="https://api.example/jobs",
+    )
+
+    pipeline.run_pipeline(config, None, Journal(), render_letters=False)
+
+    assert sorted(requested) == [0, 1, 2]
@@ -0,0 +1,35 @@
+import random
+
+from scrape.prefix_index import PrefixIndex
+
+
+def startswith_check(names, username):
+    """The check PrefixIndex replaced: every first name tested against the username."""
+    return [
+        name.strip()
+        for name in names
+        if name.lower() in username and username.find(name.lower()) == 0
+    ]
+
+
+def test_matches_the_startswith_check():
+    rng = random.Random(5)
+    names = list({"".join(rng.choices("abc", k=rng.randint(1, 4))).title() for _ in range(40)})
+    index = PrefixIndex(names)
+    for _ in range(500):
+        username = "".join(rng.choices("abc", k=rng.randint(0, 8)))
+        assert sorted(index.prefixes(username)) == sorted(startswith_check(names, username))
+
+
+def test_longest_first():
+    index = PrefixIndex(["Jo", "John", "Johnathan", "Jon"])
+
+    assert index.prefixes("johnathansmith") == ["Johnathan", "John", "Jo"]
+
+
+def test_words_sharing_a_lowercase_form_are_all_returned():
+    assert sorted(PrefixIndex(["Lee", "LEE", "Le"]).prefixes("leeroy")) == ["LEE", "Le", "Lee"]
+
+
+def test_blank_words_are_skipped():
+    assert PrefixIndex(["", "  ", "Ann\n"]).prefixes("annabel") == ["Ann"]
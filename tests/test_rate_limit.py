@@ -0,0 +1,207 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from requests import ConnectionError
+
+from scrape import rate_limit
+from scrape.http_client import HttpClient
+from scrape.rate_limit import (CircuitBreaker, CircuitOpenError, RateLimiter,
+                               TokenBucket, retry_after_seconds)
+
+
+class Clock:
+    """Stands in for monotonic and sleep, so that waiting takes no time."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limit, "sleep", clock.sleep)
+    return clock
+
+
+def test_retry_after_in_seconds_or_as_a_date():
+    in_a_minute = datetime.now(timezone.utc) + timedelta(seconds=60)
+
+    assert retry_after_seconds("120") == 120.0
+    assert 55 <= retry_after_seconds(format_datetime(in_a_minute, usegmt=True)) <= 60
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert retry_after_seconds("soon") is None
+    assert retry_after_seconds("") is None
+    assert retry_after_seconds(None) is None
+
+
+def test_retry_after_may_be_fractional_but_never_negative():
+    assert retry_after_seconds("1.5") == 1.5
+    assert retry_after_seconds(" 0.25 ") == 0.25
+    assert retry_after_seconds("-3") == 0.0
+    assert retry_after_seconds("-0.5") == 0.0
+    assert retry_after_seconds("nan") is None
+    assert retry_after_seconds("inf") is None
+
+
+def test_backoff_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: high)
+    limiter = RateLimiter(backoff_base=1.0, backoff_max=5.0)
+
+    assert [limiter.backoff(attempt) for attempt in range(5)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_hosts_take_the_limit_of_their_longest_domain():
+    limiter = RateLimiter(
+        default_rate=1.0,
+        limits={"example.com": {"rate": 2.0}, "api.example.com": {"rate": 5.0, "burst": 3}},
+    )
+
+    assert limiter.for_host("www.example.com").bucket.rate == 2.0
+    assert limiter.for_host("v1.api.example.com").bucket.rate == 5.0
+    assert limiter.for_host("v1.api.example.com").bucket.burst == 3
+    assert limiter.for_host("notexample.com").bucket.rate == 1.0
+    assert limiter.for_host("example.com") is limiter.for_host("example.com")
+
+
+def test_bucket_spaces_requests_after_its_burst(clock):
+    bucket = TokenBucket(rate=2.0, burst=2)
+
+    waits = [bucket.acquire() for _ in range(4)]
+
+    assert waits == [0.0, 0.0, 0.5, 0.5]
+
+
+def test_paused_bucket_holds_requests_back(clock):
+    bucket = TokenBucket(rate=0.0)
+    bucket.pause(30)
+    bucket.pause(10)
+
+    assert bucket.acquire() == 30
+    assert bucket.acquire() == 0.0
+
+
+def test_breaker_opens_and_lets_one_trial_through_after_its_cooldown(clock):
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+
+    assert not breaker.failure()
+    assert breaker.failure()
+    assert not breaker.allow()
+
+    clock.now += 60
+    assert breaker.allow()
+    # only the one trial, until it is decided
+    assert not breaker.allow()
+
+    breaker.success()
+    assert breaker.allow()
+    assert breaker.failures == 0
+
+
+def test_failed_trial_reopens_the_circuit(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.failure()
+    clock.now += 60
+    assert breaker.allow()
+
+    assert breaker.failure()
+    assert not breaker.allow()
+    clock.now += 59
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_released_trial_makes_way_for_the_next(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.failure()
+    clock.now += 60
+    assert breaker.allow()
+
+    breaker.release()
+
+    assert breaker.allow()
+
+
+class Response:
+    def __init__(self, status_code: int, headers: dict | None = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = b""
+
+    def close(self):
+        pass
+
+
+class Session:
+    def __init__(self, outcomes: list):
+        self.outcomes = outcomes
+        self.requests = 0
+
+    def get(self, url, **kwargs):
+        self.requests += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def client_with(outcomes: list, **limits) -> tuple[HttpClient, Session]:
+    client = HttpClient(rate_limiter=RateLimiter(**limits))
+    session = Session(outcomes)
+    client.session_for = lambda url: session
+    return client, session
+
+
+def test_throttled_request_waits_for_retry_after(clock):
+    client, session = client_with([Response(429, {"Retry-After": "7"}), Response(200)])
+
+    response = client.get("https://example.com/jobs")
+
+    assert response.status_code == 200
+    assert session.requests == 2
+    assert clock.slept == [7.0]
+
+
+def test_retry_after_is_capped_at_backoff_max(clock):
+    client, _session = client_with(
+        [Response(503, {"Retry-After": "3600"}), Response(200)], backoff_max=30.0
+    )
+
+    client.get("https://example.com/jobs")
+
+    assert clock.slept == [30.0]
+
+
+def test_failing_host_is_retried_then_given_up_on(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: high)
+    client, session = client_with(
+        [ConnectionError("reset")] * 3, max_retries=2, backoff_base=1.0
+    )
+
+    with pytest.raises(ConnectionError):
+        client.get("https://example.com/jobs")
+
+    assert session.requests == 3
+    assert clock.slept == [1.0, 2.0]
+
+
+def test_open_circuit_refuses_requests(clock):
+    client, session = client_with(
+        [Response(500), Response(500)], max_retries=1, breaker_threshold=2
+    )
+
+    assert client.get("https://example.com/jobs").status_code == 500
+    with pytest.raises(CircuitOpenError):
+        client.get("https://example.com/other")
+
+    assert session.requests == 2
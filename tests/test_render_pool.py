@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from scrape import coverletterwriter
+
+pytestmark = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+
+
+def record(kind: str) -> None:
+    with open(os.environ["RENDER_POOL_LOG"], "a") as file:
+        file.write(f"{kind} {os.getpid()}\n")
+
+
+def start(config, persona):
+    record("start")
+
+
+def write(pair):
+    record("write")
+
+
+def write_or_fail(pair):
+    company, _contact = pair
+    return ValueError(company) if company.endswith("bad") else None
+
+
+def test_pages_share_one_warm_pool(tmp_path, monkeypatch):
+    log = tmp_path / "log"
+    monkeypatch.setenv("RENDER_POOL_LOG", str(log))
+    # the pool forks, so its workers see these in place of the real renderer
+    monkeypatch.setattr(coverletterwriter, "_start_render_worker", start)
+    monkeypatch.setattr(coverletterwriter, "_write_in_worker", write)
+    config = SimpleNamespace(text_only=False, pdf_output="per_letter")
+    written = []
+    try:
+        for page in range(3):
+            pairs = [(f"company{page}-{number}", None) for number in range(4)]
+            coverletterwriter.write_letters(
+                pairs, config, None, processes=2, on_written=written.append
+            )
+        pool = coverletterwriter._render_pool
+        assert pool is not None
+    finally:
+        coverletterwriter.close_batch()
+
+    lines = log.read_text().split()
+    starts = [pid for kind, pid in zip(lines[::2], lines[1::2]) if kind == "start"]
+    writers = {pid for kind, pid in zip(lines[::2], lines[1::2]) if kind == "write"}
+    assert len(written) == 12
+    assert len(starts) <= 2
+    assert writers <= set(starts)
+    assert coverletterwriter._render_pool is None
+
+
+def test_failed_letter_is_reported_without_stopping_the_rest(monkeypatch):
+    monkeypatch.setattr(coverletterwriter, "_start_render_worker", lambda config, persona: None)
+    monkeypatch.setattr(coverletterwriter, "_write_in_worker", write_or_fail)
+    config = SimpleNamespace(text_only=False, pdf_output="per_letter")
+    pairs = [("a", None), ("b-bad", None), ("c", None)]
+    written, failed = [], []
+    try:
+        coverletterwriter.write_letters(
+            pairs,
+            config,
+            None,
+            processes=2,
+            on_written=written.append,
+            on_failed=lambda company, error_found: failed.append(str(error_found)),
+        )
+        with pytest.raises(ValueError, match="b-bad"):
+            coverletterwriter.write_letters(pairs, config, None, processes=2)
+    finally:
+        coverletterwriter.close_batch()
+
+    assert written == ["a", "c"]
+    assert failed == ["b-bad"]
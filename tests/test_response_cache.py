@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+import pytest
+
+from scrape import response_cache, web_scraper
+from scrape.response_cache import ResponseCache, cache_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=100, default_ttl=60)
+    yield cache
+    cache.close()
+
+
+def test_cache_key_sorts_the_query():
+    assert cache_key("https://a.test/x", {"b": 2, "a": 1}) == cache_key(
+        "https://a.test/x", "a=1&b=2"
+    )
+    assert cache_key("https://a.test/x") == "https://a.test/x"
+
+
+def test_ttl_by_longest_endpoint_prefix(tmp_path):
+    cache = ResponseCache(
+        str(tmp_path / "cache.sqlite"),
+        default_ttl=1,
+        ttls={"api.test": 10, "api.test/companies": 100},
+    )
+    assert cache.ttl_for("https://api.test/companies/alias/acme") == 100
+    assert cache.ttl_for("https://api.test/jobs") == 10
+    assert cache.ttl_for("https://other.test/") == 1
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(response_cache, "time", lambda: clock[0])
+    for key in "abc":
+        cache.put(key, "x" * 30)
+        clock[0] += 1000
+    cache.get("a")  # a is used again, so b is now the oldest
+    clock[0] += 1000
+
+    cache.put("d", "x" * 30)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert cache.total_bytes == 90
+
+
+def test_total_bytes_follows_replacements_and_survives_reopening(cache):
+    cache.put("a", "x" * 40)
+    cache.put("a", "x" * 10)
+    cache.put("b", "x" * 20)
+    assert cache.total_bytes == 30
+
+    reopened = ResponseCache(cache.path, max_bytes=100)
+    assert reopened.total_bytes == 30
+    reopened.close()
+
+
+def test_recent_hits_do_not_write(cache):
+    cache.put("a", "body")
+    changes = cache.connection.total_changes
+
+    for _ in range(5):
+        assert cache.get("a").text == "body"
+
+    assert cache.connection.total_changes == changes
+    assert cache.stats()["hits"] == 5
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = text
+        self.headers = headers or {}
+
+
+def test_stale_entry_is_revalidated_with_its_etag(cache, monkeypatch):
+    requests = []
+    responses = [FakeResponse(200, "fresh body", {"ETag": '"v1"'}), FakeResponse(304)]
+
+    def get(url, params=None, headers=None):
+        requests.append(headers)
+        return responses.pop(0)
+
+    monkeypatch.setattr(web_scraper, "get_cache", lambda: cache)
+    monkeypatch.setattr(web_scraper, "get_client", lambda: SimpleNamespace(get=get))
+
+    assert web_scraper.fetch_text("https://a.test/page") == "fresh body"
+    assert web_scraper.fetch_text("https://a.test/page") == "fresh body"
+    assert len(requests) == 1
+
+    cache.default_ttl = 0
+    assert web_scraper.fetch_text("https://a.test/page") == "fresh body"
+    assert requests[-1] == {"If-None-Match": '"v1"'}
+    assert cache.stats()["revalidated"] == 1
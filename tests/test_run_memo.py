@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+import pytest
+from factories import company
+
+from scrape import builtinscrape, namefetcher, run_memo
+from scrape.configs import listing_searches
+
+CONFIG = SimpleNamespace(
+    querystring={"search": "python", "per_page": 10},
+    region_id="5",
+    url_builtin="https://api.example/jobs",
+)
+
+
+@pytest.fixture(autouse=True)
+def memo():
+    yield run_memo.reset_run_memo()
+    run_memo.reset_run_memo()
+
+
+def test_searches_lay_their_settings_over_the_config():
+    config = SimpleNamespace(
+        **vars(CONFIG),
+        searches=[
+            {"name": "nyc"},
+            {"region_id": 8, "querystring": {"search": "rust"}, "url_builtin": "https://x/jobs"},
+        ],
+    )
+
+    nyc, second = listing_searches(config)
+
+    assert (nyc.name, nyc.region_id, nyc.url_builtin) == ("nyc", "5", "https://api.example/jobs")
+    assert nyc.querystring == {"search": "python", "per_page": 10}
+    assert (second.name, second.region_id, second.url_builtin) == ("search 2", "8", "https://x/jobs")
+    assert second.querystring == {"search": "rust", "per_page": 10}
+
+
+def test_without_searches_the_run_covers_the_config_alone():
+    (search,) = listing_searches(SimpleNamespace(**vars(CONFIG), searches=[]))
+
+    assert (search.name, search.region_id, search.querystring) == (
+        "default",
+        "5",
+        CONFIG.querystring,
+    )
+
+
+def test_company_lookups_are_shared_per_alias_and_region(monkeypatch):
+    looked_up = []
+
+    def lookup(alias, region_id):
+        looked_up.append((alias, region_id))
+        return {"city": region_id}
+
+    monkeypatch.setattr(builtinscrape, "company_lookup", lookup)
+
+    assert builtinscrape.shared_company_lookup("acme", "5") == {"city": "5"}
+    assert builtinscrape.shared_company_lookup("acme", "5") == {"city": "5"}
+    # another region's site has its own profile of the company
+    assert builtinscrape.shared_company_lookup("acme", "8") == {"city": "8"}
+    assert looked_up == [("acme", "5"), ("acme", "8")]
+
+
+def test_failed_company_lookup_is_tried_again(monkeypatch, memo):
+    results = iter([None, {"city": "NYC"}])
+    monkeypatch.setattr(builtinscrape, "company_lookup", lambda alias, region_id: next(results))
+
+    assert builtinscrape.shared_company_lookup("acme", "5") is None
+    assert builtinscrape.shared_company_lookup("acme", "5") == {"city": "NYC"}
+    assert builtinscrape.shared_company_lookup("acme", "5") == {"city": "NYC"}
+    assert memo.stats()["shared_lookups"] == 1
+
+
+def test_contacts_are_shared_across_searches(monkeypatch, memo):
+    resolved = []
+
+    class Fetcher:
+        def __init__(self, company, config):
+            self.company = company
+
+        def parse_provided_search_queries(self):
+            resolved.append(self.company.job_id)
+            return f"contact of {self.company.alias}"
+
+    monkeypatch.setattr(namefetcher, "NameFetcher", Fetcher)
+
+    # the same company listed by two searches, under two jobs
+    first = namefetcher.resolve_contact(company("1", alias="acme"), CONFIG)
+    second = namefetcher.resolve_contact(company("2", alias="acme"), CONFIG)
+
+    assert first == second == "contact of acme"
+    assert resolved == ["1"]
+    assert memo.stats()["shared_contacts"] == 1
+
+
+def test_memo_forgets_a_computation_that_raises():
+    memo = run_memo.Memo()
+
+    def broken():
+        raise ValueError("transient")
+
+    with pytest.raises(ValueError):
+        memo.get("key", broken)
+    assert memo.get("key", lambda: 1) == 1
+    assert len(memo) == 1
@@ -0,0 +1,141 @@
+import sqlite3
+from urllib.error import URLError
+
+import pytest
+
+from scrape import search_provider
+from scrape.fixtures import FixtureStore
+from scrape.response_cache import cache_key
+from scrape.run_memo import reset_run_memo
+from scrape.search_provider import (JsonApiSearchProvider, Searcher,
+                                    SearchMemo, SearchProvider)
+
+
+class CountingProvider(SearchProvider):
+    name = "counting"
+
+    def __init__(self, urls=None, error=None):
+        self.urls = urls or ["https://acme.com"]
+        self.error = error
+        self.queries: list[str] = []
+
+    def search(self, query: str) -> list[str]:
+        self.queries.append(query)
+        if self.error is not None:
+            raise self.error
+        return self.urls
+
+
+@pytest.fixture
+def memo(tmp_path):
+    memo = SearchMemo(str(tmp_path / "memo.sqlite"))
+    yield memo
+    memo.close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_run_memo():
+    reset_run_memo()
+
+
+def test_memo_answers_until_the_ttl_runs_out(memo, monkeypatch):
+    assert memo.get("Acme", "{query}", "counting") is None
+    memo.put("Acme", "{query}", "counting", ["https://acme.com"])
+    assert memo.get("Acme", "{query}", "counting") == ["https://acme.com"]
+    assert memo.get("Acme", "other template", "counting") is None
+
+    monkeypatch.setattr(search_provider, "time", lambda: 10**12)
+    assert memo.get("Acme", "{query}", "counting") is None
+    assert memo.stats() == {"hits": 1, "misses": 3, "entries": 1}
+
+
+def test_memo_keeps_each_providers_results_apart(memo):
+    google = CountingProvider(["https://acme.com"])
+    google.name = "google"
+    api = CountingProvider(["https://acme.io"])
+    api.name = "api"
+
+    assert Searcher(google, memo).urls("Acme", "careers") == ["https://acme.com"]
+    reset_run_memo()
+    # a run switched to another provider searches again, rather than reusing google's answer
+    assert Searcher(api, memo).urls("Acme", "careers") == ["https://acme.io"]
+    assert len(api.queries) == 1
+    assert memo.stats()["entries"] == 2
+
+
+def test_memo_drops_a_table_keyed_without_the_provider(tmp_path):
+    path = str(tmp_path / "memo.sqlite")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE searches (company TEXT, template TEXT, provider TEXT, urls TEXT,"
+        " fetched_at REAL, PRIMARY KEY (company, template))"
+    )
+    connection.execute("INSERT INTO searches VALUES ('Acme', 'careers', 'google', '[]', 0)")
+    connection.commit()
+    connection.close()
+
+    memo = SearchMemo(path)
+    memo.put("Acme", "careers", "api", ["https://acme.io"])
+    memo.put("Acme", "careers", "google", ["https://acme.com"])
+    assert memo.get("Acme", "careers", "api") == ["https://acme.io"]
+    assert memo.stats()["entries"] == 2
+    memo.close()
+
+
+def test_searcher_asks_the_provider_once_per_company(memo):
+    provider = CountingProvider()
+    searcher = Searcher(provider, memo)
+
+    assert searcher.urls("Acme", "careers") == ["https://acme.com"]
+    assert searcher.urls("Acme", "careers") == ["https://acme.com"]
+    assert len(provider.queries) == 1
+
+    # a later run, with a fresh run memo, answers from the SQLite memo
+    reset_run_memo()
+    assert Searcher(provider, memo).urls("Acme", "careers") == ["https://acme.com"]
+    assert len(provider.queries) == 1
+
+
+def test_failed_search_is_neither_memoized_nor_shared(memo):
+    provider = CountingProvider(error=URLError("quota"))
+    searcher = Searcher(provider, memo)
+
+    assert searcher.urls("Acme", "careers") == []
+    assert searcher.urls("Acme", "careers") == []
+    assert len(provider.queries) == 2
+    assert memo.stats()["entries"] == 0
+
+
+def test_api_key_stays_out_of_the_cache_and_fixture_keys(monkeypatch):
+    requests = []
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"items": [{"link": "https://acme.com"}, {"title": "no link"}]}
+
+    class Client:
+        def get(self, url, **kwargs):
+            requests.append((url, kwargs))
+            return Response()
+
+    monkeypatch.setattr(search_provider, "get_client", Client)
+    provider = JsonApiSearchProvider(
+        "https://search.example/v1", api_key="secret", params={"cx": "engine"}
+    )
+
+    assert provider.search("Acme") == ["https://acme.com"]
+    ((url, kwargs),) = requests
+    assert kwargs["headers"] == {"X-Goog-Api-Key": "secret"}
+    assert "secret" not in cache_key(url, kwargs["params"])
+
+
+def test_fixture_provider_answers_recorded_searches(tmp_path):
+    store = FixtureStore(str(tmp_path))
+    store.save_search("Acme careers", ["https://acme.com"])
+    provider = search_provider.FixtureSearchProvider(store)
+
+    assert provider.search("Acme careers") == ["https://acme.com"]
+    assert provider.search("Other careers") == []
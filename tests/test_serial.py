@@ -0,0 +1,120 @@
+from types import SimpleNamespace
+
+from requests import ConnectionError
+
+from scrape import serial
+from scrape.builtinscrape import ListingEntry
+from scrape.configs import ListingSearch
+
+SEARCH = ListingSearch("nyc", {"search": "python"}, "5", "https://api.example/jobs")
+
+
+def entry(job_id: str) -> ListingEntry:
+    return ListingEntry(0, "acme", "Acme", "Engineer", "", job_id=job_id)
+
+
+def test_streaming_listings_are_read_page_by_page(monkeypatch):
+    requested = []
+
+    def stream(base_url, querystring, region_id, descriptions=True):
+        page = querystring["page"]
+        requested.append(page)
+        if page == 1:
+            raise ConnectionError("reset")
+        return iter([entry(f"{page}-a"), entry(f"{page}-b")] if page < 3 else [])
+
+    def prefetch(*args, **kwargs):
+        raise AssertionError("streaming runs don't prefetch whole pages")
+
+    monkeypatch.setattr(serial, "stream_listing_entries", stream)
+    monkeypatch.setattr(serial, "prefetch_listings", prefetch)
+    config = SimpleNamespace(streaming_listings=True, total_pages=10, prefetch_pages=2)
+
+    pages = [
+        (page, [listed.job_id for listed in entries])
+        for page, entries in serial.listing_pages(SEARCH, config)
+    ]
+
+    assert pages == [(0, ["0-a", "0-b"]), (2, ["2-a", "2-b"])]
+    # the first page without jobs ends the search
+    assert requested == [0, 1, 2, 3]
+
+
+def test_listings_are_prefetched_unless_streaming(monkeypatch):
+    docs = {
+        "jobs": [{"id": 7, "title": "Engineer", "body": ""}],
+        "companies": [{"title": "Acme", "alias": "/company/acme"}],
+    }
+    monkeypatch.setattr(serial, "prefetch_listings", lambda *args, **kwargs: iter([(0, docs)]))
+    config = SimpleNamespace(streaming_listings=False, total_pages=10, prefetch_pages=2)
+
+    ((page, entries),) = list(serial.listing_pages(SEARCH, config))
+
+    assert page == 0
+    assert [(listed.alias, listed.job_id) for listed in entries] == [("acme", "7")]
+
+
+def test_a_streamed_page_that_breaks_off_keeps_what_was_read(monkeypatch):
+    def stream(base_url, querystring, region_id, descriptions=True):
+        page = querystring["page"]
+        if page == 1:
+            return iter([])
+        yield entry("0-a")
+        raise ConnectionError("reset")
+
+    monkeypatch.setattr(serial, "stream_listing_entries", stream)
+    config = SimpleNamespace(streaming_listings=True, total_pages=10, prefetch_pages=2)
+
+    pages = [
+        (page, [listed.job_id for listed in entries])
+        for page, entries in serial.listing_pages(SEARCH, config)
+    ]
+
+    assert pages == [(0, ["0-a"])]
+
+
+def test_companies_are_looked_up_as_the_page_is_read(monkeypatch):
+    events = []
+
+    def listed():
+        for job_id in ("a", "b", "c"):
+            events.append(f"listed {job_id}")
+            yield entry(job_id)
+
+    def lookup(alias, region_id):
+        events.append("looked up")
+        return {}
+
+    class Journal:
+        def company(self, job_id):
+            return None
+
+        def mark_lookup(self, company):
+            events.append(f"found {company.job_id}")
+
+    monkeypatch.setattr(serial, "shared_company_lookup", lookup)
+    monkeypatch.setattr(
+        serial.ListingEntry, "to_company_result", lambda self, company_dict: self
+    )
+    config = SimpleNamespace(lookup_concurrency=1)
+
+    for company in serial.lookup_entries(listed(), Journal(), config):
+        events.append(f"used {company.job_id}")
+
+    assert events[:4] == ["listed a", "looked up", "found a", "used a"]
+    assert events.count("looked up") == 3
+
+
+def test_map_ahead_keeps_order_and_reads_only_as_far_as_it_runs():
+    taken = []
+
+    def items():
+        for number in range(10):
+            taken.append(number)
+            yield number
+
+    results = serial.map_ahead(lambda number: number * 2, items(), concurrency=3)
+
+    assert next(results) == 0
+    assert taken == [0, 1, 2]
+    assert list(results) == [number * 2 for number in range(1, 10)]
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+
+from scrape import web_scraper
+from scrape.response_cache import ResponseCache
+
+BODY = b"<p>" + b"Ann Smith " * 50 + b"</p>"
+
+
+class FakeResponse:
+    status_code = 200
+    ok = True
+    encoding = "utf-8"
+
+    def __init__(self, body: bytes, content_type: str = "text/html"):
+        self.body = body
+        self.headers = {"Content-Type": content_type, "ETag": '"v1"'}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start : start + chunk_size]
+
+
+@pytest.fixture
+def fetches(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    urls = []
+
+    def get(url, headers=None, stream=False):
+        urls.append(url)
+        return FakeResponse(BODY, "application/pdf" if url.endswith(".pdf") else "text/html")
+
+    monkeypatch.setattr(web_scraper, "get_cache", lambda: cache)
+    monkeypatch.setattr(web_scraper, "get_client", lambda: SimpleNamespace(get=get))
+    yield urls
+    cache.close()
+
+
+def test_complete_pages_are_cached(fetches):
+    first = "".join(web_scraper.stream_page("https://a.test/team", chunk_size=7))
+    second = "".join(web_scraper.stream_page("https://a.test/team", chunk_size=7))
+
+    assert first == second == BODY.decode()
+    assert fetches == ["https://a.test/team"]
+
+
+def test_truncated_pages_are_not_cached(fetches):
+    for _ in range(2):
+        list(web_scraper.stream_page("https://a.test/team", max_bytes=100, chunk_size=7))
+
+    assert len(fetches) == 2
+
+
+def test_pages_left_early_are_not_cached(fetches):
+    for _ in range(2):
+        chunks = web_scraper.stream_page("https://a.test/team", chunk_size=7)
+        next(chunks)
+        chunks.close()
+
+    assert len(fetches) == 2
+
+
+def test_non_html_is_skipped(fetches):
+    assert list(web_scraper.stream_page("https://a.test/report.pdf")) == []
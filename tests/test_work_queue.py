@@ -0,0 +1,117 @@
+from time import sleep
+
+import pytest
+from factories import card, company
+
+from scrape.work_queue import WorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=60, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def test_enqueue_skips_jobs_already_queued(queue):
+    assert queue.enqueue([company("1"), company("2")]) == 2
+    assert queue.enqueue([company("2"), company("3")]) == 1
+    assert queue.counts()["pending"] == 3
+
+
+def test_claim_hands_out_each_job_once_in_queue_order(queue):
+    queue.enqueue([company(str(number)) for number in range(5)])
+
+    first = queue.claim("w1", 3)
+    second = queue.claim("w2", 3)
+
+    assert [job.job_id for job in first] == ["0", "1", "2"]
+    assert [job.job_id for job in second] == ["3", "4"]
+    assert queue.claim("w3", 3) == []
+    assert queue.counts()["leased"] == 5
+
+
+def test_ack_and_finished(queue):
+    queue.enqueue([company("1")])
+    queue.set_complete(True)
+    (job,) = queue.claim("w1")
+    assert not queue.finished()
+
+    assert queue.ack(job.job_id, "w1", card())
+    assert queue.counts()["done"] == 1
+    assert queue.finished()
+
+
+def test_not_finished_until_the_coordinator_is(queue):
+    queue.set_complete(False)
+    assert not queue.finished()
+
+
+def test_expired_lease_goes_to_the_next_worker(queue):
+    queue.lease_seconds = 0.05
+    queue.enqueue([company("1")])
+    queue.claim("w1")
+    assert queue.claim("w2") == []
+
+    sleep(0.1)
+    assert [job.job_id for job in queue.claim("w2")] == ["1"]
+    assert not queue.renew("1", "w1")
+    assert queue.renew("1", "w2")
+
+
+def test_ack_after_the_lease_moved_on_is_refused(queue):
+    queue.lease_seconds = 0.05
+    queue.enqueue([company("1")])
+    queue.claim("w1")
+    sleep(0.1)
+    queue.claim("w2")
+
+    assert not queue.ack("1", "w1", card())
+    assert queue.counts()["leased"] == 1
+    assert queue.ack("1", "w2", card())
+
+
+def test_job_whose_leases_keep_running_out_is_set_aside(queue):
+    queue.lease_seconds = 0.05
+    queue.enqueue([company("1")])
+    queue.claim("w1")
+    sleep(0.1)
+    queue.claim("w2")
+    sleep(0.1)
+
+    assert queue.claim("w3") == []
+    assert queue.counts()["failed"] == 1
+
+
+def test_failed_job_is_retried_until_it_runs_out_of_attempts(queue):
+    queue.enqueue([company("1")])
+    queue.claim("w1")
+    queue.fail("1", "w1", "boom")
+    assert queue.counts()["pending"] == 1
+
+    queue.claim("w2")
+    queue.fail("1", "w2", "boom")
+    assert queue.counts()["failed"] == 1
+    assert queue.claim("w3") == []
+
+
+@pytest.mark.parametrize("shared, journal_mode", [(False, "wal"), (True, "delete")])
+def test_journal_mode(tmp_path, shared, journal_mode):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), shared=shared)
+    try:
+        assert queue.connection.execute("PRAGMA journal_mode").fetchone()[0] == journal_mode
+    finally:
+        queue.close()
+
+
+def test_resolve_only_jobs_are_left_for_a_render(queue):
+    queue.enqueue([company("1"), company("2"), company("3")])
+    for job in queue.claim("w1", 3):
+        queue.ack(job.job_id, "w1", card(), rendered=job.job_id == "2")
+
+    pending = queue.render_pending()
+    assert [(job.job_id, contact) for job, contact in pending] == [("1", card()), ("3", card())]
+
+    queue.mark_rendered(pending[0][0])
+    assert [job.job_id for job, _contact in queue.render_pending()] == ["3"]
+